@@ -1,17 +1,40 @@
 from pathlib import Path
 from datetime import datetime
+import os
 import time
 import queue
 import logging
-import random
+import re
+import hashlib
+import json
+import uuid
+import threading
+import shutil
+import tempfile
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 
 from streamlit_webrtc import WebRtcMode, webrtc_streamer
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 import pydub
-from openai import OpenAI, RateLimitError, APIError, APIConnectionError, APITimeoutError
+from openai import RateLimitError, APIConnectionError, APITimeoutError
 from dotenv import load_dotenv, find_dotenv
 
+from cache_openai import obter_cache
+from cliente_openai import obter_cliente, CircuitoAbertoError
+from catalogo import CatalogoReunioes
+from busca import IndiceBusca
+from armazenamento import le_arquivo, salva_arquivo, anexa_arquivo, migra_arquivos
+from segmentos import registra_segmento, localiza_trecho, SEPARADOR, ARQUIVO_SEGMENTOS, ARQUIVO_TRANSCRICAO_LOCUTORES
+from backends_transcricao import cria_backend
+from importacao import FilaImportacao, EXTENSOES_AUDIO, EXTENSOES_TRANSCRICAO
+from preprocessamento_audio import prepara_chunk, completa_estatisticas
+from manutencao_audio import ManutencaoAudio, localiza_audio, uso_disco
+from diarizacao import Diarizador
+from metricas_latencia import obter_metricas
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -21,6 +44,7 @@ logger = logging.getLogger(__name__)
 
 PASTA_ARQUIVOS = Path(__file__).parent / 'arquivos'
 PASTA_ARQUIVOS.mkdir(exist_ok=True)
+PASTA_UPLOADS_IMPORTACAO = Path(__file__).parent / 'uploads_importacao'
 
 PROMPT = '''
 Faça o resumo do texto delimitado por #### 
@@ -45,219 +69,382 @@ Acordos da Reunião:
 texto: ####{}####
 '''
 
+PROMPT_TRECHO = '''
+O texto delimitado por #### é o trecho {} de {} da transcrição de uma reunião.
+Liste de forma objetiva os principais assuntos abordados neste trecho
+e todos os acordos e combinados feitos nele, em bullet points.
+Não invente informações que não estejam no trecho.
+
+O formato final que eu desejo é:
+
+Assuntos:
+- assunto 1
+- assunto n
+
+Acordos:
+- acordo 1
+- acordo n
+
+texto: ####{}####
+'''
+
+PROMPT_CONSOLIDACAO = '''
+Os textos delimitados por #### são resumos parciais, em ordem cronológica,
+de trechos consecutivos da transcrição de uma mesma reunião.
+Faça o resumo da reunião completa a partir deles.
+O resumo deve contar com os principais assuntos abordados.
+O resumo deve ter no máximo 300 caracteres.
+O resumo deve estar em texto corrido.
+No final, devem ser apresentados todos acordos e combinados 
+feitos na reunião no formato de bullet points, sem repetições.
+
+O formato final que eu desejo é:
+
+Resumo reunião:
+- escrever aqui o resumo.
+
+Acordos da Reunião:
+- acrodo 1
+- acordo 2
+- acordo 3
+- acordo n
+
+resumos parciais: ####{}####
+'''
+
+# Parâmetros do resumo hierárquico (map-reduce)
+MAX_TOKENS_TRECHO = 3000  # tamanho máximo de cada trecho enviado ao modelo
+CARACTERES_POR_TOKEN = 4  # estimativa usada quando o tiktoken não está instalado
+MAX_WORKERS_RESUMO = 4  # resumos de trechos gerados em paralelo
+
+PROMPT_RESUMO_INCREMENTAL = '''
+O texto delimitado por #### é o resumo atual de uma reunião que ainda está em andamento.
+O texto delimitado por $$$$ é o trecho da transcrição falado depois desse resumo.
+Atualize o resumo incorporando o novo trecho.
+O resumo deve contar com os principais assuntos abordados.
+O resumo deve ter no máximo 300 caracteres.
+O resumo deve estar em texto corrido.
+No final, devem ser apresentados todos acordos e combinados 
+feitos na reunião no formato de bullet points, mantendo os acordos anteriores.
+
+O formato final que eu desejo é:
+
+Resumo reunião:
+- escrever aqui o resumo.
+
+Acordos da Reunião:
+- acrodo 1
+- acordo 2
+- acordo 3
+- acordo n
+
+resumo atual: ####{}####
+
+novo trecho: $$$${}$$$$
+'''
+
+# Tamanho das páginas da transcrição exibidas em "Ver transcrições salvas"
+CARACTERES_POR_PAGINA = 5000
+
+# Parâmetros do resumo incremental durante a gravação
+INTERVALO_RESUMO_INCREMENTAL = 60  # segundos mínimos entre atualizações
+MIN_CARACTERES_RESUMO_INCREMENTAL = 400  # tamanho mínimo do trecho novo
+
+# Regravar o audio.mp3 inteiro a cada lote de frames custa O(duração) por lote;
+# basta um checkpoint periódico e um no fim da gravação
+INTERVALO_CHECKPOINT_AUDIO = 30  # segundos
+
+try:
+    import tiktoken
+    _encoder_tokens = tiktoken.encoding_for_model('gpt-4o-mini')
+except Exception:
+    _encoder_tokens = None
+
 
 _ = load_dotenv(find_dotenv())
 
 
-def salva_arquivo(caminho_arquivo, conteudo):
-    """Salva arquivo com encoding UTF-8"""
-    with open(caminho_arquivo, 'w', encoding='utf-8') as f:
-        f.write(conteudo)
+@st.cache_resource
+def prepara_arquivos():
+    """Converte uma única vez para UTF-8 os arquivos antigos gravados em outros encodings."""
+    migra_arquivos(PASTA_ARQUIVOS)
 
-def le_arquivo(caminho_arquivo):
+@st.cache_resource
+def obter_catalogo():
+    """Catálogo único do processo; pastas novas em disco entram na primeira chamada."""
+    prepara_arquivos()
+    catalogo = CatalogoReunioes(PASTA_ARQUIVOS)
+    catalogo.sincroniza(le_arquivo)
+    return catalogo
+
+@st.cache_resource
+def obter_indice_busca():
+    """Índice de busca único do processo; arquivos novos ou alterados são indexados na primeira chamada."""
+    prepara_arquivos()
+    indice = IndiceBusca(PASTA_ARQUIVOS / 'busca.sqlite3')
+    indice.sincroniza(PASTA_ARQUIVOS, le_arquivo)
+    return indice
+
+def registra_reuniao(pasta_reuniao, catalogo=None, indice=None):
     """
-    Lê arquivo tentando múltiplos encodings para compatibilidade.
-    Tenta UTF-8 primeiro, depois Windows-1252 e ISO-8859-1 como fallback.
+    Atualiza catálogo e índice de busca a partir dos arquivos da reunião.
+
+    Fora do script do Streamlit (threads da importação), catalogo e indice
+    são passados já prontos em vez de vir de obter_catalogo()/obter_indice_busca().
     """
-    if not caminho_arquivo.exists():
-        return ''
-    
-    # Lista de encodings para tentar (em ordem de preferência)
-    encodings = ['utf-8', 'windows-1252', 'iso-8859-1', 'latin-1']
-    
-    for encoding in encodings:
-        try:
-            with open(caminho_arquivo, 'r', encoding=encoding) as f:
-                conteudo = f.read()
-                logger.debug(f"Arquivo {caminho_arquivo.name} lido com encoding {encoding}")
-                return conteudo
-        except UnicodeDecodeError:
-            # Tenta próximo encoding
-            continue
-        except Exception as e:
-            # Outros erros (permissão, etc)
-            logger.error(f"Erro ao ler arquivo {caminho_arquivo}: {e}")
-            return ''
-    
-    # Se todos os encodings falharem, tenta com errors='replace' como último recurso
-    try:
-        with open(caminho_arquivo, 'r', encoding='utf-8', errors='replace') as f:
-            logger.warning(f"Arquivo {caminho_arquivo.name} lido com substituição de caracteres inválidos")
-            return f.read()
-    except Exception as e:
-        logger.error(f"Erro crítico ao ler arquivo {caminho_arquivo}: {e}")
-        return ''
+    if catalogo is None:
+        catalogo = obter_catalogo()
+    if indice is None:
+        indice = obter_indice_busca()
+    catalogo.registra(pasta_reuniao.name,
+                      titulo=le_arquivo(pasta_reuniao / 'titulo.txt'),
+                      tem_resumo=(pasta_reuniao / 'resumo.txt').exists())
+    indice.sincroniza_reuniao(pasta_reuniao, le_arquivo)
 
-def listar_reunioes():
-    lista_reunioes = PASTA_ARQUIVOS.glob('*')
-    lista_reunioes = list(lista_reunioes)
-    lista_reunioes.sort(reverse=True)
-    reunioes_dict = {}
-    for pasta_reuniao in lista_reunioes:
-        data_reuniao = pasta_reuniao.stem
-        ano, mes, dia, hora, min, seg = data_reuniao.split('_')
-        reunioes_dict[data_reuniao] = f'{ano}/{mes}/{dia} {hora}:{min}:{seg}'
-        titulo = le_arquivo(pasta_reuniao / 'titulo.txt')
-        if titulo != '':
-            reunioes_dict[data_reuniao] += f' - {titulo}'
-    return reunioes_dict
+def listar_reunioes(pagina=0, por_pagina=50, busca=''):
+    """
+    Lista reuniões do catálogo, da mais recente para a mais antiga.
+    
+    Returns:
+        tuple[dict, int]: {pasta da reunião: rótulo} da página e total encontrado
+    """
+    catalogo = obter_catalogo()
+    reunioes, total = catalogo.lista(pagina=pagina, por_pagina=por_pagina, busca=busca)
+    reunioes_dict = {reuniao['id']: catalogo.rotulo(reuniao) for reuniao in reunioes}
+    return reunioes_dict, total
 
 
 # OPENAI UTILS =====================
-# Configuração do cliente com timeout
-client = OpenAI(
-    timeout=60.0,  # Timeout de 60 segundos
-    max_retries=3,  # Retry automático do cliente
-)
+# Cliente compartilhado pelo processo: limite de taxa, circuit breaker e retry único
+# (o SDK é criado com max_retries=0 para não somar tentativas)
+cliente_api = obter_cliente()
 
-def transcreve_audio(caminho_audio, max_retries=3, base_delay=1.0):
+# Cache persistente de respostas (desative com CACHE_OPENAI_ATIVO=0 no .env)
+cache_openai = obter_cache()
+
+def _mostra_erro_api(e, acao):
+    """Mostra no Streamlit uma mensagem adequada ao tipo de erro da API."""
+    if get_script_run_ctx() is None:
+        return  # thread em segundo plano (resumo, importação): o erro já foi para o log
+    if isinstance(e, RateLimitError):
+        st.error("Limite de requisições excedido. Tente novamente em alguns instantes.")
+    elif isinstance(e, (APIConnectionError, APITimeoutError)):
+        st.error("Erro de conexão com a API. Verifique sua internet e tente novamente.")
+    elif isinstance(e, CircuitoAbertoError):
+        st.error(f"API temporariamente indisponível: {e}")
+    else:
+        st.error(f"Erro ao {acao}: {e}")
+
+@st.cache_resource
+def obter_backend_transcricao():
     """
-    Transcreve áudio usando Whisper API com retry e tratamento de erros.
+    Backend de transcrição do processo (TRANSCRICAO_BACKEND=openai|local no .env).
+    
+    Chamado no início do main() para o modelo local já estar carregado
+    quando a gravação começar. Se o backend configurado não puder ser criado
+    ou carregado (nome inválido, faster-whisper ausente, modelo que não baixa),
+    usa a API Whisper e guarda o erro em erro_carregamento para o main() avisar.
+    """
+    try:
+        backend = cria_backend(cliente=cliente_api, cache=cache_openai)
+        backend.carrega()
+        return backend
+    except Exception as e:
+        logger.error(f"Backend de transcrição indisponível, usando a API OpenAI: {e}", exc_info=True)
+        backend = cria_backend('openai', cliente=cliente_api, cache=cache_openai)
+        backend.erro_carregamento = f'{type(e).__name__}: {e}'
+        return backend
+
+def transcreve_audio(caminho_audio):
+    """
+    Transcreve áudio com o backend configurado (Whisper API ou modelo local).
+    
+    As novas tentativas, o limite de taxa e o circuit breaker da API ficam no cliente_api.
     
     Args:
         caminho_audio: Caminho para o arquivo de áudio
-        max_retries: Número máximo de tentativas
-        base_delay: Delay base para backoff exponencial
     
     Returns:
         str: Texto transcrito
         
     Raises:
-        Exception: Se todas as tentativas falharem
+        Exception: Se a transcrição falhar
     """
-    for tentativa in range(max_retries):
-        try:
-            with open(caminho_audio, "rb") as audio_file:
-                response = client.audio.transcriptions.create(
-                    file=audio_file,
-                    model="whisper-1",
-                    timeout=60.0  # Timeout específico para esta chamada
-                )
-            
-            if not response or not hasattr(response, 'text'):
-                raise ValueError("Resposta inválida da API de transcrição")
-            
-            logger.info(f"Transcrição bem-sucedida após {tentativa + 1} tentativa(s)")
-            return response.text
-            
-        except RateLimitError as e:
-            # Rate limit: espera mais tempo antes de retry
-            wait_time = base_delay * (2 ** tentativa) + random.uniform(0, 1)  # Backoff exponencial com jitter
-            if tentativa < max_retries - 1:
-                logger.warning(f"Rate limit atingido. Tentativa {tentativa + 1}/{max_retries}. Aguardando {wait_time:.2f}s...")
-                time.sleep(wait_time)
-            else:
-                logger.error(f"Rate limit após {max_retries} tentativas: {e}")
-                st.error("Limite de requisições excedido. Tente novamente em alguns instantes.")
-                raise
-                
-        except (APIConnectionError, APITimeoutError) as e:
-            # Erros de conexão/timeout: retry com backoff
-            wait_time = base_delay * (2 ** tentativa) + random.uniform(0, 1)
-            if tentativa < max_retries - 1:
-                logger.warning(f"Erro de conexão/timeout. Tentativa {tentativa + 1}/{max_retries}. Aguardando {wait_time:.2f}s...")
-                time.sleep(wait_time)
-            else:
-                logger.error(f"Erro de conexão após {max_retries} tentativas: {e}")
-                st.error("Erro de conexão com a API. Verifique sua internet e tente novamente.")
-                raise
-                
-        except APIError as e:
-            # Outros erros da API: não retry para erros de cliente
-            logger.error(f"Erro da API: {e}")
-            st.error(f"Erro ao transcrever áudio: {e}")
-            raise
-            
-        except Exception as e:
-            # Erros inesperados
-            logger.error(f"Erro inesperado na transcrição: {e}", exc_info=True)
-            if tentativa < max_retries - 1:
-                wait_time = base_delay * (2 ** tentativa)
-                time.sleep(wait_time)
-            else:
-                st.error(f"Erro ao transcrever áudio: {e}")
-                raise
-    
-    raise Exception("Falha ao transcrever áudio após todas as tentativas")
+    try:
+        return obter_backend_transcricao().transcreve(caminho_audio)
+    except Exception as e:
+        logger.error(f"Erro na transcrição: {e}")
+        _mostra_erro_api(e, 'transcrever áudio')
+        raise
 
 
-def gerar_resposta_openai(prompt, max_retries=3, base_delay=1.0):
+def gerar_resposta_openai(prompt):
     """
-    Gera resposta usando Chat Completions API com retry e tratamento de erros.
+    Gera resposta usando Chat Completions API.
+    
+    As novas tentativas, o limite de taxa e o circuit breaker ficam no cliente_api.
     
     Args:
         prompt: Texto do prompt
-        max_retries: Número máximo de tentativas
-        base_delay: Delay base para backoff exponencial
     
     Returns:
         str: Resposta gerada
         
     Raises:
-        Exception: Se todas as tentativas falharem
+        Exception: Se a geração falhar
     """
-    for tentativa in range(max_retries):
+    parametros = {
+        'model': "gpt-4o-mini",  # Modelo correto e atualizado
+        'temperature': 0.7,
+    }
+    mensagens = [
+        {"role": "system", "content": "Você é um assistente especializado em resumir reuniões."},
+        {"role": "user", "content": prompt}
+    ]
+    chave_cache = cache_openai.chave('chat', parametros, json.dumps(mensagens, ensure_ascii=False))
+    resposta_cache = cache_openai.obter(chave_cache)
+    if resposta_cache is not None:
+        logger.info("Resposta obtida do cache")
+        return resposta_cache
+
+    # Entrada + margem para a resposta, usada no limite de tokens por minuto
+    tokens_estimados = conta_tokens(prompt) + 500
+    try:
+        resposta_texto = cliente_api.chat(mensagens, tokens_estimados=tokens_estimados, **parametros)
+    except Exception as e:
+        logger.error(f"Erro ao gerar resposta: {e}")
+        _mostra_erro_api(e, 'gerar resposta')
+        raise
+    cache_openai.salvar(chave_cache, resposta_texto)
+    return resposta_texto
+
+
+# RESUMO INCREMENTAL =====================
+class ResumoIncremental:
+    """
+    Mantém o resumo.txt atualizado enquanto a reunião é gravada.
+    
+    Cada atualização envia ao modelo apenas o resumo anterior e o trecho novo da
+    transcrição, então o custo por atualização não cresce com a reunião. O número
+    de caracteres já resumidos fica em resumo_estado.json para que o resumo possa
+    ser completado depois, caso a gravação seja interrompida.
+
+    As atualizações rodam numa thread em segundo plano, que não pode usar
+    st.cache_resource: catálogo e índice de busca são recebidos já criados.
+    """
+
+    def __init__(self, pasta_reuniao, catalogo, indice):
+        self.pasta_reuniao = pasta_reuniao
+        self.catalogo = catalogo
+        self.indice = indice
+        self.caminho_estado = pasta_reuniao / 'resumo_estado.json'
+        estado = json.loads(le_arquivo(self.caminho_estado) or '{}')
+        self.caracteres_resumidos = estado.get('caracteres_resumidos', 0)
+        self.ultima_atualizacao = 0.0
+        self.lock = threading.Lock()  # um escritor por vez de resumo.txt e resumo_estado.json
+        self._thread = None
+
+    def pendente(self, transcricao):
+        return len(transcricao) > self.caracteres_resumidos
+
+    def em_andamento(self):
+        """Atualização ou finalização rodando em segundo plano."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def aguarda(self):
+        if self.em_andamento():
+            self._thread.join()
+
+    def descarta_estado(self):
+        """O resumo foi refeito do zero: o que já foi resumido não conta mais."""
+        self.caracteres_resumidos = 0
+        self.caminho_estado.unlink(missing_ok=True)
+
+    def incompleto(self, transcricao):
+        """Resumo contínuo iniciado na gravação que não chegou ao fim da transcrição."""
+        return self.caracteres_resumidos > 0 and self.pendente(transcricao)
+
+    def atualiza(self, transcricao):
+        """Dispara uma atualização em segundo plano se houver trecho novo suficiente."""
+        if self.em_andamento():
+            return
+        delta = len(transcricao) - self.caracteres_resumidos
+        if delta < MIN_CARACTERES_RESUMO_INCREMENTAL:
+            return
+        if time.time() - self.ultima_atualizacao < INTERVALO_RESUMO_INCREMENTAL:
+            return
+        self.ultima_atualizacao = time.time()
+        self._thread = threading.Thread(target=self._atualiza_seguro,
+                                        args=(transcricao,), daemon=True)
+        self._thread.start()
+
+    def finaliza(self, transcricao, esperar=True):
+        """Incorpora o restante da transcrição ao resumo."""
+        if esperar:
+            self._atualiza(transcricao)
+        else:
+            # O lock faz esta atualização esperar a que estiver em andamento
+            self._thread = threading.Thread(target=self._atualiza_seguro,
+                                            args=(transcricao,), daemon=True)
+            self._thread.start()
+
+    def _atualiza_seguro(self, transcricao):
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",  # Modelo correto e atualizado
-                messages=[
-                    {"role": "system", "content": "Você é um assistente especializado em resumir reuniões."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                timeout=60.0  # Timeout específico para esta chamada
-            )
-            
-            # Validação da resposta
-            if not response or not response.choices:
-                raise ValueError("Resposta inválida da API")
-            
-            resposta_texto = response.choices[0].message.content
-            if not resposta_texto:
-                raise ValueError("Resposta vazia da API")
-            
-            logger.info(f"Resposta gerada com sucesso após {tentativa + 1} tentativa(s)")
-            return resposta_texto
-            
-        except RateLimitError as e:
-            # Rate limit: espera mais tempo antes de retry
-            wait_time = base_delay * (2 ** tentativa) + random.uniform(0, 1)  # Backoff exponencial com jitter
-            if tentativa < max_retries - 1:
-                logger.warning(f"Rate limit atingido. Tentativa {tentativa + 1}/{max_retries}. Aguardando {wait_time:.2f}s...")
-                time.sleep(wait_time)
-            else:
-                logger.error(f"Rate limit após {max_retries} tentativas: {e}")
-                st.error("Limite de requisições excedido. Tente novamente em alguns instantes.")
-                raise
-                
-        except (APIConnectionError, APITimeoutError) as e:
-            # Erros de conexão/timeout: retry com backoff
-            wait_time = base_delay * (2 ** tentativa) + random.uniform(0, 1)
-            if tentativa < max_retries - 1:
-                logger.warning(f"Erro de conexão/timeout. Tentativa {tentativa + 1}/{max_retries}. Aguardando {wait_time:.2f}s...")
-                time.sleep(wait_time)
-            else:
-                logger.error(f"Erro de conexão após {max_retries} tentativas: {e}")
-                st.error("Erro de conexão com a API. Verifique sua internet e tente novamente.")
-                raise
-                
-        except APIError as e:
-            # Outros erros da API: não retry para erros de cliente
-            logger.error(f"Erro da API: {e}")
-            st.error(f"Erro ao gerar resposta: {e}")
-            raise
-            
+            self._atualiza(transcricao)
         except Exception as e:
-            # Erros inesperados
-            logger.error(f"Erro inesperado ao gerar resposta: {e}", exc_info=True)
-            if tentativa < max_retries - 1:
-                wait_time = base_delay * (2 ** tentativa)
-                time.sleep(wait_time)
-            else:
-                st.error(f"Erro ao gerar resposta: {e}")
-                raise
-    
-    raise Exception("Falha ao gerar resposta após todas as tentativas")
+            # Não interrompe a gravação: o trecho fica para a próxima atualização
+            logger.error(f"Erro ao atualizar resumo incremental: {e}")
+
+    def _atualiza(self, transcricao):
+        with self.lock:
+            if not self.pendente(transcricao):
+                return
+            caminho_resumo = self.pasta_reuniao / 'resumo.txt'
+            resumo = le_arquivo(caminho_resumo) if self.caracteres_resumidos > 0 else ''
+            delta = transcricao[self.caracteres_resumidos:]
+            # Trecho novo grande demais (ex.: falha em atualizações anteriores) vai em partes
+            for trecho in divide_em_trechos(delta):
+                if resumo == '':
+                    resumo = gerar_resposta_openai(PROMPT.format(trecho))
+                else:
+                    resumo = gerar_resposta_openai(PROMPT_RESUMO_INCREMENTAL.format(resumo, trecho))
+            salva_arquivo(caminho_resumo, resumo)
+            self.catalogo.registra(self.pasta_reuniao.name, tem_resumo=True)
+            self.indice.indexa_campo(self.pasta_reuniao.name, 'resumo', resumo,
+                                     caminho_resumo.stat().st_mtime)
+            self.caracteres_resumidos = len(transcricao)
+            salva_arquivo(self.caminho_estado,
+                          json.dumps({'caracteres_resumidos': self.caracteres_resumidos}))
+            logger.info(f"Resumo incremental atualizado ({self.caracteres_resumidos} caracteres)")
+
+
+@st.cache_resource
+def _registro_resumos_incrementais():
+    """
+    Instâncias por reunião e o lock do registro.
+
+    O Streamlit reexecuta app.py num __main__ novo a cada rerun: um dicionário
+    global do módulo recomeçaria vazio e a thread de um finaliza iniciado no
+    rerun anterior ficaria numa instância que ninguém mais enxerga.
+    """
+    return {}, threading.Lock()
+
+def obter_resumo_incremental(pasta_reuniao):
+    """
+    ResumoIncremental único por reunião no processo.
+
+    Gravação, seleção da reunião e gerar_resumo compartilham a mesma instância
+    (e o mesmo lock), inclusive entre reruns, então um finaliza em segundo plano
+    nunca roda em paralelo com outro para os mesmos trechos. Só é chamada pelo
+    script do Streamlit, que cria o catálogo e o índice passados à instância.
+    """
+    catalogo, indice = obter_catalogo(), obter_indice_busca()
+    resumos, lock = _registro_resumos_incrementais()
+    with lock:
+        chave = str(Path(pasta_reuniao).resolve())
+        if chave not in resumos:
+            resumos[chave] = ResumoIncremental(Path(pasta_reuniao), catalogo, indice)
+        return resumos[chave]
 
 
 # TAB GRAVA REUNIÃO =====================
@@ -273,6 +460,25 @@ def adiciona_chunck_audio(frames_de_audio, audio_chunck):
         audio_chunck += sound
     return audio_chunck
 
+def mostra_painel_latencia(painel):
+    """p50/p95 por etapa do chunk e medidor do fator de tempo real."""
+    resumo = obter_metricas().resumo()
+    if not resumo['etapas']:
+        return
+    with painel.container():
+        with st.expander('Latência por etapa'):
+            rtf = resumo['rtf']
+            if rtf:
+                st.metric('Fator de tempo real (último chunk)', f"{rtf['ultimo']:.2f}",
+                          delta=f"p50 {rtf['p50']:.2f} / p95 {rtf['p95']:.2f}", delta_color='off',
+                          help='Tempo de processamento / duração do áudio; acima de 1 a transcrição fica para trás')
+                st.progress(min(rtf['ultimo'], 1.0),
+                            text='Acompanhando a fala' if rtf['ultimo'] < 1 else 'Atrasando em relação à fala')
+            st.dataframe([{'Etapa': etapa, 'Amostras': valores['n'], 'p50 (ms)': round(valores['p50'], 1),
+                           'p95 (ms)': round(valores['p95'], 1), 'Último (ms)': round(valores['ultimo'], 1)}
+                          for etapa, valores in resumo['etapas'].items()],
+                         hide_index=True)
+
 def tab_grava_reuniao():
     webrtx_ctx = webrtc_streamer(
         key='recebe_audio',
@@ -286,50 +492,122 @@ def tab_grava_reuniao():
 
     container = st.empty()
     container.markdown('Comece a falar')
+    painel_latencia = st.empty()
     pasta_reuniao = PASTA_ARQUIVOS / datetime.now().strftime('%Y_%m_%d_%H_%M_%S')
     pasta_reuniao.mkdir()
+    obter_catalogo().registra(pasta_reuniao.name)
 
     ultima_trancricao = time.time()
+    ultimo_checkpoint = time.time()
+    # Chunks só existem até serem transcritos: ficam fora da pasta da reunião
+    caminho_chunk_base = Path(tempfile.gettempdir()) / f'meetgpt_{pasta_reuniao.name}_chunk'
     audio_completo = pydub.AudioSegment.empty()
     audio_chunck = pydub.AudioSegment.empty()
     transcricao = ''
+    id_chunk = 0
+    resumo_incremental = obter_resumo_incremental(pasta_reuniao)
+    metricas = obter_metricas()
+    registro = {}  # métricas do chunk em montagem
+    inicio_audio = None  # relógio correspondente ao início do áudio recebido
+    chegada_chunk = None
 
-    while True:
-        if webrtx_ctx.audio_receiver:
-            try:
-                frames_de_audio = webrtx_ctx.audio_receiver.get_frames(timeout=1)
-            except queue.Empty:
-                time.sleep(0.1)
-                continue
-            audio_completo = adiciona_chunck_audio(frames_de_audio, audio_completo)
-            audio_chunck = adiciona_chunck_audio(frames_de_audio, audio_chunck)
-            if len(audio_chunck) > 0:
-                audio_completo.export(pasta_reuniao / 'audio.mp3')
-                agora = time.time()
-                if agora - ultima_trancricao > 5:
-                    ultima_trancricao = agora
-                    audio_chunck.export(pasta_reuniao / 'audio_temp.mp3')
-                    try:
-                        transcricao_chunck = transcreve_audio(pasta_reuniao / 'audio_temp.mp3')
-                        transcricao += transcricao_chunck
-                        salva_arquivo(pasta_reuniao / 'transcricao.txt', transcricao)
-                        container.markdown(transcricao)
-                        audio_chunck = pydub.AudioSegment.empty()
-                    except Exception as e:
-                        logger.error(f"Erro ao transcrever chunk de áudio: {e}")
-                        st.warning(f"Erro ao transcrever: {e}. Continuando gravação...")
-        else:
-            break
+    try:
+        while True:
+            if webrtx_ctx.audio_receiver:
+                try:
+                    frames_de_audio = webrtx_ctx.audio_receiver.get_frames(timeout=1)
+                except queue.Empty:
+                    time.sleep(0.1)
+                    continue
+                chegada = time.time()
+                chegada_chunk = chegada_chunk or chegada
+                with metricas.mede('montagem_audio', registro):
+                    audio_completo = adiciona_chunck_audio(frames_de_audio, audio_completo)
+                    audio_chunck = adiciona_chunck_audio(frames_de_audio, audio_chunck)
+                # Atraso da fila: tempo de relógio decorrido menos o áudio já recebido
+                if inicio_audio is None:
+                    inicio_audio = chegada - len(audio_completo) / 1000
+                atraso_fila_ms = max(0.0, (chegada - inicio_audio) * 1000 - len(audio_completo))
+                metricas.registra('fila_frames', atraso_fila_ms)
+                registro['atraso_fila_ms'] = round(max(registro.get('atraso_fila_ms', 0), atraso_fila_ms), 1)
+                if len(audio_chunck) > 0:
+                    agora = time.time()
+                    if agora - ultimo_checkpoint > INTERVALO_CHECKPOINT_AUDIO:
+                        ultimo_checkpoint = agora
+                        with metricas.mede('checkpoint_mp3', registro):
+                            audio_completo.export(pasta_reuniao / 'audio.mp3')
+                    if agora - ultima_trancricao > 5:
+                        ultima_trancricao = agora
+                        inicio_processamento = time.perf_counter()
+                        # Mono 16 kHz e codec de fala: upload menor e mais rápido
+                        with metricas.mede('preprocessamento', registro):
+                            caminho_chunk, estatisticas_chunk = prepara_chunk(audio_chunck, caminho_chunk_base)
+                        try:
+                            inicio_chamada = time.perf_counter()
+                            with metricas.mede('transcricao', registro):
+                                transcricao_chunck = transcreve_audio(caminho_chunk)
+                            latencia_ms = (time.perf_counter() - inicio_chamada) * 1000
+                            completa_estatisticas(estatisticas_chunk, latencia_ms)
+                            with metricas.mede('escrita', registro):
+                                # Log de segmentos é a fonte; transcricao.txt só recebe o acréscimo
+                                fim_ms = len(audio_completo)
+                                registra_segmento(pasta_reuniao, id_chunk, transcricao_chunck,
+                                                  fim_ms - len(audio_chunck), fim_ms, latencia_ms,
+                                                  preprocessamento=estatisticas_chunk)
+                                registro['chunk'] = id_chunk
+                                id_chunk += 1
+                                texto_novo = transcricao_chunck.strip()
+                                if transcricao and texto_novo:
+                                    texto_novo = SEPARADOR + texto_novo
+                                anexa_arquivo(pasta_reuniao / 'transcricao.txt', texto_novo)
+                                transcricao += texto_novo
+                            with metricas.mede('indexacao', registro):
+                                obter_indice_busca().indexa_transcricao(
+                                    pasta_reuniao.name, transcricao,
+                                    (pasta_reuniao / 'transcricao.txt').stat().st_mtime)
+                            with metricas.mede('exibicao', registro):
+                                container.markdown(transcricao)
+                            registro.update(audio_ms=len(audio_chunck),
+                                            processamento_ms=round((time.perf_counter() - inicio_processamento) * 1000, 1),
+                                            ponta_a_ponta_ms=round((time.time() - chegada_chunk) * 1000, 1))
+                            metricas.registra('ponta_a_ponta', registro['ponta_a_ponta_ms'])
+                            metricas.registra_chunk(pasta_reuniao, registro)
+                            mostra_painel_latencia(painel_latencia)
+                            registro, chegada_chunk = {}, None
+                            audio_chunck = pydub.AudioSegment.empty()
+                            resumo_incremental.atualiza(transcricao)
+                        except Exception as e:
+                            logger.error(f"Erro ao transcrever chunk de áudio: {e}")
+                            st.warning(f"Erro ao transcrever: {e}. Continuando gravação...")
+                        finally:
+                            caminho_chunk.unlink(missing_ok=True)
+            else:
+                break
+    finally:
+        if len(audio_completo) > 0:
+            audio_completo.export(pasta_reuniao / 'audio.mp3')
+            if id_chunk:
+                obter_diarizador().agenda(pasta_reuniao)
+        # Ao parar a gravação o Streamlit interrompe o script; o último trecho
+        # é resumido em segundo plano para o resumo.txt ficar pronto logo em seguida.
+        if transcricao:
+            resumo_incremental.finaliza(transcricao, esperar=False)
 
 
 # TAB SELEÇÃO REUNIÃO =====================
 def tab_selecao_reuniao():
-    reunioes_dict = listar_reunioes()
+    REUNIOES_POR_PAGINA = 50
+    col_busca, col_pagina = st.columns([3, 1])
+    busca = col_busca.text_input('Buscar por título ou data (AAAA/MM/DD)')
+    pagina = col_pagina.number_input('Página', min_value=1, value=1, step=1) - 1
+    reunioes_dict, total = listar_reunioes(pagina, REUNIOES_POR_PAGINA, busca)
     if len(reunioes_dict) > 0:
-        reuniao_selecionada = st.selectbox('Selecione uma reunião',
-                                        list(reunioes_dict.values()))
+        total_paginas = (total + REUNIOES_POR_PAGINA - 1) // REUNIOES_POR_PAGINA
+        reuniao_data = st.selectbox('Selecione uma reunião',
+                                    list(reunioes_dict.keys()),
+                                    format_func=reunioes_dict.get,
+                                    help=f'{total} reunião(ões), página {pagina + 1} de {total_paginas}')
         st.divider()
-        reuniao_data = [k for k, v in reunioes_dict.items() if v == reuniao_selecionada][0]
         pasta_reuniao = PASTA_ARQUIVOS / reuniao_data
         if not (pasta_reuniao / 'titulo.txt').exists():
             st.warning('Adicione um titulo')
@@ -338,50 +616,448 @@ def tab_selecao_reuniao():
                       on_click=salvar_titulo,
                       args=(pasta_reuniao, titulo_reuniao))
         else:
-            titulo = le_arquivo(pasta_reuniao / 'titulo.txt')
-            transcricao = le_arquivo(pasta_reuniao / 'transcricao.txt')
-            resumo = le_arquivo(pasta_reuniao / 'resumo.txt')
-            if resumo == '':
+            # Título e resumo primeiro: a página fica utilizável antes da transcrição
+            titulo = carrega_texto(pasta_reuniao / 'titulo.txt')
+            st.markdown(f'## {titulo}')
+            resumo = carrega_texto(pasta_reuniao / 'resumo.txt')
+            transcricao = carrega_texto(pasta_reuniao / 'transcricao.txt')
+            resumo_incremental = obter_resumo_incremental(pasta_reuniao)
+            if resumo_incremental.em_andamento():
+                # A gravação acabou de parar e o resumo está sendo completado: não refaz o trabalho
+                st.info('O resumo desta reunião está sendo finalizado em segundo plano. '
+                        'Recarregue a página em instantes.')
+            elif resumo == '' or resumo_incremental.incompleto(transcricao):
                 with st.spinner('Gerando resumo...'):
                     try:
                         gerar_resumo(pasta_reuniao)
-                        resumo = le_arquivo(pasta_reuniao / 'resumo.txt')
+                        resumo = carrega_texto(pasta_reuniao / 'resumo.txt')
                     except Exception as e:
                         logger.error(f"Erro ao gerar resumo: {e}")
                         st.error(f"Erro ao gerar resumo: {e}")
                         resumo = "Erro ao gerar resumo. Tente novamente."
-            st.markdown(f'## {titulo}')
             st.markdown(f'{resumo}')
-            st.markdown(f'Transcricao: {transcricao}')
-        
+            mostra_transcricao(pasta_reuniao)
+            mostra_audio(pasta_reuniao)
+    mostra_uso_disco()
+
+def mostra_uso_disco():
+    """Espaço ocupado por reunião e resultado da última manutenção do áudio."""
+    with st.expander('Armazenamento'):
+        relatorio = obter_manutencao_audio().ultimo_relatorio
+        if relatorio:
+            st.caption(f"Última manutenção {datetime.fromtimestamp(relatorio['executado_em']):%d/%m %H:%M}: "
+                       f"{relatorio['arquivados']} áudio(s) arquivado(s), {relatorio['movidos']} movido(s) "
+                       f"para a pasta fria, {relatorio['bytes_liberados'] / 1024 / 1024:.1f} MB liberados")
+        if not st.button('Calcular uso de disco'):
+            return
+        uso = uso_disco(PASTA_ARQUIVOS)
+        st.caption(f"Total: {sum(u['total'] for u in uso) / 1024 / 1024:.1f} MB em {len(uso)} reunião(ões)")
+        st.dataframe([{'Reunião': u['reuniao'],
+                       'Áudio (MB)': round(u['audio'] / 1024 / 1024, 2),
+                       'Pasta fria (MB)': round(u['frio'] / 1024 / 1024, 2),
+                       'Temporários (MB)': round(u['temporarios'] / 1024 / 1024, 2),
+                       'Textos (KB)': round(u['texto'] / 1024, 1)} for u in uso],
+                     hide_index=True)
+
+def mostra_audio(pasta_reuniao):
+    """Toca o áudio da reunião a partir do segmento que contém o trecho buscado."""
+    caminho_audio = localiza_audio(pasta_reuniao)
+    if caminho_audio is None:
+        return
+    trecho = st.text_input('Ouvir a partir do trecho',
+                           key=f'trecho_audio_{pasta_reuniao.name}',
+                           help='Digite um trecho da transcrição para posicionar o áudio')
+    if not trecho:
+        return
+    segmento = localiza_trecho(pasta_reuniao, trecho)
+    if segmento is None:
+        st.info('Trecho não encontrado nos segmentos desta reunião.')
+        return
+    st.caption(f"{segmento['inicio_ms'] // 60000:02d}:{segmento['inicio_ms'] // 1000 % 60:02d} — "
+               f"{segmento['texto']}")
+    st.audio(str(caminho_audio), start_time=segmento['inicio_ms'] // 1000)
+
+def carrega_texto(caminho_arquivo):
+    """Lê o arquivo pelo cache do Streamlit, invalidado quando o mtime muda."""
+    try:
+        mtime = caminho_arquivo.stat().st_mtime_ns
+    except FileNotFoundError:
+        return ''
+    return _carrega_texto(str(caminho_arquivo), mtime)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _carrega_texto(caminho_arquivo, mtime):
+    return le_arquivo(Path(caminho_arquivo))
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _paginas_transcricao(caminho_arquivo, mtime):
+    return divide_em_paginas(le_arquivo(Path(caminho_arquivo)))
+
+def divide_em_paginas(texto, caracteres_por_pagina=CARACTERES_POR_PAGINA):
+    """Divide o texto em páginas de ~caracteres_por_pagina, quebrando em fim de frase."""
+    paginas, atual, tamanho_atual = [], '', 0
+    for paragrafo in texto.strip().split('\n\n'):
+        # Parágrafos (turnos de fala) continuam separados dentro da página
+        for i, frase in enumerate(re.split(r'(?<=[.!?])\s+', paragrafo.strip())):
+            if atual and tamanho_atual + len(frase) > caracteres_por_pagina:
+                paginas.append(atual)
+                atual, tamanho_atual = '', 0
+            if atual:
+                atual += '\n\n' if i == 0 else ' '
+            atual += frase
+            tamanho_atual += len(frase) + 1
+    if atual:
+        paginas.append(atual)
+    return paginas
+
+def mostra_transcricao(pasta_reuniao):
+    """
+    Mostra a transcrição uma página por vez.
+    
+    Só a página escolhida é enviada ao navegador, em vez da transcrição inteira
+    a cada interação.
+    """
+    caminho = pasta_reuniao / ARQUIVO_TRANSCRICAO_LOCUTORES
+    if not caminho.exists():
+        caminho = pasta_reuniao / 'transcricao.txt'
+    if not caminho.exists():
+        return
+    paginas = _paginas_transcricao(str(caminho), caminho.stat().st_mtime_ns)
+    if not paginas:
+        return
+    with st.expander(f'Transcrição ({len(paginas)} página(s))'):
+        mostra_locutores(pasta_reuniao)
+        pagina = 1
+        if len(paginas) > 1:
+            pagina = st.number_input('Página da transcrição', min_value=1, max_value=len(paginas),
+                                     value=1, step=1, key=f'pagina_transcricao_{pasta_reuniao.name}')
+        st.markdown(paginas[pagina - 1])
+
+def mostra_locutores(pasta_reuniao):
+    """Estado da diarização e ações: identificar locutores e refazer o resumo com eles."""
+    estado = obter_diarizador().estado(pasta_reuniao)
+    if estado in ('na fila', 'processando'):
+        st.caption('Identificando locutores...')
+        return
+    if estado and estado.startswith('erro'):
+        st.caption(f'Não foi possível identificar os locutores ({estado})')
+    if (pasta_reuniao / ARQUIVO_TRANSCRICAO_LOCUTORES).exists():
+        if st.button('Refazer resumo com os locutores', key=f'resumo_locutores_{pasta_reuniao.name}'):
+            with st.spinner('Gerando resumo...'):
+                try:
+                    gerar_resumo(pasta_reuniao, com_locutores=True)
+                    st.rerun()
+                except Exception as e:
+                    logger.error(f"Erro ao gerar resumo: {e}")
+                    st.error(f"Erro ao gerar resumo: {e}")
+    elif (pasta_reuniao / ARQUIVO_SEGMENTOS).exists() and localiza_audio(pasta_reuniao):
+        if st.button('Identificar locutores', key=f'diarizar_{pasta_reuniao.name}'):
+            obter_diarizador().agenda(pasta_reuniao)
+            st.rerun()
+
 def salvar_titulo(pasta_reuniao, titulo):
     salva_arquivo(pasta_reuniao / 'titulo.txt', titulo)
+    obter_catalogo().registra(pasta_reuniao.name, titulo=titulo)
+    obter_indice_busca().indexa_campo(pasta_reuniao.name, 'titulo', titulo,
+                                      (pasta_reuniao / 'titulo.txt').stat().st_mtime)
+
+def gerar_resumo(pasta_reuniao, com_locutores=False):
+    """
+    Gera o resumo.txt da reunião.
 
-def gerar_resumo(pasta_reuniao):
+    Args:
+        com_locutores: Resume a transcrição com os turnos de fala da diarização,
+            do zero, para os acordos poderem ser atribuídos aos locutores
+    """
+    arquivo = ARQUIVO_TRANSCRICAO_LOCUTORES if com_locutores else 'transcricao.txt'
+    transcricao = le_arquivo(pasta_reuniao / arquivo)
+    if not transcricao or transcricao.strip() == '':
+        raise ValueError("Transcrição vazia. Não é possível gerar resumo.")
+    resumo_incremental = obter_resumo_incremental(pasta_reuniao)
+    # Um finaliza disparado ao parar a gravação pode estar rodando: espera por ele
+    resumo_incremental.aguarda()
+    if resumo_incremental.caracteres_resumidos > 0 and not com_locutores:
+        # Gravação já tem resumo contínuo: só falta incorporar o final da transcrição
+        resumo_incremental.finaliza(transcricao)
+        return
+    with resumo_incremental.lock:
+        if not com_locutores and resumo_incremental.caracteres_resumidos >= len(transcricao):
+            return  # outra sessão terminou o resumo enquanto esta esperava
+        resumo = escreve_resumo(pasta_reuniao, transcricao)
+        if com_locutores:
+            # O estado do resumo contínuo conta caracteres do transcricao.txt; deixa de valer
+            resumo_incremental.descarta_estado()
+    obter_catalogo().registra(pasta_reuniao.name, tem_resumo=True)
+    obter_indice_busca().indexa_campo(pasta_reuniao.name, 'resumo', resumo,
+                                      (pasta_reuniao / 'resumo.txt').stat().st_mtime)
+
+def resume_importacao(pasta_reuniao):
+    """
+    Resumo de uma reunião importada, chamado pelas threads da FilaImportacao.
+
+    Não usa Streamlit: o registro no catálogo e no índice fica com o callback
+    registra da fila, chamado logo depois.
+    """
     transcricao = le_arquivo(pasta_reuniao / 'transcricao.txt')
     if not transcricao or transcricao.strip() == '':
         raise ValueError("Transcrição vazia. Não é possível gerar resumo.")
-    resumo = gerar_resposta_openai(PROMPT.format(transcricao))
+    escreve_resumo(pasta_reuniao, transcricao)
+
+
+# RESUMO HIERÁRQUICO =====================
+def escreve_resumo(pasta_reuniao, transcricao):
+    """Resume a transcrição (em trechos, se for longa) e grava o resumo.txt."""
+    trechos = divide_em_trechos(transcricao)
+    if len(trechos) == 1:
+        resumo = gerar_resposta_openai(PROMPT.format(transcricao))
+    else:
+        resumos_trechos = resumir_trechos(pasta_reuniao, trechos)
+        resumo = consolidar_resumos(resumos_trechos)
     salva_arquivo(pasta_reuniao / 'resumo.txt', resumo)
+    return resumo
+
+def conta_tokens(texto):
+    """Conta tokens com o tiktoken ou, na falta dele, estima pelo nº de caracteres."""
+    if _encoder_tokens is not None:
+        return len(_encoder_tokens.encode(texto))
+    return len(texto) // CARACTERES_POR_TOKEN + 1
+
+def divide_em_trechos(texto, max_tokens=MAX_TOKENS_TRECHO):
+    """
+    Divide o texto em trechos de até max_tokens, quebrando em fim de frase.
+    
+    A transcrição é a concatenação dos chunks do Whisper, então nem sempre há
+    espaço depois da pontuação; frases maiores que o limite são quebradas por palavras.
+    """
+    frases = re.split(r'(?<=[.!?])\s+|(?<=[.!?])(?=[A-ZÀ-Ú])', texto.strip())
+    trechos = []
+    atual, tokens_atual = [], 0
+    for frase in frases:
+        tokens_frase = conta_tokens(frase)
+        if tokens_frase > max_tokens:
+            palavras = frase.split()
+            passo = max(1, len(palavras) * max_tokens // tokens_frase)
+            partes = [' '.join(palavras[i:i + passo]) for i in range(0, len(palavras), passo)]
+        else:
+            partes = [frase]
+        for parte in partes:
+            tokens_parte = conta_tokens(parte)
+            if atual and tokens_atual + tokens_parte > max_tokens:
+                trechos.append(' '.join(atual))
+                atual, tokens_atual = [], 0
+            atual.append(parte)
+            tokens_atual += tokens_parte
+    if atual:
+        trechos.append(' '.join(atual))
+    return trechos
+
+def resumir_trechos(pasta_reuniao, trechos):
+    """
+    Resume cada trecho em paralelo, guardando cada resumo parcial em disco.
+    
+    Os resumos parciais ficam em resumos_parciais/<hash do trecho>.txt, então uma
+    nova tentativa só refaz os trechos que falharam.
+    
+    Returns:
+        list[str]: Resumos parciais na ordem dos trechos
+        
+    Raises:
+        Exception: Primeiro erro encontrado, depois que todos os trechos foram processados
+    """
+    pasta_parciais = pasta_reuniao / 'resumos_parciais'
+    pasta_parciais.mkdir(exist_ok=True)
+    total = len(trechos)
+
+    def resume_trecho(indice, trecho):
+        chave = hashlib.sha256(f'{indice}/{total}:{trecho}'.encode('utf-8')).hexdigest()[:16]
+        caminho = pasta_parciais / f'{chave}.txt'
+        resumo_trecho = le_arquivo(caminho)
+        if resumo_trecho != '':
+            logger.debug(f"Resumo do trecho {indice}/{total} reaproveitado do cache")
+            return resumo_trecho
+        resumo_trecho = gerar_resposta_openai(PROMPT_TRECHO.format(indice, total, trecho))
+        salva_arquivo(caminho, resumo_trecho)
+        return resumo_trecho
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS_RESUMO) as executor:
+        futuros = [executor.submit(resume_trecho, i, trecho)
+                   for i, trecho in enumerate(trechos, start=1)]
+    
+    resumos, erros = [], []
+    for i, futuro in enumerate(futuros, start=1):
+        try:
+            resumos.append(futuro.result())
+        except Exception as e:
+            logger.error(f"Erro ao resumir trecho {i}/{total}: {e}")
+            erros.append(e)
+    if erros:
+        logger.warning(f"{len(erros)} de {total} trecho(s) falharam; os demais ficaram em cache")
+        raise erros[0]
+    return resumos
+
+def consolidar_resumos(resumos_trechos):
+    """
+    Junta os resumos parciais no formato final "Resumo reunião / Acordos da Reunião".
+    
+    Se os resumos parciais não couberem em um único pedido, eles são agrupados
+    e resumidos novamente até caberem (redução hierárquica).
+    """
+    texto = '\n\n'.join(resumos_trechos)
+    while conta_tokens(texto) > MAX_TOKENS_TRECHO and len(resumos_trechos) > 1:
+        grupos = divide_em_trechos(texto)
+        if len(grupos) >= len(resumos_trechos):
+            break
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS_RESUMO) as executor:
+            resumos_trechos = list(executor.map(
+                lambda args: gerar_resposta_openai(PROMPT_TRECHO.format(args[0], len(grupos), args[1])),
+                enumerate(grupos, start=1)
+            ))
+        texto = '\n\n'.join(resumos_trechos)
+    return gerar_resposta_openai(PROMPT_CONSOLIDACAO.format(texto))
+
+
+# TAB BUSCAR =====================
+def tab_buscar():
+    consulta = st.text_input('Buscar nas reuniões',
+                             placeholder='ex.: prazo do projeto')
+    if not consulta:
+        return
+    inicio = time.perf_counter()
+    resultados = obter_indice_busca().busca(consulta)
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    st.caption(f'{len(resultados)} resultado(s) em {duracao_ms:.0f} ms')
+    catalogo = obter_catalogo()
+    nomes_campos = {'titulo': 'Título', 'resumo': 'Resumo', 'transcricao': 'Transcrição'}
+    for resultado in resultados:
+        reuniao = catalogo.obtem(resultado['reuniao'])
+        rotulo = catalogo.rotulo(reuniao) if reuniao else resultado['reuniao']
+        st.markdown(f"**{rotulo}** · {nomes_campos[resultado['campo']]}")
+        st.markdown(f"> {resultado['trecho']}")
 
 
 # TAB IMPORTAR GOOGLE MEET =====================
+@st.cache_resource
+def obter_manutencao_audio():
+    """Manutenção do áudio (temporários, recodificação e pasta fria) em segundo plano."""
+    manutencao = ManutencaoAudio(PASTA_ARQUIVOS)
+    manutencao.inicia()
+    return manutencao
+
+@st.cache_resource
+def obter_diarizador():
+    """Diarização das gravações em segundo plano, compartilhada por todas as sessões."""
+    return Diarizador()
+
+@st.cache_resource
+def obter_fila_importacao():
+    """
+    Fila de importação do processo, compartilhada por todas as sessões.
+
+    Os callbacks rodam nas threads da fila, então recebem catálogo e índice já
+    criados aqui. Envios de uma execução anterior do app (que não terminaram)
+    são apagados: os jobs deles não existem mais.
+    """
+    shutil.rmtree(PASTA_UPLOADS_IMPORTACAO, ignore_errors=True)
+    backend = obter_backend_transcricao()
+    registra = partial(registra_reuniao, catalogo=obter_catalogo(), indice=obter_indice_busca())
+    fila = FilaImportacao(PASTA_ARQUIVOS, backend.transcreve_em_lote, resume_importacao, registra)
+    fila.inicia_limpeza()
+    return fila
+
+def pasta_importacao_servidor(caminho):
+    """
+    Pasta do servidor dentro de PASTA_IMPORTACAO_SERVIDOR (.env), ou None.
+
+    Sem a variável, a importação por pasta fica desativada; caminhos que saem
+    da raiz configurada (.., links simbólicos, absolutos) são recusados.
+    """
+    raiz = os.getenv('PASTA_IMPORTACAO_SERVIDOR')
+    if not raiz:
+        return None
+    raiz = Path(raiz).resolve()
+    pasta = (raiz / caminho).resolve()
+    if not pasta.is_relative_to(raiz) or not pasta.is_dir():
+        return None
+    return pasta
+
 def tab_importar_google_meet():
     """
-    Aba para importar transcrições do Google Meet.
+    Aba para importar gravações e transcrições do Google Meet em lote.
     """
     st.markdown("### 📥 Importar do Google Meet")
-    st.info("Esta funcionalidade está sendo desenvolvida!")
-    st.markdown("Em breve você poderá importar transcrições do Google Meet aqui.")
+    st.markdown("Envie gravações de áudio ou transcrições exportadas do Meet "
+                "(.txt, .vtt, .srt, .sbv). Cada arquivo vira uma reunião.")
+    extensoes = sorted(e.lstrip('.') for e in EXTENSOES_AUDIO | EXTENSOES_TRANSCRICAO)
+    arquivos = st.file_uploader('Arquivos', type=extensoes, accept_multiple_files=True)
+    pasta_local = ''
+    if os.getenv('PASTA_IMPORTACAO_SERVIDOR'):
+        pasta_local = st.text_input('Ou importe todos os arquivos de uma subpasta de '
+                                    f'{os.getenv("PASTA_IMPORTACAO_SERVIDOR")}',
+                                    placeholder='gravacoes/2024')
+    if st.button('Importar'):
+        fila = obter_fila_importacao()
+        if arquivos:
+            caminhos = []
+            for arquivo in arquivos:
+                # Uma pasta de nome único por arquivo: dois envios com o mesmo nome não se
+                # sobrescrevem, e o nome original continua sendo o título da reunião
+                caminho = PASTA_UPLOADS_IMPORTACAO / uuid.uuid4().hex / Path(arquivo.name).name
+                caminho.parent.mkdir(parents=True)
+                caminho.write_bytes(arquivo.getbuffer())
+                caminhos.append(caminho)
+            jobs = fila.importa(caminhos, remove_arquivos=True)
+            st.success(f'{len(jobs)} arquivo(s) enviado(s) para importação.')
+        if pasta_local:
+            pasta = pasta_importacao_servidor(pasta_local)
+            if pasta is None:
+                st.error('Pasta não encontrada dentro da pasta de importação do servidor.')
+            else:
+                jobs = fila.importa_pasta(pasta)
+                st.success(f'{len(jobs)} arquivo(s) da pasta enviado(s) para importação.')
+    mostra_progresso_importacao()
+
+@st.fragment(run_every=2)
+def mostra_progresso_importacao():
+    """Progresso dos jobs de importação, atualizado a cada 2 segundos sem rerun da página."""
+    jobs = obter_fila_importacao().lista()
+    if not jobs:
+        return
+    pendentes = sum(not job.concluido for job in jobs)
+    st.caption(f'{pendentes} importação(ões) em andamento de {len(jobs)}')
+    for job in jobs[-50:]:
+        if job.erro:
+            st.error(f'{job.arquivo.name}: {job.erro}')
+        else:
+            st.progress(job.progresso, text=f'{job.arquivo.name} — {job.etapa}')
 
 # MAIN =====================
 def main():
     st.header('Bem-vindo ao MeetGPT 🎙️', divider=True)
-    tab_gravar, tab_selecao, tab_importar = st.tabs([
+    backend = obter_backend_transcricao()  # carrega o modelo local antes da gravação
+    if backend.erro_carregamento:
+        st.error(f'Não foi possível usar o backend de transcrição configurado ({backend.erro_carregamento}). '
+                 'As transcrições estão usando a API OpenAI.')
+    obter_manutencao_audio()
+    with st.sidebar:
+        mostra_painel_latencia(st.empty())
+        stats = cache_openai.estatisticas()
+        if stats['ativo']:
+            st.caption(f"Cache OpenAI: {stats['acertos']} acertos, {stats['falhas']} falhas "
+                       f"({stats['taxa_acerto']:.0%})")
+        else:
+            st.caption('Cache OpenAI desativado')
+        for operacao, metricas in cliente_api.metricas().items():
+            if isinstance(metricas, dict) and 'latencia_p50' in metricas:
+                st.caption(f"{operacao}: {metricas.get('chamadas', 0)} chamadas, "
+                           f"p50 {metricas['latencia_p50']:.2f}s, p95 {metricas['latencia_p95']:.2f}s")
+    tab_gravar, tab_selecao, tab_busca, tab_importar = st.tabs([
     'Gravar Reunião', 
     'Ver transcrições salvas',
+    'Buscar',
     'Importar do Google Meet'  # ← Nova aba!
 ])
+    with tab_busca:
+        tab_buscar()
     with tab_importar:
         tab_importar_google_meet()
     with tab_gravar:
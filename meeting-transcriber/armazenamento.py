@@ -0,0 +1,191 @@
+"""
+Leitura e escrita dos arquivos de texto das reuniões.
+
+Tudo é gravado em UTF-8. Arquivos antigos em outros encodings são convertidos
+uma única vez por migra_arquivos() (ou na primeira leitura que falhar em UTF-8),
+e o encoding original fica registrado no encodings.json da pasta da reunião.
+Assim cada leitura é uma única decodificação, e o conteúdo fica em memória
+enquanto o mtime do arquivo não mudar (os reruns do Streamlit não releem o disco).
+"""
+from pathlib import Path
+from collections import OrderedDict
+import os
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Encodings tentados, em ordem, ao converter arquivos antigos
+ENCODINGS_LEGADOS = ['utf-8', 'windows-1252', 'iso-8859-1', 'latin-1']
+ARQUIVO_ENCODINGS = 'encodings.json'
+MAX_CARACTERES_CACHE = 50_000_000
+
+_cache = OrderedDict()  # caminho -> (mtime_ns, tamanho, conteudo)
+_caracteres_cache = 0
+_lock = threading.Lock()
+
+
+def salva_arquivo(caminho_arquivo, conteudo):
+    """Salva arquivo com encoding UTF-8"""
+    caminho_arquivo = Path(caminho_arquivo)
+    with open(caminho_arquivo, 'w', encoding='utf-8') as f:
+        f.write(conteudo)
+    _guarda_cache(caminho_arquivo, conteudo)
+
+def anexa_arquivo(caminho_arquivo, conteudo):
+    """Acrescenta conteúdo ao final do arquivo (UTF-8) sem reescrevê-lo."""
+    caminho_arquivo = Path(caminho_arquivo)
+    with _lock:
+        anterior = _cache.get(str(caminho_arquivo))
+    try:
+        stat = caminho_arquivo.stat()
+    except FileNotFoundError:
+        stat = None
+    with open(caminho_arquivo, 'a', encoding='utf-8') as f:
+        f.write(conteudo)
+    # Só aproveita o cache se ele correspondia ao arquivo antes do acréscimo
+    if anterior is not None and stat is not None \
+            and anterior[:2] == (stat.st_mtime_ns, stat.st_size):
+        _guarda_cache(caminho_arquivo, anterior[2] + conteudo)
+
+def le_arquivo(caminho_arquivo):
+    """
+    Lê arquivo UTF-8, usando o cache em memória se o arquivo não mudou.
+
+    Se o arquivo não for UTF-8 válido (arquivo antigo ainda não migrado),
+    ele é convertido para UTF-8 antes de ser retornado.
+    """
+    caminho_arquivo = Path(caminho_arquivo)
+    try:
+        stat = caminho_arquivo.stat()
+    except FileNotFoundError:
+        return ''
+    except OSError as e:
+        logger.error(f"Erro ao ler arquivo {caminho_arquivo}: {e}")
+        return ''
+
+    chave = str(caminho_arquivo)
+    with _lock:
+        em_cache = _cache.get(chave)
+        if em_cache is not None and em_cache[:2] == (stat.st_mtime_ns, stat.st_size):
+            _cache.move_to_end(chave)
+            return em_cache[2]
+
+    try:
+        dados = caminho_arquivo.read_bytes()
+    except OSError as e:
+        logger.error(f"Erro ao ler arquivo {caminho_arquivo}: {e}")
+        return ''
+    try:
+        conteudo = dados.decode('utf-8')
+    except UnicodeDecodeError:
+        conteudo = _migra(caminho_arquivo, dados)
+        if conteudo is None:
+            return dados.decode('utf-8', errors='replace')
+        return conteudo
+    _guarda_cache(caminho_arquivo, conteudo, stat)
+    return conteudo
+
+def decodifica(dados):
+    """
+    Decodifica bytes com o primeiro encoding de ENCODINGS_LEGADOS que servir.
+
+    Para arquivos de fora das reuniões (importação), que não podem ser regravados.
+    """
+    encoding = _detecta_encoding(dados)
+    conteudo = dados.decode(encoding) if encoding else dados.decode('utf-8', errors='replace')
+    return conteudo.removeprefix('\ufeff')  # BOM de arquivos exportados no Windows
+
+def migra_arquivos(pasta_arquivos):
+    """
+    Converte para UTF-8 todos os .txt das reuniões que estiverem em outro encoding.
+
+    Pastas já migradas (com encodings.json) são ignoradas, então a função pode
+    ser chamada a cada início da aplicação.
+
+    Returns:
+        int: Número de arquivos convertidos
+    """
+    convertidos = 0
+    for pasta_reuniao in Path(pasta_arquivos).iterdir():
+        if not pasta_reuniao.is_dir() or (pasta_reuniao / ARQUIVO_ENCODINGS).exists():
+            continue
+        encodings = {}
+        for caminho in pasta_reuniao.glob('*.txt'):
+            dados = caminho.read_bytes()
+            try:
+                dados.decode('utf-8')
+                encodings[caminho.name] = {'encoding': 'utf-8', 'encoding_original': 'utf-8'}
+            except UnicodeDecodeError:
+                if _migra(caminho, dados, registrar=False) is not None:
+                    encodings[caminho.name] = {'encoding': 'utf-8',
+                                               'encoding_original': _detecta_encoding(dados)}
+                    convertidos += 1
+        _salva_encodings(pasta_reuniao, encodings)
+    if convertidos:
+        logger.info(f"Migração de encoding: {convertidos} arquivo(s) convertido(s) para UTF-8")
+    return convertidos
+
+def _detecta_encoding(dados):
+    for encoding in ENCODINGS_LEGADOS:
+        try:
+            dados.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return None
+
+def _migra(caminho_arquivo, dados, registrar=True):
+    """Regrava o arquivo em UTF-8 e retorna o conteúdo, ou None se não for possível."""
+    encoding = _detecta_encoding(dados)
+    if encoding is None:
+        logger.warning(f"Encoding de {caminho_arquivo.name} não reconhecido; mantido como está")
+        return None
+    conteudo = dados.decode(encoding)
+    try:
+        caminho_tmp = caminho_arquivo.with_suffix(caminho_arquivo.suffix + '.tmp')
+        with open(caminho_tmp, 'w', encoding='utf-8') as f:
+            f.write(conteudo)
+        os.replace(caminho_tmp, caminho_arquivo)
+    except OSError as e:
+        logger.error(f"Erro ao converter {caminho_arquivo} para UTF-8: {e}")
+        return conteudo
+    logger.info(f"Arquivo {caminho_arquivo.name} convertido de {encoding} para UTF-8")
+    if registrar:
+        pasta_reuniao = caminho_arquivo.parent
+        caminho_encodings = pasta_reuniao / ARQUIVO_ENCODINGS
+        encodings = json.loads(caminho_encodings.read_text(encoding='utf-8')) \
+            if caminho_encodings.exists() else {}
+        encodings[caminho_arquivo.name] = {'encoding': 'utf-8', 'encoding_original': encoding}
+        _salva_encodings(pasta_reuniao, encodings)
+    _guarda_cache(caminho_arquivo, conteudo)
+    return conteudo
+
+def _salva_encodings(pasta_reuniao, encodings):
+    with open(pasta_reuniao / ARQUIVO_ENCODINGS, 'w', encoding='utf-8') as f:
+        json.dump(encodings, f, ensure_ascii=False, indent=2)
+
+def _guarda_cache(caminho_arquivo, conteudo, stat=None):
+    global _caracteres_cache
+    try:
+        stat = stat or caminho_arquivo.stat()
+    except OSError:
+        return
+    chave = str(caminho_arquivo)
+    with _lock:
+        anterior = _cache.pop(chave, None)
+        if anterior is not None:
+            _caracteres_cache -= len(anterior[2])
+        _cache[chave] = (stat.st_mtime_ns, stat.st_size, conteudo)
+        _caracteres_cache += len(conteudo)
+        while _caracteres_cache > MAX_CARACTERES_CACHE and len(_cache) > 1:
+            _, (_, _, removido) = _cache.popitem(last=False)
+            _caracteres_cache -= len(removido)
+
+
+if __name__ == '__main__':
+    # Migração avulsa: python armazenamento.py
+    logging.basicConfig(level=logging.INFO)
+    total = migra_arquivos(Path(__file__).parent / 'arquivos')
+    print(f'{total} arquivo(s) convertido(s) para UTF-8')
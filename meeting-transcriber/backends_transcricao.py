@@ -0,0 +1,153 @@
+"""
+Backends de transcrição usados por transcreve_audio().
+
+- 'openai': API Whisper (whisper-1), via ClienteResiliente
+- 'local': faster-whisper na CPU com modelo quantizado em int8, sem rede
+
+O backend é escolhido por TRANSCRICAO_BACKEND no .env. O modelo local é
+carregado uma vez na inicialização (carrega()) e as transcrições em lote usam
+um pool de threads dimensionado pelo número de núcleos.
+"""
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+
+class BackendTranscricao:
+    """Interface dos backends. Subclasses implementam _transcreve() e parametros()."""
+
+    nome = ''
+    erro_carregamento = None  # por que o backend configurado não pôde ser usado, se este é o substituto
+
+    def __init__(self, cache=None):
+        self.cache = cache
+
+    def parametros(self):
+        """Modelo e opções que influenciam o resultado (entram na chave do cache)."""
+        raise NotImplementedError
+
+    def carrega(self):
+        """Prepara o backend antes da primeira transcrição (ex.: carregar o modelo)."""
+
+    def max_workers(self):
+        """Quantas transcrições em paralelo fazem sentido para este backend."""
+        return 4
+
+    def transcreve(self, caminho_audio):
+        chave_cache = None
+        if self.cache is not None:
+            with open(caminho_audio, "rb") as audio_file:
+                chave_cache = self.cache.chave('transcricao', self.parametros(), audio_file.read())
+            texto_cache = self.cache.obter(chave_cache)
+            if texto_cache is not None:
+                logger.info("Transcrição obtida do cache")
+                return texto_cache
+        texto = self._transcreve(caminho_audio)
+        if chave_cache is not None:
+            self.cache.salvar(chave_cache, texto)
+        return texto
+
+    def transcreve_em_lote(self, caminhos_audio, progresso=None):
+        """
+        Transcreve vários arquivos em paralelo, mantendo a ordem de entrada.
+
+        Args:
+            progresso: função(concluídos, total) chamada a cada arquivo transcrito
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers()) as executor:
+            futuros = [executor.submit(self.transcreve, caminho) for caminho in caminhos_audio]
+            if progresso is not None:
+                for concluidos, _ in enumerate(as_completed(futuros), start=1):
+                    progresso(concluidos, len(futuros))
+            return [futuro.result() for futuro in futuros]
+
+    def _transcreve(self, caminho_audio):
+        raise NotImplementedError
+
+
+class BackendOpenAI(BackendTranscricao):
+
+    nome = 'openai'
+
+    def __init__(self, cliente, cache=None, modelo='whisper-1'):
+        super().__init__(cache)
+        self.cliente = cliente
+        self.modelo = modelo
+
+    def parametros(self):
+        return {'model': self.modelo}
+
+    def _transcreve(self, caminho_audio):
+        return self.cliente.transcreve(caminho_audio, **self.parametros())
+
+
+class BackendLocal(BackendTranscricao):
+    """
+    faster-whisper (CTranslate2) na CPU.
+
+    O modelo é compartilhado entre as threads: cpu_threads define as threads de
+    cada transcrição e num_workers quantas transcrições rodam ao mesmo tempo,
+    de forma que as duas juntas ocupem os núcleos disponíveis.
+    """
+
+    nome = 'local'
+
+    def __init__(self, cache=None, modelo=None, compute_type='int8', idioma='pt', cpu_threads=None):
+        super().__init__(cache)
+        self.modelo = modelo or os.getenv('TRANSCRICAO_MODELO_LOCAL', 'small')
+        self.compute_type = compute_type
+        self.idioma = idioma
+        nucleos = os.cpu_count() or 1
+        self.cpu_threads = cpu_threads or int(os.getenv('TRANSCRICAO_THREADS', min(4, nucleos)))
+        self.num_workers = max(1, nucleos // self.cpu_threads)
+        self._whisper = None
+
+    def parametros(self):
+        return {'backend': 'faster-whisper', 'model': self.modelo,
+                'compute_type': self.compute_type, 'language': self.idioma}
+
+    def max_workers(self):
+        return self.num_workers
+
+    def carrega(self):
+        if self._whisper is not None:
+            return
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise RuntimeError(
+                "Backend local requer o pacote faster-whisper (pip install faster-whisper)"
+            ) from e
+        logger.info(f"Carregando modelo local {self.modelo} ({self.compute_type}, "
+                    f"{self.cpu_threads} threads x {self.num_workers} workers)")
+        self._whisper = WhisperModel(self.modelo, device='cpu', compute_type=self.compute_type,
+                                     cpu_threads=self.cpu_threads, num_workers=self.num_workers)
+
+    def _transcreve(self, caminho_audio):
+        self.carrega()
+        segmentos, _ = self._whisper.transcribe(str(caminho_audio), language=self.idioma,
+                                                beam_size=1, vad_filter=True)
+        return ''.join(segmento.text for segmento in segmentos).strip()
+
+
+BACKENDS = {
+    BackendOpenAI.nome: BackendOpenAI,
+    BackendLocal.nome: BackendLocal,
+}
+
+
+def cria_backend(nome=None, cliente=None, cache=None):
+    """
+    Cria o backend configurado (TRANSCRICAO_BACKEND, padrão 'openai').
+
+    Raises:
+        ValueError: Se o nome não for um backend conhecido
+    """
+    nome = nome or os.getenv('TRANSCRICAO_BACKEND', 'openai')
+    if nome not in BACKENDS:
+        raise ValueError(f"Backend de transcrição desconhecido: {nome}. Opções: {', '.join(BACKENDS)}")
+    if nome == BackendOpenAI.nome:
+        return BackendOpenAI(cliente, cache)
+    return BACKENDS[nome](cache)
@@ -0,0 +1,116 @@
+"""
+Compara o fator de tempo real (RTF) dos backends de transcrição.
+
+RTF = tempo de transcrição / duração do áudio; abaixo de 1 o backend acompanha
+a gravação ao vivo. Usa o áudio das reuniões em arquivos/, cortados em
+chunks do mesmo tamanho usado na gravação, sem passar pelo cache.
+
+Uso:
+    python benchmark_transcricao.py                  # todos os backends
+    python benchmark_transcricao.py --backends local --chunk 5 --max-chunks 20
+"""
+from pathlib import Path
+import argparse
+import json
+import tempfile
+import time
+import logging
+
+import pydub
+from dotenv import load_dotenv, find_dotenv
+
+from backends_transcricao import BACKENDS, cria_backend
+from cliente_openai import obter_cliente
+from manutencao_audio import localiza_audio
+
+PASTA_ARQUIVOS = Path(__file__).parent / 'arquivos'
+
+
+def corta_chunks(caminho_audio, pasta_saida, segundos_chunk, max_chunks):
+    audio = pydub.AudioSegment.from_file(caminho_audio)
+    passo = int(segundos_chunk * 1000)
+    chunks = []
+    for i, inicio in enumerate(range(0, len(audio), passo)):
+        if max_chunks and i >= max_chunks:
+            break
+        caminho_chunk = Path(pasta_saida) / f'{Path(caminho_audio).parent.name}_{i:04d}.mp3'
+        trecho = audio[inicio:inicio + passo]
+        trecho.export(caminho_chunk)
+        chunks.append((caminho_chunk, len(trecho) / 1000))
+    return chunks
+
+
+def mede_backend(backend, chunks, paralelo):
+    inicio_carga = time.perf_counter()
+    backend.carrega()
+    tempo_carga = time.perf_counter() - inicio_carga
+
+    caminhos = [caminho for caminho, _ in chunks]
+    duracao_total = sum(duracao for _, duracao in chunks)
+    latencias = []
+    inicio = time.perf_counter()
+    if paralelo:
+        backend.transcreve_em_lote(caminhos)
+    else:
+        for caminho in caminhos:
+            inicio_chunk = time.perf_counter()
+            backend.transcreve(caminho)
+            latencias.append(time.perf_counter() - inicio_chunk)
+    tempo_total = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        'backend': backend.nome,
+        'parametros': backend.parametros(),
+        'modo': 'paralelo' if paralelo else 'sequencial',
+        'chunks': len(chunks),
+        'audio_segundos': round(duracao_total, 2),
+        'tempo_carga_segundos': round(tempo_carga, 2),
+        'tempo_total_segundos': round(tempo_total, 2),
+        'rtf': round(tempo_total / duracao_total, 3) if duracao_total else None,
+        'latencia_p50_segundos': round(latencias[len(latencias) // 2], 3) if latencias else None,
+        'latencia_p95_segundos': round(latencias[int(len(latencias) * 0.95)], 3) if latencias else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument('--chunk', type=float, default=5.0, help='Segundos por chunk (padrão: 5)')
+    parser.add_argument('--max-chunks', type=int, default=12, help='Chunks por reunião (0 = todos)')
+    parser.add_argument('--paralelo', action='store_true', help='Usa transcreve_em_lote()')
+    parser.add_argument('--saida', default='benchmark_transcricao.json')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    load_dotenv(find_dotenv())
+
+    audios = [caminho for caminho in map(localiza_audio, sorted(PASTA_ARQUIVOS.iterdir())) if caminho]
+    if not audios:
+        raise SystemExit(f'Nenhum áudio de reunião encontrado em {PASTA_ARQUIVOS}')
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as pasta_tmp:
+        chunks = []
+        for caminho_audio in audios:
+            chunks += corta_chunks(caminho_audio, pasta_tmp, args.chunk, args.max_chunks)
+        print(f'{len(chunks)} chunk(s) de {args.chunk:.0f}s de {len(audios)} reunião(ões)')
+
+        for nome in args.backends:
+            cliente = obter_cliente() if nome == 'openai' else None
+            backend = cria_backend(nome, cliente=cliente, cache=None)  # sem cache: mede o backend
+            try:
+                resultado = mede_backend(backend, chunks, args.paralelo)
+            except Exception as e:
+                print(f'{nome}: falhou ({e})')
+                continue
+            resultados.append(resultado)
+            print(f"{nome:>8}: RTF {resultado['rtf']}  total {resultado['tempo_total_segundos']}s  "
+                  f"carga {resultado['tempo_carga_segundos']}s  p50 {resultado['latencia_p50_segundos']}s")
+
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    print(f'Resultados salvos em {args.saida}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""
+Índice de busca textual (SQLite FTS5) sobre títulos, resumos e transcrições.
+
+A busca ignora acentos e maiúsculas (tokenizer unicode61 com remove_diacritics),
+então "reuniao" encontra "Reunião". A transcrição é indexada em partes: durante a
+gravação só o trecho novo é incluído, e cada parte vira um resultado com o seu
+próprio trecho destacado.
+
+Uma consulta com várias palavras encontra primeiro as partes que têm todas
+elas; depois, com pontuação menor, as reuniões em que as palavras aparecem
+espalhadas por partes diferentes da transcrição.
+"""
+from pathlib import Path
+import re
+import hashlib
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+from segmentos import normaliza
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_PARTE = 1000  # caracteres por parte da transcrição indexada
+PESOS_CAMPOS = (10.0, 4.0, 1.0)  # título, resumo, transcrição
+CARACTERES_CONFERIDOS = 256  # final do trecho já indexado conferido a cada acréscimo
+
+
+def _divide_partes(texto, tamanho=TAMANHO_PARTE):
+    """Divide o texto em partes de ~tamanho caracteres sem cortar palavras."""
+    partes = []
+    while len(texto) > tamanho:
+        corte = texto.rfind(' ', 0, tamanho)
+        if corte <= 0:
+            corte = tamanho
+        partes.append(texto[:corte])
+        texto = texto[corte:]
+    if texto.strip():
+        partes.append(texto)
+    return partes
+
+
+def _hash_final(texto, fim):
+    """Hash dos CARACTERES_CONFERIDOS caracteres que terminam em fim."""
+    trecho = texto[max(0, fim - CARACTERES_CONFERIDOS):fim]
+    return hashlib.sha1(trecho.encode('utf-8')).hexdigest()
+
+
+_SELECT_RESULTADOS = f'''
+    SELECT reuniao,
+           CASE WHEN titulo != '' THEN 'titulo'
+                WHEN resumo != '' THEN 'resumo'
+                ELSE 'transcricao' END,
+           snippet(documentos, -1, '**', '**', '…', 16),
+           bm25(documentos, 0, {PESOS_CAMPOS[0]}, {PESOS_CAMPOS[1]}, {PESOS_CAMPOS[2]}) AS pontuacao
+    FROM documentos
+'''
+
+
+class IndiceBusca:
+
+    def __init__(self, caminho_db):
+        self.caminho_db = Path(caminho_db)
+        self._lock = threading.Lock()
+        with self._conecta() as conexao:
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS documentos USING fts5(
+                    reuniao UNINDEXED, titulo, resumo, transcricao,
+                    tokenize = "unicode61 remove_diacritics 2"
+                )
+            ''')
+            # Quanto de cada arquivo já foi indexado, para indexar só o que mudou
+            conexao.execute('''
+                CREATE TABLE IF NOT EXISTS indexados (
+                    reuniao TEXT NOT NULL,
+                    campo TEXT NOT NULL,
+                    caracteres INTEGER NOT NULL,
+                    mtime REAL,
+                    hash TEXT,
+                    PRIMARY KEY (reuniao, campo)
+                )
+            ''')
+            colunas = {c[1] for c in conexao.execute('PRAGMA table_info(indexados)')}
+            if 'hash' not in colunas:
+                # Índice criado antes da coluna: sem hash, a transcrição é reindexada na próxima vez
+                conexao.execute('ALTER TABLE indexados ADD COLUMN hash TEXT')
+
+    @contextmanager
+    def _conecta(self):
+        conexao = sqlite3.connect(self.caminho_db, timeout=10)
+        try:
+            with conexao:
+                yield conexao
+        finally:
+            conexao.close()
+
+    def indexa_campo(self, reuniao, campo, texto, mtime=None):
+        """Substitui o título ou o resumo indexado da reunião."""
+        if campo not in ('titulo', 'resumo'):
+            raise ValueError(f"Campo inválido: {campo}")
+        with self._lock, self._conecta() as conexao:
+            conexao.execute(f"DELETE FROM documentos WHERE reuniao = ? AND {campo} != ''", (reuniao,))
+            if texto:
+                conexao.execute(
+                    "INSERT INTO documentos (reuniao, titulo, resumo, transcricao) VALUES (?, ?, ?, '')",
+                    (reuniao, texto if campo == 'titulo' else '', texto if campo == 'resumo' else ''))
+            self._marca_indexado(conexao, reuniao, campo, len(texto), mtime)
+
+    def indexa_transcricao(self, reuniao, transcricao, mtime=None):
+        """
+        Indexa só a parte da transcrição que ainda não está no índice.
+
+        O índice guarda quantos caracteres já indexou e o hash dos últimos
+        CARACTERES_CONFERIDOS deles, então cada acréscimo custa o tamanho do
+        trecho novo, não o da reunião. Se o trecho conferido mudou (arquivo
+        reescrito: qualquer inserção ou remoção antes dele o desloca), a
+        transcrição é indexada de novo por inteiro.
+        """
+        with self._lock, self._conecta() as conexao:
+            linha = conexao.execute(
+                "SELECT caracteres, hash FROM indexados WHERE reuniao = ? AND campo = 'transcricao'",
+                (reuniao,)).fetchone()
+            inicio, hash_indexado = linha if linha else (0, None)
+            if inicio and (inicio > len(transcricao) or _hash_final(transcricao, inicio) != hash_indexado):
+                conexao.execute("DELETE FROM documentos WHERE reuniao = ? AND transcricao != ''", (reuniao,))
+                inicio = 0
+            novo = transcricao[inicio:]
+            if novo.strip():
+                conexao.executemany(
+                    "INSERT INTO documentos (reuniao, titulo, resumo, transcricao) VALUES (?, '', '', ?)",
+                    [(reuniao, parte) for parte in _divide_partes(novo)])
+            self._marca_indexado(conexao, reuniao, 'transcricao', len(transcricao), mtime,
+                                 _hash_final(transcricao, len(transcricao)))
+
+    def remove(self, reuniao):
+        with self._lock, self._conecta() as conexao:
+            conexao.execute('DELETE FROM documentos WHERE reuniao = ?', (reuniao,))
+            conexao.execute('DELETE FROM indexados WHERE reuniao = ?', (reuniao,))
+
+    def sincroniza(self, pasta_arquivos, le_arquivo):
+        """
+        Indexa arquivos novos ou alterados desde a última sincronização e
+        remove do índice as reuniões cuja pasta não existe mais.
+
+        Usa o mtime de cada arquivo para não reler o que já está no índice.
+
+        Returns:
+            int: Número de arquivos (re)indexados
+        """
+        with self._conecta() as conexao:
+            indexados = {(r, c): m for r, c, m in conexao.execute(
+                'SELECT reuniao, campo, mtime FROM indexados')}
+            no_indice = {r for r, in conexao.execute('SELECT DISTINCT reuniao FROM documentos')}
+        existentes = set()
+        alterados = 0
+        for pasta_reuniao in Path(pasta_arquivos).iterdir():
+            if pasta_reuniao.is_dir():
+                existentes.add(pasta_reuniao.name)
+                alterados += self.sincroniza_reuniao(pasta_reuniao, le_arquivo, indexados)
+        removidas = (no_indice | {r for r, _ in indexados}) - existentes
+        for reuniao in removidas:
+            self.remove(reuniao)
+        if removidas:
+            logger.info(f"Índice de busca: {len(removidas)} reunião(ões) apagada(s) removida(s)")
+        if alterados:
+            logger.info(f"Índice de busca: {alterados} arquivo(s) indexado(s)")
+        return alterados
+
+    def sincroniza_reuniao(self, pasta_reuniao, le_arquivo, indexados=None):
+        """Indexa os arquivos de uma reunião que mudaram desde a última indexação."""
+        if indexados is None:
+            with self._conecta() as conexao:
+                indexados = {(pasta_reuniao.name, c): m for c, m in conexao.execute(
+                    'SELECT campo, mtime FROM indexados WHERE reuniao = ?', (pasta_reuniao.name,))}
+        alterados = 0
+        for campo in ('titulo', 'resumo', 'transcricao'):
+            caminho = pasta_reuniao / f'{campo}.txt'
+            if not caminho.exists():
+                continue
+            mtime = caminho.stat().st_mtime
+            if indexados.get((pasta_reuniao.name, campo)) == mtime:
+                continue
+            texto = le_arquivo(caminho)
+            if campo == 'transcricao':
+                self.indexa_transcricao(pasta_reuniao.name, texto, mtime)
+            else:
+                self.indexa_campo(pasta_reuniao.name, campo, texto, mtime)
+            alterados += 1
+        return alterados
+
+    def busca(self, consulta, limite=20):
+        """
+        Busca as palavras da consulta (todas precisam aparecer; a última pode ser prefixo).
+
+        Primeiro vêm as partes (título, resumo ou trecho da transcrição) que
+        contêm todas as palavras. Se sobrar espaço no limite, entram as
+        reuniões que têm todas as palavras só somando partes diferentes, com
+        o trecho da parte mais relevante e pontuação abaixo das anteriores.
+
+        Returns:
+            list[dict]: Resultados ordenados por relevância, com reuniao, campo e trecho
+        """
+        palavras = re.findall(r'\w+', normaliza(consulta))
+        if not palavras:
+            return []
+        termos = [f'"{p}"' for p in palavras[:-1]] + [f'"{palavras[-1]}"*']
+        with self._conecta() as conexao:
+            linhas = conexao.execute(_SELECT_RESULTADOS + '''
+                WHERE documentos MATCH ?
+                ORDER BY pontuacao
+                LIMIT ?
+            ''', (' '.join(termos), limite)).fetchall()
+            resultados = [{'reuniao': r, 'campo': c, 'trecho': t, 'pontuacao': -p} for r, c, t, p in linhas]
+            if len(termos) == 1 or len(resultados) >= limite:
+                return resultados
+
+            # Palavras em partes diferentes: a reunião precisa ter cada uma em alguma parte
+            reunioes = None
+            for termo in termos:
+                com_termo = {r for r, in conexao.execute(
+                    'SELECT DISTINCT reuniao FROM documentos WHERE documentos MATCH ?', (termo,))}
+                reunioes = com_termo if reunioes is None else reunioes & com_termo
+            reunioes -= {r['reuniao'] for r in resultados}
+            piso = min((r['pontuacao'] for r in resultados), default=0.0)
+            espalhados = []
+            for reuniao in reunioes:
+                r, c, t, p = conexao.execute(_SELECT_RESULTADOS + '''
+                    WHERE documentos MATCH ? AND reuniao = ?
+                    ORDER BY pontuacao
+                    LIMIT 1
+                ''', (' OR '.join(termos), reuniao)).fetchone()
+                espalhados.append({'reuniao': r, 'campo': c, 'trecho': t, 'pontuacao': min(-p, piso)})
+        espalhados.sort(key=lambda r: r['pontuacao'], reverse=True)
+        return resultados + espalhados[:limite - len(resultados)]
+
+    @staticmethod
+    def _marca_indexado(conexao, reuniao, campo, caracteres, mtime, hash_texto=None):
+        conexao.execute('''
+            INSERT INTO indexados (reuniao, campo, caracteres, mtime, hash) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (reuniao, campo) DO UPDATE SET caracteres = excluded.caracteres,
+                                                       mtime = excluded.mtime,
+                                                       hash = excluded.hash
+        ''', (reuniao, campo, caracteres, mtime, hash_texto))
@@ -0,0 +1,184 @@
+"""
+Cache persistente de respostas da OpenAI.
+
+As respostas ficam em arquivos JSON, um por chave. A chave é o hash do tipo de
+chamada, do modelo, dos parâmetros e do conteúdo enviado (prompt ou bytes do
+áudio), então a mesma requisição nunca é paga duas vezes enquanto a entrada
+estiver dentro do TTL.
+"""
+from pathlib import Path
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+PASTA_CACHE = Path(__file__).parent / 'cache' / 'openai'
+
+class CacheOpenAI:
+    """
+    Cache em disco com expiração por TTL e remoção das entradas menos usadas
+    quando o tamanho total passa de max_bytes.
+    """
+
+    def __init__(self, pasta=PASTA_CACHE, ttl_segundos=None, max_bytes=None, ativo=None):
+        # Valores não informados vêm das variáveis de ambiente (.env)
+        if ativo is None:
+            ativo = os.getenv('CACHE_OPENAI_ATIVO', '1').lower() not in ('0', 'false', 'nao', 'não')
+        if ttl_segundos is None:
+            ttl_segundos = float(os.getenv('CACHE_OPENAI_TTL_DIAS', '30')) * 24 * 3600
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv('CACHE_OPENAI_MAX_MB', '200')) * 1024 * 1024)
+        self.pasta = Path(pasta)
+        self.ttl_segundos = ttl_segundos
+        self.max_bytes = max_bytes
+        self.ativo = ativo
+        self.acertos = 0
+        self.falhas = 0
+        self._lock = threading.Lock()
+        self._tamanho_total = None  # calculado na primeira escrita
+
+    @staticmethod
+    def chave(tipo, parametros, conteudo):
+        """
+        Gera a chave do cache.
+        
+        Args:
+            tipo: Tipo da chamada ('chat', 'transcricao')
+            parametros: Dicionário com modelo e parâmetros da chamada
+            conteudo: Prompt (str) ou bytes do áudio
+        """
+        if isinstance(conteudo, str):
+            conteudo = conteudo.encode('utf-8')
+        hash_conteudo = hashlib.sha256(conteudo).hexdigest()
+        cabecalho = json.dumps({'tipo': tipo, 'parametros': parametros}, sort_keys=True)
+        return hashlib.sha256(f'{cabecalho}:{hash_conteudo}'.encode('utf-8')).hexdigest()
+
+    def obter(self, chave):
+        """Retorna o valor guardado ou None se não existir, estiver expirado ou o cache estiver desativado."""
+        if not self.ativo:
+            return None
+        caminho = self.pasta / f'{chave}.json'
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                entrada = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.falhas += 1
+            return None
+        if time.time() - entrada.get('criado', 0) > self.ttl_segundos:
+            with self._lock:
+                self._remove_expirada(caminho)
+                self.falhas += 1
+            return None
+        try:
+            os.utime(caminho)  # marca como usado recentemente
+        except OSError:
+            pass
+        with self._lock:
+            self.acertos += 1
+        logger.debug(f"Cache OpenAI: acerto para {chave[:12]}")
+        return entrada['valor']
+
+    def salvar(self, chave, valor):
+        if not self.ativo:
+            return
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        caminho = self.pasta / f'{chave}.json'
+        conteudo = json.dumps({'criado': time.time(), 'valor': valor}, ensure_ascii=False)
+        caminho_tmp = None
+        try:
+            # Temporário com nome único: duas threads gravando a mesma chave não dividem o arquivo
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.pasta, prefix=f'{chave}.',
+                                             suffix='.tmp', delete=False) as f:
+                caminho_tmp = f.name
+                f.write(conteudo)
+            with self._lock:
+                # Sobrescrever uma chave troca o tamanho antigo pelo novo, não soma os dois
+                try:
+                    tamanho_anterior = caminho.stat().st_size
+                except FileNotFoundError:
+                    tamanho_anterior = 0
+                os.replace(caminho_tmp, caminho)
+                caminho_tmp = None
+                if self._tamanho_total is None:
+                    self._tamanho_total = sum(p.stat().st_size for p in self.pasta.glob('*.json'))
+                else:
+                    self._tamanho_total += caminho.stat().st_size - tamanho_anterior
+                if self._tamanho_total > self.max_bytes:
+                    self._remove_excedente()
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar no cache OpenAI: {e}")
+            if caminho_tmp is not None:
+                Path(caminho_tmp).unlink(missing_ok=True)
+
+    def limpar(self):
+        with self._lock:
+            for caminho in self.pasta.glob('*.json'):
+                self._remove(caminho)
+            self._tamanho_total = 0
+
+    def estatisticas(self):
+        total = self.acertos + self.falhas
+        return {
+            'ativo': self.ativo,
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'taxa_acerto': self.acertos / total if total else 0.0,
+        }
+
+    def _remove_excedente(self):
+        """Remove as entradas menos usadas até o cache caber em 90% do limite."""
+        entradas = []
+        for caminho in self.pasta.glob('*.json'):
+            try:
+                stat = caminho.stat()
+            except OSError:
+                continue
+            entradas.append((stat.st_mtime, stat.st_size, caminho))
+        entradas.sort()
+        tamanho = sum(tamanho for _, tamanho, _ in entradas)
+        limite = self.max_bytes * 0.9
+        removidas = 0
+        for _, tamanho_entrada, caminho in entradas:
+            if tamanho <= limite:
+                break
+            self._remove(caminho)
+            tamanho -= tamanho_entrada
+            removidas += 1
+        self._tamanho_total = tamanho
+        logger.info(f"Cache OpenAI: {removidas} entrada(s) removida(s) por limite de tamanho")
+
+    def _remove_expirada(self, caminho):
+        """Remove a entrada e desconta o tamanho dela do total (chamada com self._lock)."""
+        try:
+            tamanho = caminho.stat().st_size
+            caminho.unlink()
+        except OSError:
+            return  # outra thread já removeu ou sobrescreveu a entrada
+        if self._tamanho_total is not None:
+            self._tamanho_total -= tamanho
+
+    @staticmethod
+    def _remove(caminho):
+        try:
+            caminho.unlink()
+        except OSError:
+            pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obter_cache():
+    """Retorna o CacheOpenAI único do processo (as estatísticas sobrevivem aos reruns do Streamlit)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheOpenAI()
+        return _cache
@@ -0,0 +1,177 @@
+"""
+Catálogo das reuniões gravadas em SQLite.
+
+Evita varrer a pasta de arquivos e ler o titulo.txt de cada reunião a cada
+rerun do Streamlit. O catálogo é atualizado quando uma reunião é criada, quando
+o título muda e quando o resumo é gravado; pastas que ainda não estão nele
+(reuniões antigas ou copiadas à mão) são incluídas por sincroniza().
+"""
+from pathlib import Path
+from datetime import datetime
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+FORMATO_PASTA = '%Y_%m_%d_%H_%M_%S'
+
+
+def data_da_pasta(nome_pasta):
+    """Converte o nome da pasta (AAAA_MM_DD_HH_MM_SS) em datetime, ou None se não for uma data."""
+    try:
+        return datetime.strptime(nome_pasta, FORMATO_PASTA)
+    except ValueError:
+        return None
+
+
+class CatalogoReunioes:
+
+    def __init__(self, pasta_arquivos, caminho_db=None):
+        self.pasta_arquivos = Path(pasta_arquivos)
+        self.caminho_db = Path(caminho_db or self.pasta_arquivos / 'catalogo.sqlite3')
+        self._lock = threading.Lock()
+        self._cache_consultas = {}
+        self._versao = 0  # muda a cada alteração; consulta feita antes dela não entra no cache
+        with self._conecta() as conexao:
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('''
+                CREATE TABLE IF NOT EXISTS reunioes (
+                    id TEXT PRIMARY KEY,
+                    data TEXT,
+                    titulo TEXT NOT NULL DEFAULT '',
+                    tem_resumo INTEGER NOT NULL DEFAULT 0,
+                    atualizado_em TEXT
+                )
+            ''')
+            conexao.execute('CREATE INDEX IF NOT EXISTS idx_reunioes_data ON reunioes (data DESC, id DESC)')
+
+    @contextmanager
+    def _conecta(self):
+        conexao = sqlite3.connect(self.caminho_db, timeout=10)
+        try:
+            with conexao:  # commit ao final, rollback em caso de erro
+                yield conexao
+        finally:
+            conexao.close()
+
+    def registra(self, id_reuniao, titulo=None, tem_resumo=None):
+        """Inclui ou atualiza uma reunião. Campos None mantêm o valor atual."""
+        data = data_da_pasta(id_reuniao)
+        with self._lock, self._conecta() as conexao:
+            conexao.execute('INSERT OR IGNORE INTO reunioes (id, data) VALUES (?, ?)',
+                            (id_reuniao, data.isoformat() if data else None))
+            if titulo is not None:
+                conexao.execute('UPDATE reunioes SET titulo = ? WHERE id = ?', (titulo, id_reuniao))
+            if tem_resumo is not None:
+                conexao.execute('UPDATE reunioes SET tem_resumo = ? WHERE id = ?',
+                                (int(tem_resumo), id_reuniao))
+            conexao.execute('UPDATE reunioes SET atualizado_em = ? WHERE id = ?',
+                            (datetime.now().isoformat(), id_reuniao))
+            self._invalida_consultas()
+
+    def remove(self, id_reuniao):
+        with self._lock, self._conecta() as conexao:
+            conexao.execute('DELETE FROM reunioes WHERE id = ?', (id_reuniao,))
+            self._invalida_consultas()
+
+    def _invalida_consultas(self):
+        """Chamada com self._lock."""
+        self._cache_consultas.clear()
+        self._versao += 1
+
+    def sincroniza(self, le_arquivo):
+        """
+        Acerta o catálogo com as pastas existentes em disco.
+
+        Só lê o titulo.txt das pastas que ainda não estão no catálogo.
+
+        Args:
+            le_arquivo: Função usada para ler o titulo.txt
+
+        Returns:
+            tuple[int, int]: Reuniões incluídas e removidas
+        """
+        pastas = {p.name for p in self.pasta_arquivos.iterdir() if p.is_dir()}
+        with self._conecta() as conexao:
+            catalogadas = {linha[0] for linha in conexao.execute('SELECT id FROM reunioes')}
+        novas = pastas - catalogadas
+        removidas = catalogadas - pastas
+        for id_reuniao in novas:
+            pasta_reuniao = self.pasta_arquivos / id_reuniao
+            self.registra(id_reuniao,
+                          titulo=le_arquivo(pasta_reuniao / 'titulo.txt'),
+                          tem_resumo=(pasta_reuniao / 'resumo.txt').exists())
+        for id_reuniao in removidas:
+            self.remove(id_reuniao)
+        if novas or removidas:
+            logger.info(f"Catálogo sincronizado: {len(novas)} incluída(s), {len(removidas)} removida(s)")
+        return len(novas), len(removidas)
+
+    def lista(self, pagina=0, por_pagina=50, busca='', data_inicio=None, data_fim=None):
+        """
+        Lista reuniões da mais recente para a mais antiga.
+
+        Args:
+            pagina: Página (começa em 0)
+            por_pagina: Reuniões por página
+            busca: Trecho do título ou da data (AAAA/MM/DD) a procurar
+            data_inicio, data_fim: Intervalo de datas (date ou datetime), inclusivo
+
+        Returns:
+            tuple[list[dict], int]: Reuniões da página e total encontrado
+        """
+        chave = (pagina, por_pagina, busca, data_inicio, data_fim)
+        with self._lock:
+            if chave in self._cache_consultas:
+                return self._cache_consultas[chave]
+            versao = self._versao
+
+        condicoes, parametros = [], []
+        if busca:
+            # % e _ digitados são literais, não curingas do LIKE
+            termo = busca.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            condicoes.append("(titulo LIKE ? ESCAPE '\\' "
+                             "OR replace(substr(id, 1, 10), '_', '/') LIKE ? ESCAPE '\\')")
+            parametros += [f'%{termo}%', f'%{termo}%']
+        if data_inicio:
+            condicoes.append('data >= ?')
+            parametros.append(data_inicio.isoformat())
+        if data_fim:
+            condicoes.append('substr(data, 1, 10) <= ?')
+            parametros.append(data_fim.isoformat()[:10])
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ''
+
+        with self._conecta() as conexao:
+            conexao.row_factory = sqlite3.Row
+            total = conexao.execute(f'SELECT COUNT(*) FROM reunioes {where}', parametros).fetchone()[0]
+            linhas = conexao.execute(
+                f'SELECT id, data, titulo, tem_resumo FROM reunioes {where} '
+                f'ORDER BY data IS NULL, data DESC, id DESC LIMIT ? OFFSET ?',
+                parametros + [por_pagina, pagina * por_pagina]
+            ).fetchall()
+        resultado = ([dict(linha) for linha in linhas], total)
+        with self._lock:
+            if versao == self._versao:
+                if len(self._cache_consultas) > 256:
+                    self._cache_consultas.clear()
+                self._cache_consultas[chave] = resultado
+        return resultado
+
+    def obtem(self, id_reuniao):
+        """Retorna a reunião como dict, ou None se não estiver no catálogo."""
+        with self._conecta() as conexao:
+            conexao.row_factory = sqlite3.Row
+            linha = conexao.execute('SELECT id, data, titulo, tem_resumo FROM reunioes WHERE id = ?',
+                                    (id_reuniao,)).fetchone()
+        return dict(linha) if linha else None
+
+    @staticmethod
+    def rotulo(reuniao):
+        """Texto exibido para a reunião: 'AAAA/MM/DD HH:MM:SS - título'."""
+        data = data_da_pasta(reuniao['id'])
+        rotulo = data.strftime('%Y/%m/%d %H:%M:%S') if data else reuniao['id']
+        if reuniao['titulo']:
+            rotulo += f" - {reuniao['titulo']}"
+        return rotulo
@@ -0,0 +1,272 @@
+"""
+Cliente OpenAI compartilhado com limite de taxa, circuit breaker e retry único.
+
+Todas as sessões do Streamlit rodam no mesmo processo, então os limites de
+requisições e tokens por minuto são controlados aqui, por modelo, e valem
+para o processo inteiro. O SDK é criado com max_retries=0: as novas tentativas
+acontecem só neste módulo, dentro de um orçamento de tentativas e de tempo.
+"""
+import os
+import time
+import random
+import logging
+import threading
+from collections import defaultdict, deque
+
+from openai import OpenAI, APIError, RateLimitError, APIConnectionError, APITimeoutError, APIStatusError
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitoAbertoError(Exception):
+    """A API falhou repetidamente e as chamadas estão suspensas temporariamente."""
+
+
+class TokenBucket:
+    """Balde de fichas: permite rajadas até `capacidade` e repõe `capacidade` por minuto."""
+
+    def __init__(self, capacidade_por_minuto):
+        self.capacidade = float(capacidade_por_minuto)
+        self.taxa = self.capacidade / 60.0
+        self.fichas = self.capacidade
+        self.ultima_reposicao = time.monotonic()
+        self._lock = threading.Lock()
+
+    def adquirir(self, quantidade=1, timeout=None):
+        """
+        Bloqueia até haver fichas suficientes.
+
+        Returns:
+            float: Tempo de espera em segundos
+
+        Raises:
+            TimeoutError: Se a espera necessária passar de timeout
+        """
+        quantidade = min(float(quantidade), self.capacidade)
+        inicio = time.monotonic()
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self.fichas = min(self.capacidade,
+                                  self.fichas + (agora - self.ultima_reposicao) * self.taxa)
+                self.ultima_reposicao = agora
+                if self.fichas >= quantidade:
+                    self.fichas -= quantidade
+                    return agora - inicio
+                espera = (quantidade - self.fichas) / self.taxa
+            if timeout is not None and (time.monotonic() - inicio) + espera > timeout:
+                raise TimeoutError("Limite de taxa local excedido")
+            time.sleep(min(espera, 1.0))
+
+
+class CircuitBreaker:
+    """
+    Abre depois de `limite_falhas` falhas seguidas; após `tempo_recuperacao`
+    segundos deixa passar uma chamada de teste (meio aberto).
+    """
+
+    def __init__(self, limite_falhas=5, tempo_recuperacao=30.0):
+        self.limite_falhas = limite_falhas
+        self.tempo_recuperacao = tempo_recuperacao
+        self.falhas_seguidas = 0
+        self.aberto_desde = None
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self):
+        if self.aberto_desde is None:
+            return 'fechado'
+        if time.monotonic() - self.aberto_desde >= self.tempo_recuperacao:
+            return 'meio_aberto'
+        return 'aberto'
+
+    def permite(self):
+        with self._lock:
+            estado = self.estado
+            if estado == 'fechado':
+                return
+            if estado == 'meio_aberto' and not self._teste_em_andamento:
+                self._teste_em_andamento = True
+                return
+            restante = self.tempo_recuperacao - (time.monotonic() - self.aberto_desde)
+            raise CircuitoAbertoError(
+                f"API indisponível após {self.falhas_seguidas} falhas seguidas. "
+                f"Nova tentativa em {max(restante, 0):.0f}s."
+            )
+
+    def cancela_teste(self):
+        """A chamada liberada por permite() não chegou à API: o teste fica para a próxima."""
+        with self._lock:
+            self._teste_em_andamento = False
+
+    def registra_sucesso(self):
+        with self._lock:
+            self.falhas_seguidas = 0
+            self.aberto_desde = None
+            self._teste_em_andamento = False
+
+    def registra_falha(self):
+        with self._lock:
+            self.falhas_seguidas += 1
+            self._teste_em_andamento = False
+            if self.falhas_seguidas >= self.limite_falhas or self.aberto_desde is not None:
+                if self.aberto_desde is None:
+                    logger.error(f"Circuit breaker aberto após {self.falhas_seguidas} falhas seguidas")
+                self.aberto_desde = time.monotonic()
+
+
+class ClienteResiliente:
+    """
+    Encapsula o cliente OpenAI com limite de taxa, circuit breaker,
+    orçamento único de tentativas e métricas de latência.
+    """
+
+    def __init__(self, client=None, rpm=None, tpm=None, max_tentativas=4,
+                 base_delay=1.0, orcamento_segundos=120.0, timeout=60.0):
+        self.client = client or OpenAI(timeout=timeout, max_retries=0)
+        self.rpm = rpm or int(os.getenv('OPENAI_RPM', '500'))
+        self.tpm = tpm or int(os.getenv('OPENAI_TPM', '200000'))
+        self.max_tentativas = max_tentativas
+        self.base_delay = base_delay
+        self.orcamento_segundos = orcamento_segundos
+        self.timeout = timeout
+        self.circuit_breaker = CircuitBreaker()
+        self._baldes = {}
+        self._lock = threading.Lock()
+        self._latencias = defaultdict(lambda: deque(maxlen=500))
+        self._contadores = defaultdict(lambda: defaultdict(int))
+
+    def transcreve(self, caminho_audio, **parametros):
+        """Chama audio.transcriptions.create e retorna o texto."""
+        def chamada():
+            with open(caminho_audio, "rb") as audio_file:
+                return self.client.audio.transcriptions.create(
+                    file=audio_file, timeout=self.timeout, **parametros)
+        response = self.executa('transcricao', parametros['model'], chamada)
+        if not response or not hasattr(response, 'text'):
+            raise ValueError("Resposta inválida da API de transcrição")
+        return response.text
+
+    def chat(self, mensagens, tokens_estimados=1000, **parametros):
+        """Chama chat.completions.create e retorna o texto da primeira escolha."""
+        def chamada():
+            return self.client.chat.completions.create(
+                messages=mensagens, timeout=self.timeout, **parametros)
+        response = self.executa('chat', parametros['model'], chamada, tokens_estimados)
+        if not response or not response.choices:
+            raise ValueError("Resposta inválida da API")
+        resposta_texto = response.choices[0].message.content
+        if not resposta_texto:
+            raise ValueError("Resposta vazia da API")
+        return resposta_texto
+
+    def executa(self, operacao, modelo, chamada, tokens_estimados=0):
+        """
+        Executa a chamada respeitando limites de taxa e o orçamento de tentativas.
+
+        Erros de rate limit, conexão, timeout e 5xx geram nova tentativa com backoff
+        exponencial (ou o Retry-After da API); os demais são propagados na hora.
+        Só erros da API e de transporte contam para o circuit breaker: um erro
+        local (arquivo de áudio ausente, por exemplo) não suspende as chamadas.
+
+        Raises:
+            CircuitoAbertoError: Se o circuit breaker estiver aberto
+            Exception: Último erro da API quando o orçamento se esgota
+        """
+        inicio = time.monotonic()
+        balde_rpm, balde_tpm = self._baldes_modelo(modelo)
+        for tentativa in range(self.max_tentativas):
+            # Circuit breaker antes dos baldes: uma chamada recusada não gasta fichas
+            self.circuit_breaker.permite()
+            restante = self.orcamento_segundos - (time.monotonic() - inicio)
+            try:
+                balde_rpm.adquirir(1, timeout=restante)
+                if tokens_estimados:
+                    balde_tpm.adquirir(tokens_estimados, timeout=restante)
+            except TimeoutError:
+                # Um teste do estado meio aberto que não chegou à API não pode ficar em andamento
+                self.circuit_breaker.cancela_teste()
+                self._contadores[operacao]['timeouts_limite_taxa'] += 1
+                self._contadores[operacao]['erros'] += 1
+                logger.error(f"Limite de taxa de {operacao} ({modelo}) não liberou dentro do orçamento")
+                raise
+
+            self._contadores[operacao]['tentativas'] += 1
+            inicio_chamada = time.monotonic()
+            try:
+                response = chamada()
+            except (RateLimitError, APIConnectionError, APITimeoutError, APIStatusError) as e:
+                status = getattr(e, 'status_code', None)
+                repetivel = not isinstance(e, APIStatusError) or isinstance(e, RateLimitError) \
+                    or (status is not None and status >= 500)
+                if repetivel:
+                    self.circuit_breaker.registra_falha()
+                else:
+                    self.circuit_breaker.registra_sucesso()  # a API respondeu; o erro é da requisição
+                espera = self._tempo_espera(e, tentativa)
+                ultima = tentativa == self.max_tentativas - 1
+                sem_orcamento = (time.monotonic() - inicio) + espera > self.orcamento_segundos
+                if not repetivel or ultima or sem_orcamento:
+                    self._contadores[operacao]['erros'] += 1
+                    logger.error(f"Falha em {operacao} ({modelo}) após {tentativa + 1} tentativa(s): {e}")
+                    raise
+                logger.warning(f"{type(e).__name__} em {operacao}. Tentativa {tentativa + 1}/"
+                               f"{self.max_tentativas}. Aguardando {espera:.2f}s...")
+                time.sleep(espera)
+                continue
+            except (APIError, TimeoutError):
+                self.circuit_breaker.registra_falha()
+                self._contadores[operacao]['erros'] += 1
+                raise
+            except Exception:
+                self.circuit_breaker.cancela_teste()
+                self._contadores[operacao]['erros'] += 1
+                raise
+
+            latencia = time.monotonic() - inicio_chamada
+            self.circuit_breaker.registra_sucesso()
+            self._latencias[operacao].append(latencia)
+            self._contadores[operacao]['chamadas'] += 1
+            logger.info(f"{operacao} ({modelo}) concluída em {latencia:.2f}s após {tentativa + 1} tentativa(s)")
+            return response
+
+    def metricas(self):
+        """Retorna contadores e latências p50/p95 (em segundos) por operação."""
+        resultado = {}
+        for operacao, contadores in self._contadores.items():
+            latencias = sorted(self._latencias[operacao])
+            resultado[operacao] = dict(contadores)
+            if latencias:
+                resultado[operacao]['latencia_p50'] = latencias[len(latencias) // 2]
+                resultado[operacao]['latencia_p95'] = latencias[min(len(latencias) - 1,
+                                                                    int(len(latencias) * 0.95))]
+        resultado['circuit_breaker'] = self.circuit_breaker.estado
+        return resultado
+
+    def _baldes_modelo(self, modelo):
+        with self._lock:
+            if modelo not in self._baldes:
+                self._baldes[modelo] = (TokenBucket(self.rpm), TokenBucket(self.tpm))
+            return self._baldes[modelo]
+
+    def _tempo_espera(self, erro, tentativa):
+        resposta = getattr(erro, 'response', None)
+        retry_after = resposta.headers.get('retry-after') if resposta is not None else None
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            return self.base_delay * (2 ** tentativa) + random.uniform(0, 1)  # Backoff exponencial com jitter
+
+
+_cliente = None
+_cliente_lock = threading.Lock()
+
+
+def obter_cliente():
+    """Retorna o ClienteResiliente único do processo, criando-o na primeira chamada."""
+    global _cliente
+    with _cliente_lock:
+        if _cliente is None:
+            _cliente = ClienteResiliente()
+        return _cliente
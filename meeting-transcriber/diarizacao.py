@@ -0,0 +1,362 @@
+"""
+Diarização: identifica quem falou em cada segmento da gravação.
+
+Roda na CPU, só com NumPy, depois que a gravação termina:
+
+1. o áudio é decodificado pelo ffmpeg direto para PCM mono 16 kHz e lido em
+   blocos de 60 s;
+2. cada bloco vira um espectrograma log-mel calculado de uma vez (todas as
+   janelas do bloco numa única FFT em lote), reduzido logo em seguida às
+   estatísticas das janelas e descartado;
+3. a cada 0,75 s, uma janela de 1,5 s com voz vira um vetor de
+   características (média e desvio padrão das bandas mel, normalizados na
+   reunião inteira), chamado de embedding no código;
+4. os embeddings são agrupados por clustering aglomerativo (ligação média,
+   distância de cosseno) até a distância entre grupos passar do limiar, ou até
+   sobrar o número de locutores informado;
+5. cada segmento do segmentos.jsonl recebe o locutor predominante nas suas
+   janelas ('Locutor 1', 'Locutor 2', ... na ordem em que falaram pela primeira vez).
+
+Ficam em memória só um bloco de áudio e o espectrograma dele, mais o que
+cresce com a duração: a energia de cada quadro de 10 ms e as estatísticas de
+cada janela de 0,75 s (~5 MB por hora de reunião, contra ~60 MB do
+espectrograma inteiro). Uma reunião de 1 h leva poucos segundos, bem abaixo
+do tempo real.
+
+Limitação: esses vetores não são embeddings de locutor treinados (x-vector,
+ECAPA): são estatísticas espectrais, que também variam com volume, fonemas,
+ruído de fundo e troca de microfone. Vozes bem diferentes (tom e timbre) na
+mesma sala são separadas quando o número de locutores é informado; só com o
+limiar, a mesma voz costuma ser dividida em vários locutores. Para reuniões
+com vozes parecidas seria preciso um modelo de embeddings de locutor, que
+este módulo não usa para continuar só com NumPy.
+
+Configuração pelo .env:
+    DIARIZACAO_LOCUTORES: número fixo de locutores (padrão: estimado pelo limiar;
+        informe quando souber, ver a limitação acima)
+    DIARIZACAO_LIMIAR: distância de cosseno para separar locutores (padrão 0.6)
+"""
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+import os
+import time
+import logging
+import tempfile
+import subprocess
+
+import numpy as np
+import pydub
+
+from armazenamento import salva_arquivo
+from segmentos import le_segmentos, anota_segmentos, texto_com_locutores, ARQUIVO_TRANSCRICAO_LOCUTORES
+from manutencao_audio import localiza_audio
+
+logger = logging.getLogger(__name__)
+
+TAXA = 16000  # Hz
+AMOSTRAS_QUADRO = 400  # 25 ms
+PASSO_QUADRO = 160  # 10 ms
+N_FFT = 512
+N_MEL = 40
+QUADROS_JANELA = 150  # 1,5 s por embedding
+PASSO_JANELA = 75  # 0,75 s entre embeddings
+SEGUNDOS_BLOCO = 60
+MIN_FRACAO_VOZ = 0.5  # janelas com menos quadros de voz que isso são ignoradas
+MAX_JANELAS_CLUSTER = 1500  # acima disso o clustering usa uma amostra e atribui o resto ao centróide
+LIMIAR_DISTANCIA = 0.6
+JANELAS_SUAVIZACAO = 5  # filtro de maioria sobre os rótulos das janelas
+
+
+def _banco_mel(n_mel=N_MEL, n_fft=N_FFT, taxa=TAXA):
+    """Filtros triangulares na escala mel, (n_fft // 2 + 1, n_mel)."""
+    mel = lambda hz: 2595 * np.log10(1 + hz / 700)
+    hz = lambda m: 700 * (10 ** (m / 2595) - 1)
+    pontos = hz(np.linspace(mel(20), mel(taxa / 2), n_mel + 2))
+    bins = np.fft.rfftfreq(n_fft, 1 / taxa)
+    banco = np.zeros((len(bins), n_mel), dtype=np.float32)
+    for i in range(n_mel):
+        esquerda, centro, direita = pontos[i:i + 3]
+        subida = (bins - esquerda) / (centro - esquerda)
+        descida = (direita - bins) / (direita - centro)
+        banco[:, i] = np.clip(np.minimum(subida, descida), 0, None)
+    return banco
+
+
+_BANCO_MEL = _banco_mel()
+_JANELA_HAMMING = np.hamming(AMOSTRAS_QUADRO).astype(np.float32)
+
+
+def log_mel(amostras):
+    """
+    Espectrograma log-mel de amostras float32 mono 16 kHz.
+
+    Todos os quadros são extraídos com uma view (sem cópia) e transformados
+    numa única chamada de FFT.
+
+    Returns:
+        np.ndarray: (quadros, N_MEL)
+    """
+    if len(amostras) < AMOSTRAS_QUADRO:
+        return np.empty((0, N_MEL), dtype=np.float32)
+    quadros = np.lib.stride_tricks.sliding_window_view(amostras, AMOSTRAS_QUADRO)[::PASSO_QUADRO]
+    espectro = np.abs(np.fft.rfft(quadros * _JANELA_HAMMING, n=N_FFT)) ** 2
+    return np.log(espectro.astype(np.float32) @ _BANCO_MEL + 1e-6)
+
+
+def le_pcm_em_blocos(caminho_audio, segundos_bloco=SEGUNDOS_BLOCO):
+    """
+    Decodifica o áudio com o ffmpeg e gera blocos float32 mono 16 kHz.
+
+    Os blocos se sobrepõem em AMOSTRAS_QUADRO - PASSO_QUADRO amostras, para que
+    os quadros do log-mel fiquem contínuos entre um bloco e outro. O stderr do
+    ffmpeg vai para um arquivo temporário: num pipe lido só no fim, muitos
+    avisos encheriam o buffer e travariam o ffmpeg e esta leitura.
+    """
+    comando = [pydub.AudioSegment.converter, '-v', 'error', '-i', str(caminho_audio),
+               '-ac', '1', '-ar', str(TAXA), '-f', 's16le', '-']
+    tamanho_bloco = segundos_bloco * TAXA * 2
+    sobra = np.empty(0, dtype=np.float32)
+    with tempfile.TemporaryFile() as saida_erro:
+        with subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=saida_erro) as processo:
+            while True:
+                dados = processo.stdout.read(tamanho_bloco)
+                if not dados:
+                    break
+                pcm = np.frombuffer(dados[:len(dados) // 2 * 2], dtype='<i2').astype(np.float32) / 32768
+                bloco = np.concatenate([sobra, pcm])
+                yield bloco
+                # Próximo quadro começa no primeiro múltiplo de PASSO_QUADRO não usado
+                usados = max(0, (len(bloco) - AMOSTRAS_QUADRO) // PASSO_QUADRO + 1) * PASSO_QUADRO
+                sobra = bloco[usados:]
+        saida_erro.seek(0)
+        erro = saida_erro.read().decode(errors='ignore')
+    if processo.returncode:
+        raise RuntimeError(f"ffmpeg não conseguiu decodificar {caminho_audio}: {erro.strip()}")
+
+
+def estatisticas_janelas(espectrograma):
+    """
+    Média e desvio padrão das bandas mel de cada janela que cabe no espectrograma.
+
+    As janelas começam nos quadros 0, PASSO_JANELA, 2 * PASSO_JANELA...; médias
+    e variâncias de todas elas saem de somas acumuladas, sem laço por janela.
+
+    Returns:
+        np.ndarray: (janelas, 2 * N_MEL)
+    """
+    n_quadros = len(espectrograma)
+    if n_quadros < QUADROS_JANELA:
+        return np.empty((0, 2 * N_MEL), dtype=np.float64)
+    inicios = np.arange(0, n_quadros - QUADROS_JANELA + 1, PASSO_JANELA)
+    fins = inicios + QUADROS_JANELA
+    soma = np.vstack([np.zeros(N_MEL), np.cumsum(espectrograma, axis=0, dtype=np.float64)])
+    soma_quadrados = np.vstack([np.zeros(N_MEL), np.cumsum(espectrograma.astype(np.float64) ** 2, axis=0)])
+    media = (soma[fins] - soma[inicios]) / QUADROS_JANELA
+    desvio = np.sqrt(np.maximum((soma_quadrados[fins] - soma_quadrados[inicios]) / QUADROS_JANELA - media ** 2, 0))
+    return np.hstack([media, desvio])
+
+
+def embeddings(espectrograma):
+    """
+    Embeddings das janelas com voz de um espectrograma inteiro em memória.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (embeddings normalizados, início de cada janela em ms)
+    """
+    return _embeddings(estatisticas_janelas(espectrograma), espectrograma.mean(axis=1))
+
+
+def _embeddings(estatisticas, energia):
+    """
+    Embeddings a partir das estatísticas das janelas e da energia de cada quadro.
+
+    O limiar de voz e a normalização usam a reunião inteira, por isso só
+    podem ser aplicados depois que todos os blocos foram lidos.
+    """
+    if len(estatisticas) == 0:
+        return np.empty((0, 2 * N_MEL), dtype=np.float32), np.empty(0, dtype=np.int64)
+    baixo, alto = np.percentile(energia, [20, 95])
+    voz = (energia > baixo + 0.3 * (alto - baixo)).astype(np.float64)
+    inicios = np.arange(len(estatisticas)) * PASSO_JANELA
+    soma_voz = np.concatenate([[0], np.cumsum(voz)])
+    com_voz = (soma_voz[inicios + QUADROS_JANELA] - soma_voz[inicios]) / QUADROS_JANELA >= MIN_FRACAO_VOZ
+
+    vetores = estatisticas[com_voz]
+    if len(vetores) == 0:
+        return vetores.astype(np.float32), inicios[com_voz]
+    # Normalização na reunião: realça o que difere entre locutores, não o microfone
+    vetores = (vetores - vetores.mean(axis=0)) / (vetores.std(axis=0) + 1e-6)
+    vetores /= np.linalg.norm(vetores, axis=1, keepdims=True) + 1e-9
+    return vetores.astype(np.float32), inicios[com_voz] * PASSO_QUADRO * 1000 // TAXA
+
+
+def agrupa(vetores, num_locutores=None, limiar=LIMIAR_DISTANCIA):
+    """
+    Clustering aglomerativo com ligação média sobre a distância de cosseno.
+
+    A matriz de distâncias é atualizada pela fórmula de Lance-Williams a cada
+    fusão. Com mais de MAX_JANELAS_CLUSTER vetores, agrupa uma amostra
+    espaçada e atribui cada vetor ao centróide mais próximo.
+
+    Returns:
+        np.ndarray: Rótulo (0..k-1) de cada vetor
+    """
+    n = len(vetores)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    passo = max(1, -(-n // MAX_JANELAS_CLUSTER))
+    amostra = vetores[::passo]
+    m = len(amostra)
+
+    distancias = 1 - amostra @ amostra.T
+    np.fill_diagonal(distancias, np.inf)
+    tamanhos = np.ones(m)
+    grupo = np.arange(m)
+    ativos = m
+    while ativos > 1:
+        if num_locutores and ativos <= num_locutores:
+            break
+        indice = np.argmin(distancias)
+        i, j = divmod(indice, m)
+        if not num_locutores and distancias[i, j] > limiar:
+            break
+        # j é incorporado a i
+        novas = (tamanhos[i] * distancias[i] + tamanhos[j] * distancias[j]) / (tamanhos[i] + tamanhos[j])
+        distancias[i, :] = novas
+        distancias[:, i] = novas
+        distancias[i, i] = np.inf
+        distancias[j, :] = np.inf
+        distancias[:, j] = np.inf
+        tamanhos[i] += tamanhos[j]
+        grupo[grupo == j] = i
+        ativos -= 1
+
+    ids = np.unique(grupo)
+    centroides = np.stack([amostra[grupo == g].mean(axis=0) for g in ids])
+    centroides /= np.linalg.norm(centroides, axis=1, keepdims=True) + 1e-9
+    return np.argmax(vetores @ centroides.T, axis=1)
+
+
+def _suaviza(rotulos, tamanho=JANELAS_SUAVIZACAO):
+    """Filtro de maioria: remove trocas de locutor de uma única janela."""
+    if len(rotulos) < tamanho:
+        return rotulos
+    meio = tamanho // 2
+    preenchidos = np.concatenate([rotulos[:1].repeat(meio), rotulos, rotulos[-1:].repeat(meio)])
+    janelas = np.lib.stride_tricks.sliding_window_view(preenchidos, tamanho)
+    return np.array([np.bincount(janela).argmax() for janela in janelas])
+
+
+def diariza_amostras(blocos, num_locutores=None, limiar=LIMIAR_DISTANCIA):
+    """
+    Rótulos de locutor ao longo do áudio.
+
+    Cada bloco é reduzido às estatísticas das janelas que terminam nele; os
+    quadros de uma janela ainda incompleta passam para o bloco seguinte.
+
+    Args:
+        blocos: Iterável de blocos float32 mono 16 kHz (ver le_pcm_em_blocos)
+
+    Returns:
+        list[tuple[int, int, int]]: (início ms, fim ms, locutor) de cada janela com voz
+    """
+    estatisticas, energias = [], []
+    pendentes = np.empty((0, N_MEL), dtype=np.float32)  # quadros a partir do início da próxima janela
+    for bloco in blocos:
+        quadros = log_mel(bloco)
+        energias.append(quadros.mean(axis=1))
+        pendentes = np.concatenate([pendentes, quadros])
+        janelas = estatisticas_janelas(pendentes)
+        estatisticas.append(janelas)
+        pendentes = pendentes[len(janelas) * PASSO_JANELA:]
+    vetores, inicios_ms = _embeddings(np.concatenate(estatisticas or [np.empty((0, 2 * N_MEL))]),
+                                      np.concatenate(energias or [np.empty(0, dtype=np.float32)]))
+    rotulos = _suaviza(agrupa(vetores, num_locutores, limiar))
+    # Locutores numerados na ordem em que aparecem
+    ordem = {rotulo: i for i, rotulo in enumerate(dict.fromkeys(rotulos.tolist()))}
+    duracao_janela_ms = QUADROS_JANELA * PASSO_QUADRO * 1000 // TAXA
+    return [(int(inicio), int(inicio) + duracao_janela_ms, ordem[rotulo])
+            for inicio, rotulo in zip(inicios_ms, rotulos.tolist())]
+
+
+def rotula_segmentos(segmentos, janelas):
+    """
+    Locutor predominante em cada segmento, pelo centro das janelas.
+
+    Returns:
+        dict[int, dict]: id do segmento -> {'locutor': 'Locutor N'}
+    """
+    centros = np.array([(inicio + fim) / 2 for inicio, fim, _ in janelas])
+    locutores = [locutor for _, _, locutor in janelas]
+    anotacoes = {}
+    for segmento in segmentos:
+        if not len(centros):
+            break
+        dentro = np.nonzero((centros >= segmento['inicio_ms']) & (centros < segmento['fim_ms']))[0]
+        if len(dentro):
+            predominante = Counter(locutores[i] for i in dentro).most_common(1)[0][0]
+            anotacoes[segmento['id']] = {'locutor': f'Locutor {predominante + 1}'}
+    return anotacoes
+
+
+def diariza_reuniao(pasta_reuniao, num_locutores=None, limiar=None):
+    """
+    Diariza o áudio da reunião, anota o segmentos.jsonl e grava o transcricao_locutores.txt.
+
+    Returns:
+        dict: Locutores encontrados, segmentos anotados e fator de tempo real
+
+    Raises:
+        FileNotFoundError: Se a reunião não tem áudio
+    """
+    pasta_reuniao = Path(pasta_reuniao)
+    caminho_audio = localiza_audio(pasta_reuniao)
+    if caminho_audio is None:
+        raise FileNotFoundError(f"Reunião {pasta_reuniao.name} não tem áudio")
+    num_locutores = num_locutores or int(os.getenv('DIARIZACAO_LOCUTORES', 0)) or None
+    limiar = limiar or float(os.getenv('DIARIZACAO_LIMIAR', LIMIAR_DISTANCIA))
+
+    inicio = time.perf_counter()
+    janelas = diariza_amostras(le_pcm_em_blocos(caminho_audio), num_locutores, limiar)
+    anotacoes = rotula_segmentos(le_segmentos(pasta_reuniao), janelas)
+    anota_segmentos(pasta_reuniao, anotacoes)
+    salva_arquivo(pasta_reuniao / ARQUIVO_TRANSCRICAO_LOCUTORES, texto_com_locutores(le_segmentos(pasta_reuniao)))
+    duracao_s = time.perf_counter() - inicio
+
+    duracao_audio_s = janelas[-1][1] / 1000 if janelas else 0
+    resultado = {
+        'locutores': len({locutor for _, _, locutor in janelas}),
+        'segmentos_anotados': len(anotacoes),
+        'tempo_segundos': round(duracao_s, 2),
+        'rtf': round(duracao_s / duracao_audio_s, 4) if duracao_audio_s else None,
+    }
+    logger.info(f"Diarização de {pasta_reuniao.name}: {resultado['locutores']} locutor(es), "
+                f"{resultado['segmentos_anotados']} segmento(s) em {duracao_s:.1f}s (RTF {resultado['rtf']})")
+    return resultado
+
+
+class Diarizador:
+    """Fila de diarização em segundo plano, uma reunião por vez."""
+
+    def __init__(self):
+        self.estados = {}  # nome da reunião -> 'na fila' | 'processando' | 'concluído' | 'erro: ...'
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='diarizacao')
+
+    def agenda(self, pasta_reuniao):
+        pasta_reuniao = Path(pasta_reuniao)
+        self.estados[pasta_reuniao.name] = 'na fila'
+        return self._executor.submit(self._executa, pasta_reuniao)
+
+    def estado(self, pasta_reuniao):
+        return self.estados.get(Path(pasta_reuniao).name)
+
+    def _executa(self, pasta_reuniao):
+        self.estados[pasta_reuniao.name] = 'processando'
+        try:
+            resultado = diariza_reuniao(pasta_reuniao)
+            self.estados[pasta_reuniao.name] = 'concluído'
+            return resultado
+        except Exception as e:
+            logger.error(f"Erro na diarização de {pasta_reuniao.name}: {e}", exc_info=True)
+            self.estados[pasta_reuniao.name] = f'erro: {e}'
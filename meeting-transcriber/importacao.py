@@ -0,0 +1,300 @@
+"""
+Importação em lote de gravações e de transcrições exportadas do Google Meet.
+
+Cada arquivo vira um job em segundo plano que cria a pasta da reunião no mesmo
+formato da gravação ao vivo (arquivos/AAAA_MM_DD_HH_MM_SS/):
+
+- áudio: decodificado e reamostrado num pool de processos, cortado em chunks,
+  transcrito pelo backend configurado e resumido;
+- transcrição (.txt, .vtt, .srt, .sbv): convertida para transcricao.txt (e
+  segmentos.jsonl quando há tempos) e resumida.
+
+As funções de transcrição, resumo e registro no catálogo são recebidas do app,
+para este módulo não depender do Streamlit; elas rodam nas threads da fila,
+então não podem usar st.* nem st.cache_resource. A decodificação roda em
+processos iniciados com 'spawn': um fork do servidor do Streamlit copiaria as
+threads e locks dele para o filho.
+
+O arquivo de origem só é lido: transcrições em outro encoding são decodificadas
+em memória, nunca regravadas. Jobs terminados expiram depois de
+IMPORTACAO_TTL_MIN minutos (padrão 60); uma thread de limpeza passa a cada
+IMPORTACAO_LIMPEZA_MIN minutos (padrão 5).
+"""
+from pathlib import Path
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+import os
+import re
+import uuid
+import shutil
+import logging
+import threading
+import time
+
+import pydub
+
+from armazenamento import decodifica, salva_arquivo
+from segmentos import registra_segmento, reconstroi_transcricao
+
+logger = logging.getLogger(__name__)
+
+EXTENSOES_AUDIO = {'.mp3', '.wav', '.m4a', '.ogg', '.oga', '.opus', '.webm', '.flac', '.aac', '.mp4'}
+EXTENSOES_TRANSCRICAO = {'.txt', '.vtt', '.srt', '.sbv'}
+TAXA_AMOSTRAGEM = 16000  # Hz, suficiente para fala
+SEGUNDOS_CHUNK_IMPORTACAO = 300  # chunks de 5 min ficam bem abaixo do limite de 25 MB da API
+PASTA_CHUNKS = 'chunks_importacao'
+
+_RE_TEMPO = re.compile(r'(?:(\d+):)?(\d{1,2}):(\d{2})[.,](\d{1,3})')
+
+
+def decodifica_audio(caminho_origem, pasta_reuniao, segundos_chunk=SEGUNDOS_CHUNK_IMPORTACAO):
+    """
+    Decodifica o áudio, converte para mono 16 kHz e grava audio.mp3 e os chunks.
+
+    Roda num processo separado (é a etapa que usa CPU), por isso só recebe e
+    retorna tipos simples.
+
+    Returns:
+        list[tuple[str, int, int]]: (caminho do chunk, início ms, fim ms)
+    """
+    audio = pydub.AudioSegment.from_file(caminho_origem)
+    audio = audio.set_channels(1).set_frame_rate(TAXA_AMOSTRAGEM)
+    pasta_reuniao = Path(pasta_reuniao)
+    audio.export(pasta_reuniao / 'audio.mp3', format='mp3')
+
+    pasta_chunks = pasta_reuniao / PASTA_CHUNKS
+    pasta_chunks.mkdir(exist_ok=True)
+    passo = segundos_chunk * 1000
+    chunks = []
+    for i, inicio in enumerate(range(0, len(audio), passo)):
+        fim = min(inicio + passo, len(audio))
+        caminho_chunk = pasta_chunks / f'{i:04d}.mp3'
+        audio[inicio:fim].export(caminho_chunk, format='mp3')
+        chunks.append((str(caminho_chunk), inicio, fim))
+    return chunks
+
+
+def _tempo_ms(texto):
+    horas, minutos, segundos, fracao = _RE_TEMPO.match(texto).groups()
+    return ((int(horas or 0) * 60 + int(minutos)) * 60 + int(segundos)) * 1000 + int(fracao.ljust(3, '0'))
+
+
+def le_legendas(conteudo):
+    """
+    Extrai (início ms, fim ms, texto) de legendas WebVTT, SRT ou SBV.
+
+    Blocos são separados por linha em branco; a linha com '-->' (ou a vírgula
+    do SBV) traz os tempos, e as demais, exceto números de sequência, o texto.
+    """
+    blocos = []
+    for bloco in re.split(r'\n\s*\n', conteudo.replace('\r\n', '\n')):
+        linhas = [linha.strip() for linha in bloco.strip().split('\n') if linha.strip()]
+        for i, linha in enumerate(linhas):
+            tempos = [m.group(0) for m in _RE_TEMPO.finditer(linha)]
+            if len(tempos) == 2 and ('-->' in linha or ',' in linha):
+                inicio, fim = _tempo_ms(tempos[0]), _tempo_ms(tempos[1])
+                texto = ' '.join(linhas[i + 1:])
+                texto = re.sub(r'<v(?:\.[\w.]+)?\s+([^>]+)>', r'\1: ', texto)  # <v Nome> -> "Nome: "
+                texto = re.sub(r'<[^>]+>', '', texto).strip()  # demais tags de estilo do WebVTT
+                if texto:
+                    blocos.append((inicio, fim, texto))
+                break
+    return blocos
+
+
+def _remove_arquivo(arquivo):
+    """Apaga o arquivo e a pasta que o continha, se ela ficar vazia."""
+    try:
+        arquivo.unlink(missing_ok=True)
+        arquivo.parent.rmdir()
+    except OSError:
+        pass  # pasta ainda tem outros arquivos
+
+
+class JobImportacao:
+
+    def __init__(self, arquivo, pasta_reuniao, remove_arquivo=False):
+        self.id = uuid.uuid4().hex[:8]
+        self.arquivo = Path(arquivo)
+        self.pasta_reuniao = pasta_reuniao
+        self.remove_arquivo = remove_arquivo  # arquivo enviado pelo app: apagado quando o job termina
+        self.etapa = 'na fila'
+        self.progresso = 0.0
+        self.erro = None
+        self.concluido = False
+        self.concluido_em = None
+
+    def atualiza(self, etapa, progresso):
+        self.etapa = etapa
+        self.progresso = progresso
+        logger.debug(f"Importação {self.id} ({self.arquivo.name}): {etapa} {progresso:.0%}")
+
+
+class FilaImportacao:
+    """
+    Fila de importação com pool de processos para decodificar e pool de threads
+    para as etapas que esperam a API (transcrição e resumo).
+
+    Args:
+        pasta_arquivos: Pasta onde as reuniões são criadas
+        transcreve_lote: função(list[caminho], progresso=função(concluídos, total)) -> list[str]
+        resume: função(pasta_reuniao) que grava o resumo.txt
+        registra: função(pasta_reuniao) chamada quando arquivos da reunião mudam
+        ttl: Segundos até jobs terminados expirarem
+        intervalo_limpeza: Segundos entre passagens da limpeza
+    """
+
+    def __init__(self, pasta_arquivos, transcreve_lote, resume, registra,
+                 processos=None, threads=4, ttl=None, intervalo_limpeza=None):
+        self.pasta_arquivos = Path(pasta_arquivos)
+        self.transcreve_lote = transcreve_lote
+        self.resume = resume
+        self.registra = registra
+        self.ttl = ttl or float(os.getenv('IMPORTACAO_TTL_MIN', 60)) * 60
+        self.intervalo_limpeza = intervalo_limpeza or float(os.getenv('IMPORTACAO_LIMPEZA_MIN', 5)) * 60
+        self.jobs = {}
+        self._processos = ProcessPoolExecutor(max_workers=processos or os.cpu_count(),
+                                              mp_context=multiprocessing.get_context('spawn'))
+        self._threads = ThreadPoolExecutor(max_workers=threads)
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread_limpeza = None
+
+    def importa(self, arquivos, titulo=None, remove_arquivos=False):
+        """
+        Enfileira os arquivos e retorna os jobs criados.
+
+        Arquivos com extensão não suportada são ignorados.
+
+        Args:
+            remove_arquivos: Apaga cada arquivo (e a pasta dele, se ficar vazia)
+                quando o job termina, com sucesso ou erro; para uploads temporários
+        """
+        novos = []
+        for arquivo in arquivos:
+            arquivo = Path(arquivo)
+            extensao = arquivo.suffix.lower()
+            if extensao not in EXTENSOES_AUDIO | EXTENSOES_TRANSCRICAO:
+                logger.warning(f"Importação: extensão não suportada em {arquivo.name}")
+                if remove_arquivos:
+                    _remove_arquivo(arquivo)
+                continue
+            job = JobImportacao(arquivo, self._cria_pasta_reuniao(arquivo), remove_arquivos)
+            with self._lock:
+                self.jobs[job.id] = job
+            novos.append(job)
+            salva_arquivo(job.pasta_reuniao / 'titulo.txt', titulo or arquivo.stem)
+            self.registra(job.pasta_reuniao)
+            if extensao in EXTENSOES_AUDIO:
+                futuro = self._processos.submit(decodifica_audio, str(arquivo), str(job.pasta_reuniao))
+                job.atualiza('decodificando', 0.05)
+                futuro.add_done_callback(
+                    lambda f, job=job: self._threads.submit(self._executa, job, self._processa_audio, f))
+            else:
+                self._threads.submit(self._executa, job, self._processa_transcricao, None)
+        return novos
+
+    def importa_pasta(self, pasta):
+        """Enfileira todos os arquivos suportados de uma pasta (não recursivo)."""
+        arquivos = sorted(p for p in Path(pasta).iterdir()
+                          if p.is_file() and p.suffix.lower() in EXTENSOES_AUDIO | EXTENSOES_TRANSCRICAO)
+        return self.importa(arquivos)
+
+    def lista(self):
+        """Jobs ainda não expirados, na ordem em que foram enfileirados."""
+        with self._lock:
+            return list(self.jobs.values())
+
+    def pendentes(self):
+        return [job for job in self.lista() if not job.concluido]
+
+    def inicia_limpeza(self):
+        """Inicia a thread de limpeza (uma vez por fila)."""
+        if self._thread_limpeza is None:
+            self._thread_limpeza = threading.Thread(target=self._loop_limpeza, daemon=True)
+            self._thread_limpeza.start()
+
+    def limpa_expirados(self, agora=None):
+        """Remove os jobs terminados há mais que o TTL; retorna quantos foram removidos."""
+        agora = agora or time.time()
+        with self._lock:
+            expirados = [job_id for job_id, job in self.jobs.items()
+                         if job.concluido and agora - job.concluido_em > self.ttl]
+            for job_id in expirados:
+                del self.jobs[job_id]
+        if expirados:
+            logger.info(f"Importação: {len(expirados)} job(s) expirados")
+        return len(expirados)
+
+    def encerra(self):
+        self._parar.set()
+        self._processos.shutdown(wait=False, cancel_futures=True)
+        self._threads.shutdown(wait=False, cancel_futures=True)
+
+    def _cria_pasta_reuniao(self, arquivo):
+        """Cria a pasta com a data de modificação do arquivo, avançando 1 s se já existir."""
+        data = datetime.fromtimestamp(arquivo.stat().st_mtime)
+        with self._lock:
+            while True:
+                pasta_reuniao = self.pasta_arquivos / data.strftime('%Y_%m_%d_%H_%M_%S')
+                try:
+                    pasta_reuniao.mkdir()
+                    return pasta_reuniao
+                except FileExistsError:
+                    data += timedelta(seconds=1)
+
+    def _executa(self, job, etapa, entrada):
+        try:
+            etapa(job, entrada)
+            job.atualiza('resumindo', 0.9)
+            self.resume(job.pasta_reuniao)
+            self.registra(job.pasta_reuniao)
+            job.atualiza('concluído', 1.0)
+        except Exception as e:
+            logger.error(f"Erro ao importar {job.arquivo.name}: {e}", exc_info=True)
+            job.erro = str(e)
+            job.etapa = 'erro'
+        finally:
+            if job.remove_arquivo:
+                _remove_arquivo(job.arquivo)
+            # concluido_em antes de concluido: a limpeza só olha jobs concluídos
+            job.concluido_em = time.time()
+            job.concluido = True
+
+    def _loop_limpeza(self):
+        while not self._parar.wait(self.intervalo_limpeza):
+            try:
+                self.limpa_expirados()
+            except Exception as e:
+                # A limpeza nunca derruba o app
+                logger.error(f"Erro na limpeza dos jobs de importação: {e}", exc_info=True)
+
+    def _processa_audio(self, job, futuro_decodificacao):
+        chunks = futuro_decodificacao.result()
+        job.atualiza('transcrevendo', 0.2)
+        textos = self.transcreve_lote(
+            [caminho for caminho, _, _ in chunks],
+            progresso=lambda concluidos, total: job.atualiza(
+                f'transcrevendo ({concluidos}/{total} trechos)', 0.2 + 0.65 * concluidos / total))
+        for id_chunk, ((_, inicio, fim), texto) in enumerate(zip(chunks, textos)):
+            registra_segmento(job.pasta_reuniao, id_chunk, texto, inicio, fim, 0.0, origem='importacao')
+        reconstroi_transcricao(job.pasta_reuniao)
+        shutil.rmtree(job.pasta_reuniao / PASTA_CHUNKS, ignore_errors=True)
+        self.registra(job.pasta_reuniao)
+
+    def _processa_transcricao(self, job, _):
+        job.atualiza('lendo transcrição', 0.3)
+        # Só leitura: le_arquivo converteria para UTF-8 no lugar o original do usuário
+        conteudo = decodifica(job.arquivo.read_bytes())
+        if job.arquivo.suffix.lower() == '.txt':
+            salva_arquivo(job.pasta_reuniao / 'transcricao.txt', conteudo.strip())
+        else:
+            legendas = le_legendas(conteudo)
+            if not legendas:
+                raise ValueError(f"Nenhuma legenda encontrada em {job.arquivo.name}")
+            for id_chunk, (inicio, fim, texto) in enumerate(legendas):
+                registra_segmento(job.pasta_reuniao, id_chunk, texto, inicio, fim, 0.0, origem='meet')
+            reconstroi_transcricao(job.pasta_reuniao)
+        self.registra(job.pasta_reuniao)
+
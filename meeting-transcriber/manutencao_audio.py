@@ -0,0 +1,325 @@
+"""
+Manutenção do armazenamento de áudio das reuniões.
+
+A gravação ao vivo mantém audio.mp3 (48 kHz estéreo, 128 kbps) e, em versões
+anteriores, deixava o último chunk em audio_temp.mp3, uma cópia do final do
+audio.mp3. Para reuniões encerradas, a manutenção:
+
+- remove os temporários (audio_temp.*, chunks_importacao/ abandonados);
+- recodifica audio.mp3 para audio.ogg (Opus mono a 24 kbps, ~5-10x menor e
+  suficiente para fala) num subprocesso do ffmpeg, que lê e grava em fluxo,
+  conferindo a duração antes de apagar o original;
+- opcionalmente, move o áudio de reuniões antigas para uma pasta fria
+  (AUDIO_PASTA_FRIA, ex.: um disco maior ou montado na rede).
+
+Uma reunião só é considerada encerrada quando nenhum arquivo dela mudou na
+última hora e não há importação em andamento. localiza_audio() encontra o
+áudio onde quer que ele esteja, e uso_disco() informa os bytes por reunião.
+
+Uso avulso: python manutencao_audio.py
+"""
+from pathlib import Path
+import os
+import time
+import shutil
+import logging
+import threading
+import subprocess
+
+import pydub
+from pydub.utils import get_prober_name
+
+from catalogo import data_da_pasta
+from importacao import PASTA_CHUNKS as PASTA_CHUNKS_IMPORTACAO
+
+logger = logging.getLogger(__name__)
+
+ARQUIVOS_AUDIO = ['audio.ogg', 'audio.mp3']  # em ordem de preferência
+PADRAO_TEMPORARIOS = 'audio_temp.*'
+CODEC_ARQUIVO = 'libopus'
+BITRATE_ARQUIVO = '24k'
+TOLERANCIA_DURACAO_MS = 500  # diferença aceita entre o áudio original e o recodificado
+IDADE_MINIMA_S = 3600  # reunião sem alterações há 1 h é considerada encerrada
+IDADE_CHUNKS_ABANDONADOS_S = 24 * 3600  # importação que falhou e deixou os chunks
+INTERVALO_PADRAO_S = 30 * 60
+ATRASO_INICIAL_S = 60  # não disputa CPU com a inicialização do app
+
+
+def localiza_audio(pasta_reuniao, pasta_fria=None):
+    """
+    Caminho do áudio da reunião, na pasta da reunião ou na pasta fria.
+
+    Returns:
+        Path | None: audio.ogg ou audio.mp3, ou None se a reunião não tem áudio
+    """
+    pasta_reuniao = Path(pasta_reuniao)
+    pastas = [pasta_reuniao]
+    pasta_fria = pasta_fria if pasta_fria is not None else os.getenv('AUDIO_PASTA_FRIA')
+    if pasta_fria:
+        pastas.append(Path(pasta_fria) / pasta_reuniao.name)
+    for pasta in pastas:
+        for nome in ARQUIVOS_AUDIO:
+            if (pasta / nome).exists():
+                return pasta / nome
+    return None
+
+
+def _ultima_modificacao(pasta):
+    return max((p.stat().st_mtime for p in Path(pasta).rglob('*') if p.is_file()),
+               default=Path(pasta).stat().st_mtime)
+
+
+def _tamanho(caminho):
+    caminho = Path(caminho)
+    if caminho.is_dir():
+        return sum(p.stat().st_size for p in caminho.rglob('*') if p.is_file())
+    return caminho.stat().st_size if caminho.exists() else 0
+
+
+def em_andamento(pasta_reuniao, idade_minima_s=IDADE_MINIMA_S):
+    """True se a reunião ainda está sendo gravada ou importada."""
+    pasta_reuniao = Path(pasta_reuniao)
+    pasta_chunks = pasta_reuniao / PASTA_CHUNKS_IMPORTACAO
+    if pasta_chunks.exists() and time.time() - _ultima_modificacao(pasta_chunks) < IDADE_CHUNKS_ABANDONADOS_S:
+        return True
+    return time.time() - _ultima_modificacao(pasta_reuniao) < idade_minima_s
+
+
+def remove_temporarios(pasta_reuniao):
+    """
+    Apaga os chunks temporários da reunião.
+
+    Returns:
+        int: Bytes liberados
+    """
+    pasta_reuniao = Path(pasta_reuniao)
+    liberados = 0
+    for caminho in pasta_reuniao.glob(PADRAO_TEMPORARIOS):
+        liberados += _tamanho(caminho)
+        caminho.unlink(missing_ok=True)
+    pasta_chunks = pasta_reuniao / PASTA_CHUNKS_IMPORTACAO
+    if pasta_chunks.exists():
+        liberados += _tamanho(pasta_chunks)
+        shutil.rmtree(pasta_chunks, ignore_errors=True)
+    if liberados:
+        logger.info(f"{pasta_reuniao.name}: {liberados / 1024:.0f} KB de temporários removidos")
+    return liberados
+
+
+def duracao_ms(caminho_audio):
+    """Duração do áudio pelo ffprobe, que lê só o cabeçalho e os metadados."""
+    comando = [get_prober_name(), '-v', 'error', '-show_entries', 'format=duration',
+               '-of', 'default=noprint_wrappers=1:nokey=1', str(caminho_audio)]
+    resultado = subprocess.run(comando, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+    try:
+        return float(resultado.stdout) * 1000
+    except ValueError:
+        raise RuntimeError(f"ffprobe não leu a duração de {caminho_audio}: {resultado.stderr.strip()}")
+
+
+def arquiva_audio(pasta_reuniao, bitrate=BITRATE_ARQUIVO):
+    """
+    Recodifica audio.mp3 para audio.ogg (Opus mono) e apaga o mp3.
+
+    A recodificação roda no ffmpeg, em fluxo: uma reunião de várias horas não
+    é decodificada na memória do servidor do Streamlit. O arquivo novo é
+    gravado com outro nome e só substitui o original depois de conferida a duração.
+
+    Returns:
+        int: Bytes liberados (0 se não havia o que recodificar)
+
+    Raises:
+        RuntimeError: Se o ffmpeg ou o ffprobe falharem
+        ValueError: Se a duração do áudio recodificado não bate com a do original
+    """
+    pasta_reuniao = Path(pasta_reuniao)
+    original = pasta_reuniao / 'audio.mp3'
+    destino = pasta_reuniao / 'audio.ogg'
+    if not original.exists():
+        return 0
+    if destino.exists():
+        # Recodificação já feita numa execução interrompida antes de apagar o mp3
+        liberados = original.stat().st_size
+        original.unlink()
+        return liberados
+
+    temporario = pasta_reuniao / 'audio.ogg.parcial'
+    comando = [pydub.AudioSegment.converter, '-v', 'error', '-y', '-i', str(original), '-vn',
+               '-ac', '1', '-c:a', CODEC_ARQUIVO, '-b:a', bitrate, '-f', 'ogg', str(temporario)]
+    try:
+        resultado = subprocess.run(comando, stdin=subprocess.DEVNULL, capture_output=True)
+        if resultado.returncode:
+            erro = resultado.stderr.decode(errors='ignore').strip()
+            raise RuntimeError(f"ffmpeg não conseguiu recodificar {original}: {erro}")
+        duracao_original, duracao = duracao_ms(original), duracao_ms(temporario)
+        if abs(duracao - duracao_original) > TOLERANCIA_DURACAO_MS:
+            raise ValueError(f"Duração do áudio recodificado ({duracao:.0f} ms) difere "
+                             f"do original ({duracao_original:.0f} ms)")
+        os.replace(temporario, destino)
+    finally:
+        temporario.unlink(missing_ok=True)
+
+    liberados = original.stat().st_size - destino.stat().st_size
+    original.unlink()
+    logger.info(f"{pasta_reuniao.name}: áudio arquivado em Opus {bitrate}, {liberados / 1024 / 1024:.1f} MB liberados")
+    return liberados
+
+
+def move_para_pasta_fria(pasta_reuniao, pasta_fria):
+    """
+    Move o áudio da reunião para pasta_fria/<reunião>/.
+
+    Returns:
+        Path | None: Novo caminho do áudio, ou None se não havia áudio na pasta da reunião
+    """
+    pasta_reuniao = Path(pasta_reuniao)
+    destino_pasta = Path(pasta_fria) / pasta_reuniao.name
+    for nome in ARQUIVOS_AUDIO:
+        origem = pasta_reuniao / nome
+        if origem.exists():
+            destino_pasta.mkdir(parents=True, exist_ok=True)
+            # Copia com outro nome antes de apagar a origem: uma queda no meio
+            # da cópia (ex.: disco de rede) nunca deixa a reunião sem áudio
+            parcial = destino_pasta / f'{nome}.parcial'
+            shutil.copy2(origem, parcial)
+            os.replace(parcial, destino_pasta / nome)
+            origem.unlink()
+            logger.info(f"{pasta_reuniao.name}: áudio movido para {destino_pasta}")
+            return destino_pasta / nome
+    return None
+
+
+def uso_disco(pasta_arquivos, pasta_fria=None):
+    """
+    Bytes ocupados por reunião, separados por tipo.
+
+    Returns:
+        list[dict]: reuniao, audio, temporarios, texto, frio e total, do maior para o menor
+    """
+    pasta_fria = pasta_fria if pasta_fria is not None else os.getenv('AUDIO_PASTA_FRIA')
+    relatorio = []
+    for pasta_reuniao in Path(pasta_arquivos).iterdir():
+        if not pasta_reuniao.is_dir():
+            continue
+        uso = {'reuniao': pasta_reuniao.name, 'audio': 0, 'temporarios': 0, 'texto': 0, 'frio': 0}
+        for caminho in pasta_reuniao.iterdir():
+            if caminho.name in ARQUIVOS_AUDIO:
+                uso['audio'] += _tamanho(caminho)
+            elif caminho.match(PADRAO_TEMPORARIOS) or caminho.name == PASTA_CHUNKS_IMPORTACAO:
+                uso['temporarios'] += _tamanho(caminho)
+            else:
+                uso['texto'] += _tamanho(caminho)
+        if pasta_fria:
+            uso['frio'] = _tamanho(Path(pasta_fria) / pasta_reuniao.name)
+        uso['total'] = uso['audio'] + uso['temporarios'] + uso['texto'] + uso['frio']
+        relatorio.append(uso)
+    return sorted(relatorio, key=lambda uso: uso['total'], reverse=True)
+
+
+class ManutencaoAudio:
+    """
+    Executa a manutenção periodicamente numa thread em segundo plano.
+
+    Configuração pelo .env:
+        AUDIO_ARQUIVAR: '0' mantém o audio.mp3 original (padrão '1')
+        AUDIO_BITRATE_ARQUIVO: bitrate do Opus (padrão '24k')
+        AUDIO_PASTA_FRIA: pasta para onde vai o áudio antigo (padrão: desativado)
+        AUDIO_DIAS_PASTA_FRIA: idade, em dias, para mover para a pasta fria (padrão 30)
+        MANUTENCAO_INTERVALO_MIN: intervalo entre execuções (padrão 30)
+    """
+
+    def __init__(self, pasta_arquivos, pasta_fria=None, dias_pasta_fria=None,
+                 arquivar=None, bitrate=None, intervalo_s=None, idade_minima_s=IDADE_MINIMA_S):
+        self.pasta_arquivos = Path(pasta_arquivos)
+        self.pasta_fria = pasta_fria if pasta_fria is not None else os.getenv('AUDIO_PASTA_FRIA') or None
+        self.dias_pasta_fria = dias_pasta_fria if dias_pasta_fria is not None \
+            else float(os.getenv('AUDIO_DIAS_PASTA_FRIA', 30))
+        self.arquivar = arquivar if arquivar is not None else os.getenv('AUDIO_ARQUIVAR', '1') != '0'
+        self.bitrate = bitrate or os.getenv('AUDIO_BITRATE_ARQUIVO', BITRATE_ARQUIVO)
+        self.intervalo_s = intervalo_s or float(os.getenv('MANUTENCAO_INTERVALO_MIN', INTERVALO_PADRAO_S / 60)) * 60
+        self.idade_minima_s = idade_minima_s
+        self.ultimo_relatorio = None
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def inicia(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name='manutencao-audio', daemon=True)
+        self._thread.start()
+
+    def para(self):
+        self._parar.set()
+
+    def _loop(self):
+        if self._parar.wait(ATRASO_INICIAL_S):
+            return
+        while not self._parar.is_set():
+            try:
+                self.executa()
+            except Exception as e:
+                logger.error(f"Erro na manutenção do áudio: {e}", exc_info=True)
+            self._parar.wait(self.intervalo_s)
+
+    def executa(self):
+        """
+        Uma passada por todas as reuniões encerradas.
+
+        Returns:
+            dict: Reuniões processadas, bytes liberados, áudios arquivados e movidos, erros
+        """
+        with self._lock:
+            inicio = time.perf_counter()
+            relatorio = {'reunioes': 0, 'bytes_liberados': 0, 'arquivados': 0, 'movidos': 0, 'erros': 0}
+            for pasta_reuniao in sorted(self.pasta_arquivos.iterdir()):
+                if not pasta_reuniao.is_dir() or em_andamento(pasta_reuniao, self.idade_minima_s):
+                    continue
+                relatorio['reunioes'] += 1
+                try:
+                    self._mantem_reuniao(pasta_reuniao, relatorio)
+                except Exception as e:
+                    relatorio['erros'] += 1
+                    logger.warning(f"Manutenção de {pasta_reuniao.name} falhou: {e}")
+            relatorio['duracao_s'] = round(time.perf_counter() - inicio, 1)
+            relatorio['executado_em'] = time.time()
+            self.ultimo_relatorio = relatorio
+            logger.info(f"Manutenção do áudio: {relatorio['reunioes']} reunião(ões), "
+                        f"{relatorio['bytes_liberados'] / 1024 / 1024:.1f} MB liberados em {relatorio['duracao_s']}s")
+            return relatorio
+
+    def _mantem_reuniao(self, pasta_reuniao, relatorio):
+        relatorio['bytes_liberados'] += remove_temporarios(pasta_reuniao)
+        if self.arquivar:
+            try:
+                liberados = arquiva_audio(pasta_reuniao, self.bitrate)
+            except Exception as e:
+                # Sem ffmpeg/libopus o mp3 original continua valendo; a pasta fria ainda se aplica
+                relatorio['erros'] += 1
+                logger.warning(f"Não foi possível arquivar o áudio de {pasta_reuniao.name}: {e}")
+                liberados = 0
+            if liberados:
+                relatorio['bytes_liberados'] += liberados
+                relatorio['arquivados'] += 1
+        if self.pasta_fria and self._idade_dias(pasta_reuniao) > self.dias_pasta_fria:
+            if move_para_pasta_fria(pasta_reuniao, self.pasta_fria):
+                relatorio['movidos'] += 1
+
+    @staticmethod
+    def _idade_dias(pasta_reuniao):
+        # A data da reunião vem do nome da pasta: recodificar o áudio não a "rejuvenesce"
+        data = data_da_pasta(pasta_reuniao.name)
+        inicio = data.timestamp() if data else _ultima_modificacao(pasta_reuniao)
+        return (time.time() - inicio) / 86400
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    from dotenv import load_dotenv, find_dotenv
+    load_dotenv(find_dotenv())
+    pasta = Path(__file__).parent / 'arquivos'
+    ManutencaoAudio(pasta).executa()
+    for uso in uso_disco(pasta):
+        print(f"{uso['reuniao']}: {uso['total'] / 1024 / 1024:8.1f} MB "
+              f"(áudio {uso['audio'] / 1024 / 1024:.1f}, frio {uso['frio'] / 1024 / 1024:.1f}, "
+              f"temporários {uso['temporarios'] / 1024 / 1024:.1f})")
@@ -0,0 +1,111 @@
+"""
+Latência por etapa da transcrição ao vivo.
+
+Cada chunk gravado passa por: espera na fila de frames do WebRTC, montagem
+dos AudioSegment, checkpoint do audio.mp3, pré-processamento, transcrição,
+escrita dos arquivos, indexação e exibição. Os tempos de cada etapa ficam em
+memória (últimas amostras, para p50/p95 no painel de depuração) e cada chunk
+vira uma linha em metricas_latencia.jsonl na pasta da reunião.
+
+RTF (fator de tempo real) = tempo de processamento do chunk / duração do
+áudio do chunk; acima de 1 a transcrição não acompanha a fala.
+"""
+from pathlib import Path
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_METRICAS = 'metricas_latencia.jsonl'
+AMOSTRAS_POR_ETAPA = 500
+
+
+def _percentil(valores, fracao):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * fracao))]
+
+
+class MetricasLatencia:
+
+    def __init__(self, amostras=AMOSTRAS_POR_ETAPA):
+        self._tempos = defaultdict(lambda: deque(maxlen=amostras))
+        self._rtf = deque(maxlen=amostras)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def mede(self, etapa, registro=None):
+        """
+        Mede o bloco como uma etapa.
+
+        Args:
+            etapa: Nome da etapa
+            registro: dict do chunk; o tempo também é somado em registro['etapas']
+        """
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registra(etapa, (time.perf_counter() - inicio) * 1000, registro)
+
+    def registra(self, etapa, ms, registro=None):
+        with self._lock:
+            self._tempos[etapa].append(ms)
+        if registro is not None:
+            etapas = registro.setdefault('etapas', {})
+            etapas[etapa] = round(etapas.get(etapa, 0) + ms, 1)
+
+    def registra_chunk(self, pasta_reuniao, registro):
+        """
+        Fecha o registro do chunk: calcula o RTF e grava a linha no log da reunião.
+
+        Args:
+            registro: dict com 'audio_ms', 'processamento_ms' e as 'etapas' medidas
+        """
+        if registro.get('audio_ms'):
+            registro['rtf'] = round(registro['processamento_ms'] / registro['audio_ms'], 3)
+            with self._lock:
+                self._rtf.append(registro['rtf'])
+        registro['registrado_em'] = datetime.now().isoformat(timespec='seconds')
+        try:
+            with open(Path(pasta_reuniao) / ARQUIVO_METRICAS, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        except OSError as e:
+            # Métrica nunca interrompe a gravação
+            logger.warning(f"Não foi possível gravar métricas de latência: {e}")
+
+    def resumo(self):
+        """
+        p50/p95 por etapa, em ms, e do RTF.
+
+        Returns:
+            dict: {'etapas': {etapa: {'n', 'p50', 'p95', 'ultimo'}}, 'rtf': {...} ou None}
+        """
+        with self._lock:
+            tempos = {etapa: list(valores) for etapa, valores in self._tempos.items() if valores}
+            rtf = list(self._rtf)
+        etapas = {etapa: {'n': len(valores), 'p50': _percentil(valores, 0.5),
+                          'p95': _percentil(valores, 0.95), 'ultimo': valores[-1]}
+                  for etapa, valores in tempos.items()}
+        resumo_rtf = None
+        if rtf:
+            resumo_rtf = {'n': len(rtf), 'p50': _percentil(rtf, 0.5),
+                          'p95': _percentil(rtf, 0.95), 'ultimo': rtf[-1]}
+        return {'etapas': etapas, 'rtf': resumo_rtf}
+
+
+_metricas = None
+_metricas_lock = threading.Lock()
+
+
+def obter_metricas():
+    """Retorna o MetricasLatencia único do processo (sobrevive aos reruns do Streamlit)."""
+    global _metricas
+    with _metricas_lock:
+        if _metricas is None:
+            _metricas = MetricasLatencia()
+        return _metricas
@@ -0,0 +1,196 @@
+"""
+Preparação dos chunks de áudio antes da transcrição.
+
+O WebRTC costuma entregar 48 kHz estéreo, muito mais do que a fala precisa.
+Aqui o chunk é convertido para mono e reamostrado para 16 kHz com NumPy, no
+próprio processo, e só então codificado (AUDIO_FORMATO_CHUNK):
+
+- 'opus' (padrão com soundfile/libsndfile com Opus): Ogg Opus codificado no
+  processo a 24 kbps, ~5x menor que o MP3 de antes;
+- 'mp3' (padrão sem Opus): MP3 a 32 kbps, exportado pelo ffmpeg num
+  subprocesso a cada chunk;
+- 'flac' e 'wav': sem perdas (~130-256 kbps), só quando configurados; o wav
+  serve ao backend local, onde não há upload.
+
+Cada chunk gera estatísticas de bytes e de tempo. Os bytes enviados são
+medidos; o tamanho que o chunk teria no MP3 de 128 kbps exportado antes é uma
+estimativa (128 kbps x duração), sem exportar o MP3 de novo.
+"""
+from pathlib import Path
+import io
+import os
+import time
+import wave
+import logging
+
+import numpy as np
+import pydub
+
+try:
+    import soundfile
+except ImportError:
+    soundfile = None
+
+logger = logging.getLogger(__name__)
+
+TAXA_ALVO = 16000  # Hz
+BITRATE_FALA = '32k'
+BITRATE_OPUS_KBPS = 24  # fala mono a 16 kHz; o Whisper não ganha nada acima disso
+# A libsndfile leva compression_level (0 a 1) linearmente ao bitrate do Opus: 0 -> 256, 1 -> 6 kbps por canal
+OPUS_KBPS_MIN, OPUS_KBPS_MAX = 6, 256
+# Exportação anterior (pydub, sem bitrate): MP3 CBR 128 kbps do libmp3lame
+BITRATE_REFERENCIA_KBPS = 128
+TAPS_FILTRO = 63
+FORMATOS = ('opus', 'mp3', 'flac', 'wav')
+EXTENSOES = {'opus': 'ogg', 'mp3': 'mp3', 'flac': 'flac', 'wav': 'wav'}
+
+
+def _filtro_passa_baixa(frequencia_corte, taps=TAPS_FILTRO):
+    """FIR windowed-sinc (janela de Hamming); frequencia_corte relativa à taxa de entrada."""
+    n = np.arange(taps) - (taps - 1) / 2
+    h = np.sinc(2 * frequencia_corte * n) * np.hamming(taps)
+    return (h / h.sum()).astype(np.float32)
+
+
+def para_mono_16k(audio):
+    """
+    Converte um pydub.AudioSegment em amostras float32 mono a 16 kHz.
+
+    Returns:
+        np.ndarray: Amostras em [-1, 1]
+    """
+    amostras = np.array(audio.get_array_of_samples(), dtype=np.float32)
+    if audio.channels > 1:
+        amostras = amostras.reshape(-1, audio.channels).mean(axis=1)
+    amostras /= float(1 << (8 * audio.sample_width - 1))
+
+    taxa = audio.frame_rate
+    if taxa == TAXA_ALVO or len(amostras) == 0:
+        return amostras
+    if taxa > TAXA_ALVO:
+        # Passa-baixa antes de reduzir a taxa para evitar aliasing
+        amostras = np.convolve(amostras, _filtro_passa_baixa(0.45 * TAXA_ALVO / taxa), mode='same')
+    if taxa % TAXA_ALVO == 0:
+        return amostras[::taxa // TAXA_ALVO].copy()
+    duracao = len(amostras) / taxa
+    tempos_destino = np.arange(int(duracao * TAXA_ALVO)) / TAXA_ALVO
+    return np.interp(tempos_destino, np.arange(len(amostras)) / taxa, amostras).astype(np.float32)
+
+
+def _pcm16(amostras):
+    return (np.clip(amostras, -1.0, 1.0) * 32767).astype('<i2')
+
+
+def codifica_wav(amostras):
+    pcm = _pcm16(amostras)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as arquivo_wav:
+        arquivo_wav.setnchannels(1)
+        arquivo_wav.setsampwidth(2)
+        arquivo_wav.setframerate(TAXA_ALVO)
+        arquivo_wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def codifica_flac(amostras):
+    buffer = io.BytesIO()
+    soundfile.write(buffer, _pcm16(amostras), TAXA_ALVO, format='FLAC', subtype='PCM_16')
+    return buffer.getvalue()
+
+
+def codifica_opus(amostras, kbps=BITRATE_OPUS_KBPS):
+    """Ogg Opus pela libsndfile, no processo, no bitrate pedido (a libsndfile só o recebe como compression_level)."""
+    nivel = (OPUS_KBPS_MAX - kbps) / (OPUS_KBPS_MAX - OPUS_KBPS_MIN)
+    buffer = io.BytesIO()
+    soundfile.write(buffer, _pcm16(amostras), TAXA_ALVO, format='OGG', subtype='OPUS',
+                    compression_level=min(max(nivel, 0.0), 1.0))
+    return buffer.getvalue()
+
+
+def codifica_mp3(amostras, bitrate=BITRATE_FALA):
+    """MP3 pelo ffmpeg (subprocesso): o menor arquivo, mas o encoder não roda no processo."""
+    segmento = pydub.AudioSegment(data=_pcm16(amostras).tobytes(), sample_width=2,
+                                  frame_rate=TAXA_ALVO, channels=1)
+    buffer = io.BytesIO()
+    segmento.export(buffer, format='mp3', bitrate=bitrate)
+    return buffer.getvalue()
+
+
+CODIFICADORES = {'opus': codifica_opus, 'mp3': codifica_mp3, 'flac': codifica_flac, 'wav': codifica_wav}
+
+
+def _tem_opus():
+    return soundfile is not None and 'OPUS' in soundfile.available_subtypes('OGG')
+
+
+def formato_chunk():
+    """Formato configurado em AUDIO_FORMATO_CHUNK; padrão opus, ou mp3 se a libsndfile não tiver Opus."""
+    padrao = 'opus' if _tem_opus() else 'mp3'
+    formato = os.getenv('AUDIO_FORMATO_CHUNK', padrao).lower()
+    if formato not in FORMATOS or (formato == 'opus' and not _tem_opus()) \
+            or (formato == 'flac' and soundfile is None):
+        return padrao
+    return formato
+
+
+def bytes_referencia(duracao_ms):
+    """Estimativa do tamanho do mesmo chunk no MP3 CBR de 128 kbps exportado antes do pré-processamento."""
+    return int(duracao_ms * BITRATE_REFERENCIA_KBPS / 8)
+
+
+def prepara_chunk(audio, caminho_destino_sem_extensao, formato=None):
+    """
+    Converte o chunk para mono 16 kHz, codifica e grava no disco.
+
+    Args:
+        audio: pydub.AudioSegment recebido do WebRTC
+        caminho_destino_sem_extensao: Caminho do arquivo; a extensão vem do formato
+        formato: 'opus', 'mp3', 'flac' ou 'wav' (padrão: AUDIO_FORMATO_CHUNK)
+
+    Returns:
+        tuple[Path, dict]: Arquivo gravado e estatísticas do chunk
+    """
+    formato = formato or formato_chunk()
+    inicio = time.perf_counter()
+    amostras = para_mono_16k(audio)
+    tempo_conversao = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    dados = CODIFICADORES[formato](amostras)
+    tempo_codificacao = time.perf_counter() - inicio
+
+    caminho = Path(f'{caminho_destino_sem_extensao}.{EXTENSOES[formato]}')
+    caminho.write_bytes(dados)
+
+    referencia = bytes_referencia(len(audio))
+    estatisticas = {
+        'formato': formato,
+        'duracao_ms': len(audio),
+        'taxa_original': audio.frame_rate,
+        'canais_original': audio.channels,
+        'bytes_original': len(audio.raw_data),  # PCM como chegou do WebRTC
+        'bytes_referencia_estimados': referencia,
+        'bytes_enviados': len(dados),
+        'bytes_economizados_estimados': referencia - len(dados),
+        'conversao_ms': round(tempo_conversao * 1000, 1),
+        'codificacao_ms': round(tempo_codificacao * 1000, 1),
+    }
+    return caminho, estatisticas
+
+
+def completa_estatisticas(estatisticas, latencia_transcricao_ms):
+    """
+    Acrescenta a latência de transcrição e a de ponta a ponta.
+
+    Não há latência "economizada": a chamada da API não separa o envio dos
+    bytes do processamento no servidor, então o efeito dos bytes a menos só
+    aparece comparando a transcricao_ms de gravações em formatos diferentes.
+    """
+    estatisticas['transcricao_ms'] = round(latencia_transcricao_ms, 1)
+    estatisticas['ponta_a_ponta_ms'] = round(
+        estatisticas['conversao_ms'] + estatisticas['codificacao_ms'] + latencia_transcricao_ms, 1)
+    logger.info(f"Chunk {estatisticas['duracao_ms']} ms: {estatisticas['bytes_enviados'] / 1024:.0f} KB "
+                f"{estatisticas['formato']} (~{estatisticas['bytes_referencia_estimados'] / 1024:.0f} KB estimados "
+                f"no MP3 de 128 kbps anterior), "
+                f"ponta a ponta {estatisticas['ponta_a_ponta_ms']:.0f} ms")
+    return estatisticas
@@ -0,0 +1,146 @@
+"""
+Log de segmentos da transcrição (segmentos.jsonl).
+
+Cada chunk transcrito durante a gravação vira uma linha JSON com o texto, a
+posição no áudio (início e fim em ms), o id do chunk e a latência da API.
+O arquivo só recebe acréscimos, então gravar um chunk custa O(1) independente
+do tamanho da reunião; o transcricao.txt é uma visão derivada desse log e pode
+ser reconstruído a partir dele.
+
+Depois da gravação, a diarização anota cada segmento com o locutor
+(anota_segmentos) e o transcricao_locutores.txt é a visão com os turnos de fala.
+"""
+from pathlib import Path
+from datetime import datetime
+import os
+import json
+import logging
+import unicodedata
+
+from armazenamento import salva_arquivo
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_SEGMENTOS = 'segmentos.jsonl'
+SEPARADOR = ' '  # separador entre os textos dos segmentos no transcricao.txt
+ARQUIVO_TRANSCRICAO_LOCUTORES = 'transcricao_locutores.txt'
+
+
+def registra_segmento(pasta_reuniao, id_chunk, texto, inicio_ms, fim_ms, latencia_ms, **extras):
+    """
+    Acrescenta um segmento ao log.
+
+    Args:
+        pasta_reuniao: Pasta da reunião
+        id_chunk: Número sequencial do chunk de áudio
+        texto: Texto transcrito do chunk
+        inicio_ms, fim_ms: Posição do chunk no áudio da reunião, em milissegundos
+        latencia_ms: Tempo da chamada de transcrição
+        extras: Campos adicionais gravados junto (ex.: backend usado)
+
+    Returns:
+        dict: Segmento gravado
+    """
+    segmento = {
+        'id': id_chunk,
+        'inicio_ms': int(inicio_ms),
+        'fim_ms': int(fim_ms),
+        'latencia_ms': round(latencia_ms, 1),
+        'texto': texto,
+        'criado_em': datetime.now().isoformat(timespec='seconds'),
+        **extras,
+    }
+    with open(Path(pasta_reuniao) / ARQUIVO_SEGMENTOS, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(segmento, ensure_ascii=False) + '\n')
+    return segmento
+
+def le_segmentos(pasta_reuniao):
+    """Gera os segmentos na ordem em que foram gravados, ignorando linhas corrompidas."""
+    caminho = Path(pasta_reuniao) / ARQUIVO_SEGMENTOS
+    if not caminho.exists():
+        return
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for numero_linha, linha in enumerate(f, start=1):
+            if not linha.strip():
+                continue
+            try:
+                yield json.loads(linha)
+            except ValueError:
+                # Última linha pode ficar incompleta se o processo cair durante a escrita
+                logger.warning(f"Linha {numero_linha} inválida em {caminho}")
+
+def texto_dos_segmentos(segmentos):
+    return SEPARADOR.join(s['texto'].strip() for s in segmentos if s['texto'].strip())
+
+def texto_com_locutores(segmentos):
+    """Transcrição em turnos de fala ('Locutor 1: ...'), um parágrafo por turno."""
+    turnos, locutor_atual = [], None
+    for segmento in segmentos:
+        texto = segmento['texto'].strip()
+        if not texto:
+            continue
+        locutor = segmento.get('locutor', locutor_atual)
+        if locutor != locutor_atual or not turnos:
+            turnos.append(f'{locutor}: {texto}' if locutor else texto)
+            locutor_atual = locutor
+        else:
+            turnos[-1] += SEPARADOR + texto
+    return '\n\n'.join(turnos)
+
+def anota_segmentos(pasta_reuniao, anotacoes):
+    """
+    Acrescenta campos aos segmentos já gravados (ex.: locutor).
+
+    Ao contrário de registra_segmento, regrava o arquivo inteiro (num arquivo
+    temporário, trocado de uma vez), então só deve ser usado com a gravação encerrada.
+
+    Args:
+        anotacoes: dict id do segmento -> campos a acrescentar
+    """
+    pasta_reuniao = Path(pasta_reuniao)
+    caminho = pasta_reuniao / ARQUIVO_SEGMENTOS
+    temporario = caminho.with_suffix('.jsonl.tmp')
+    with open(temporario, 'w', encoding='utf-8') as f:
+        for segmento in le_segmentos(pasta_reuniao):
+            segmento.update(anotacoes.get(segmento['id'], {}))
+            f.write(json.dumps(segmento, ensure_ascii=False) + '\n')
+    os.replace(temporario, caminho)
+
+def reconstroi_transcricao(pasta_reuniao):
+    """
+    Regrava o transcricao.txt a partir do log de segmentos.
+
+    Returns:
+        bool: False se a reunião não tem log de segmentos (reuniões antigas)
+    """
+    pasta_reuniao = Path(pasta_reuniao)
+    if not (pasta_reuniao / ARQUIVO_SEGMENTOS).exists():
+        return False
+    salva_arquivo(pasta_reuniao / 'transcricao.txt', texto_dos_segmentos(le_segmentos(pasta_reuniao)))
+    return True
+
+def normaliza(texto):
+    """Remove acentos, coloca em minúsculas e junta os espaços (o índice de busca usa a mesma regra)."""
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return ' '.join(''.join(c for c in decomposto if not unicodedata.combining(c)).lower().split())
+
+def localiza_trecho(pasta_reuniao, trecho):
+    """
+    Procura o primeiro segmento que contém o trecho (sem diferenciar acentos e maiúsculas).
+
+    Returns:
+        dict | None: Segmento encontrado, com inicio_ms para posicionar o áudio
+    """
+    procurado = normaliza(trecho)
+    if not procurado:
+        return None
+    anterior, texto_anterior = None, ''
+    for segmento in le_segmentos(pasta_reuniao):
+        texto = normaliza(segmento['texto'])
+        if procurado in texto:
+            return segmento
+        # Trecho que começa no fim do segmento anterior e termina neste
+        if anterior is not None and procurado in f'{texto_anterior} {texto}':
+            return anterior
+        anterior, texto_anterior = segmento, texto
+    return None
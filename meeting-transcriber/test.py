@@ -0,0 +1,882 @@
+import io
+import os
+import json
+import runpy
+import sys
+import threading
+import time
+import types
+import wave
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pydub
+import pytest
+from openai import APIConnectionError, BadRequestError, RateLimitError
+
+os.environ.setdefault("OPENAI_API_KEY", "teste")  # o app cria o cliente OpenAI ao ser importado
+
+import app
+import armazenamento
+import busca
+from armazenamento import anexa_arquivo, le_arquivo, migra_arquivos, salva_arquivo
+from backends_transcricao import BackendLocal, BackendOpenAI, cria_backend
+from busca import IndiceBusca
+from cache_openai import CacheOpenAI
+from catalogo import CatalogoReunioes
+from cliente_openai import CircuitBreaker, CircuitoAbertoError, ClienteResiliente, TokenBucket
+import manutencao_audio
+from diarizacao import agrupa, diariza_amostras, rotula_segmentos
+from importacao import FilaImportacao, le_legendas
+from metricas_latencia import ARQUIVO_METRICAS, MetricasLatencia
+import preprocessamento_audio
+from preprocessamento_audio import completa_estatisticas, para_mono_16k, prepara_chunk
+from segmentos import (anota_segmentos, le_segmentos, localiza_trecho, reconstroi_transcricao,
+                       registra_segmento, texto_com_locutores)
+
+
+def _resposta(status, headers=None):
+    return SimpleNamespace(status_code=status, headers=headers or {}, request=None)
+
+
+# app: resumo hierárquico ==========
+
+def test_divide_em_trechos_respeita_limite_e_mantem_o_texto():
+    texto = " ".join(f"Frase número {i} da reunião." for i in range(200))
+    trechos = app.divide_em_trechos(texto, max_tokens=50)
+    assert len(trechos) > 1
+    assert all(app.conta_tokens(trecho) <= 50 for trecho in trechos)
+    assert " ".join(trechos).split() == texto.split()
+
+
+def test_divide_em_trechos_sem_espaco_apos_pontuacao():
+    # Chunks do Whisper concatenados: "fim.Começo"
+    trechos = app.divide_em_trechos("Primeira frase.Segunda frase!Terceira?", max_tokens=5)
+    assert trechos == ["Primeira frase.", "Segunda frase!", "Terceira?"]
+
+
+def test_divide_em_trechos_quebra_frase_longa_por_palavras():
+    texto = " ".join(["palavra"] * 500)
+    trechos = app.divide_em_trechos(texto, max_tokens=40)
+    assert all(app.conta_tokens(trecho) <= 40 for trecho in trechos)
+    assert " ".join(trechos).split() == texto.split()
+
+
+def test_texto_curto_e_um_trecho():
+    assert app.divide_em_trechos("  Só uma frase.  ") == ["Só uma frase."]
+
+
+# app: resumo incremental ==========
+
+def _sem_streamlit(*args, **kwargs):
+    raise AssertionError("st.cache_resource chamado fora do script do Streamlit")
+
+
+def test_resumo_incremental_em_segundo_plano_usa_catalogo_e_indice_recebidos(tmp_path, monkeypatch):
+    catalogo = CatalogoReunioes(tmp_path, tmp_path / "catalogo.sqlite3")
+    indice = IndiceBusca(tmp_path / "busca.sqlite3")
+    monkeypatch.setattr(app, "obter_catalogo", _sem_streamlit)
+    monkeypatch.setattr(app, "obter_indice_busca", _sem_streamlit)
+    monkeypatch.setattr(app, "gerar_resposta_openai", lambda prompt: "Resumo da reunião")
+    pasta = tmp_path / "2024_01_02_10_00_00"
+    pasta.mkdir()
+    resumo = app.ResumoIncremental(pasta, catalogo, indice)
+    resumo.finaliza("Transcrição da reunião.", esperar=False)
+    resumo.aguarda()
+    assert le_arquivo(pasta / "resumo.txt") == "Resumo da reunião"
+    assert catalogo.obtem(pasta.name)["tem_resumo"] == 1
+    assert [r["campo"] for r in indice.busca("resumo")] == ["resumo"]
+    assert resumo.caracteres_resumidos == len("Transcrição da reunião.")
+
+
+def test_resumo_incremental_e_o_mesmo_depois_do_rerun(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "obter_catalogo", lambda: None)
+    monkeypatch.setattr(app, "obter_indice_busca", lambda: None)
+    pasta = tmp_path / "2024_01_02_10_00_00"
+    pasta.mkdir()
+    resumo = app.obter_resumo_incremental(pasta)
+    # O rerun do Streamlit executa app.py de novo, com o mesmo nome, num namespace vazio
+    rerun = runpy.run_path(app.__file__, run_name=app.__name__)["obter_resumo_incremental"]
+    assert rerun is not app.obter_resumo_incremental
+    monkeypatch.setitem(rerun.__globals__, "obter_catalogo", lambda: None)
+    monkeypatch.setitem(rerun.__globals__, "obter_indice_busca", lambda: None)
+    assert rerun(pasta) is resumo
+    assert rerun(tmp_path / "outra") is not resumo
+
+
+# cache_openai ==========
+
+def test_cache_acerto_falha_e_chave_por_conteudo(tmp_path):
+    cache = CacheOpenAI(tmp_path, ttl_segundos=60, max_bytes=10_000, ativo=True)
+    chave = cache.chave("chat", {"model": "m"}, "prompt")
+    assert chave == cache.chave("chat", {"model": "m"}, "prompt")
+    assert chave != cache.chave("chat", {"model": "m"}, "outro prompt")
+    assert chave != cache.chave("chat", {"model": "outro"}, "prompt")
+    assert cache.obter(chave) is None
+    cache.salvar(chave, "resposta")
+    assert cache.obter(chave) == "resposta"
+    assert cache.estatisticas() == {"ativo": True, "acertos": 1, "falhas": 1, "taxa_acerto": 0.5}
+
+
+def test_cache_expira_pelo_ttl(tmp_path):
+    cache = CacheOpenAI(tmp_path, ttl_segundos=60, max_bytes=10_000, ativo=True)
+    cache.salvar("k", "v")
+    entrada = json.loads((tmp_path / "k.json").read_text(encoding="utf-8"))
+    entrada["criado"] -= 120
+    (tmp_path / "k.json").write_text(json.dumps(entrada), encoding="utf-8")
+    assert cache.obter("k") is None
+    assert not (tmp_path / "k.json").exists()
+
+
+def test_entrada_expirada_sai_do_tamanho_total(tmp_path):
+    cache = CacheOpenAI(tmp_path, ttl_segundos=60, max_bytes=10_000, ativo=True)
+    cache.salvar("velha", "x" * 400)
+    cache.salvar("nova", "y" * 400)
+    cache.ttl_segundos = -1
+    assert cache.obter("velha") is None  # expirada e apagada
+    # O total que decide a remoção por tamanho acompanha o que está em disco
+    assert cache._tamanho_total == (tmp_path / "nova.json").stat().st_size
+
+
+def test_cache_desativado_nao_grava(tmp_path):
+    cache = CacheOpenAI(tmp_path, ttl_segundos=60, max_bytes=10_000, ativo=False)
+    cache.salvar("k", "v")
+    assert cache.obter("k") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cache_remove_as_entradas_menos_usadas(tmp_path):
+    cache = CacheOpenAI(tmp_path, ttl_segundos=60, max_bytes=1000, ativo=True)
+    for i in range(10):
+        cache.salvar(f"k{i}", "x" * 150)
+        os.utime(tmp_path / f"k{i}.json", (i, i))  # k0 é a menos usada
+    restantes = sorted(p.stem for p in tmp_path.glob("*.json"))
+    assert sum(p.stat().st_size for p in tmp_path.glob("*.json")) <= 1000
+    assert "k9" in restantes and "k0" not in restantes
+
+
+def test_cache_sobrescrever_nao_soma_o_tamanho(tmp_path):
+    cache = CacheOpenAI(tmp_path, ttl_segundos=60, max_bytes=1000, ativo=True)
+    cache.salvar("outra", "y" * 100)
+    for _ in range(20):
+        cache.salvar("k", "x" * 300)
+    tamanho_real = sum(p.stat().st_size for p in tmp_path.glob("*.json"))
+    assert cache._tamanho_total == tamanho_real
+    assert (tmp_path / "outra.json").exists()  # nada foi removido antes da hora
+
+
+# cliente_openai ==========
+
+def test_token_bucket_permite_rajada_e_depois_limita():
+    balde = TokenBucket(60)  # 1 ficha por segundo
+    assert balde.adquirir(60) < 0.1
+    with pytest.raises(TimeoutError):
+        balde.adquirir(10, timeout=0.1)
+
+
+def test_circuit_breaker_abre_e_deixa_passar_um_teste():
+    breaker = CircuitBreaker(limite_falhas=2, tempo_recuperacao=0.0)
+    breaker.registra_falha()
+    assert breaker.estado == "fechado"
+    breaker.registra_falha()
+    assert breaker.estado == "meio_aberto"
+    breaker.permite()  # a chamada de teste
+    with pytest.raises(CircuitoAbertoError):
+        breaker.permite()
+    breaker.registra_sucesso()
+    assert breaker.estado == "fechado"
+    breaker.permite()
+
+
+def test_circuit_breaker_aberto_recusa_chamadas():
+    breaker = CircuitBreaker(limite_falhas=1, tempo_recuperacao=60.0)
+    breaker.registra_falha()
+    assert breaker.estado == "aberto"
+    with pytest.raises(CircuitoAbertoError):
+        breaker.permite()
+
+
+def test_cliente_repete_apos_rate_limit():
+    cliente = ClienteResiliente(client=object(), rpm=600, tpm=100_000)
+    chamadas = []
+
+    def chamada():
+        chamadas.append(1)
+        if len(chamadas) == 1:
+            raise RateLimitError("limite", response=_resposta(429, {"retry-after": "0"}), body=None)
+        return "ok"
+
+    assert cliente.executa("chat", "modelo", chamada, tokens_estimados=10) == "ok"
+    metricas = cliente.metricas()
+    assert metricas["chat"]["tentativas"] == 2
+    assert metricas["chat"]["chamadas"] == 1
+    assert metricas["circuit_breaker"] == "fechado"
+
+
+def test_cliente_nao_repete_erro_da_requisicao():
+    cliente = ClienteResiliente(client=object(), rpm=600, tpm=100_000)
+    chamadas = []
+
+    def chamada():
+        chamadas.append(1)
+        raise BadRequestError("inválida", response=_resposta(400), body=None)
+
+    with pytest.raises(BadRequestError):
+        cliente.executa("chat", "modelo", chamada)
+    assert len(chamadas) == 1
+    assert cliente.circuit_breaker.falhas_seguidas == 0
+
+
+def test_cliente_desiste_quando_acabam_as_tentativas():
+    cliente = ClienteResiliente(client=object(), rpm=600, tpm=100_000, max_tentativas=2, base_delay=0.0)
+    cliente._tempo_espera = lambda erro, tentativa: 0.0
+
+    def chamada():
+        raise APIConnectionError(request=None)
+
+    with pytest.raises(APIConnectionError):
+        cliente.executa("chat", "modelo", chamada)
+    assert cliente.metricas()["chat"]["tentativas"] == 2
+    assert cliente.circuit_breaker.falhas_seguidas == 2
+
+
+def test_erro_local_nao_conta_para_o_circuit_breaker(tmp_path):
+    cliente = ClienteResiliente(client=object(), rpm=600, tpm=100_000)
+    cliente.circuit_breaker = CircuitBreaker(limite_falhas=1, tempo_recuperacao=60.0)
+    for _ in range(3):
+        with pytest.raises(FileNotFoundError):
+            cliente.transcreve(tmp_path / "nao_existe.mp3", model="whisper-1")
+    assert cliente.circuit_breaker.estado == "fechado"
+    assert cliente.metricas()["transcricao"]["erros"] == 3
+
+
+def test_erro_local_no_teste_meio_aberto_libera_o_proximo():
+    cliente = ClienteResiliente(client=object(), rpm=600, tpm=100_000)
+    cliente.circuit_breaker = CircuitBreaker(limite_falhas=1, tempo_recuperacao=0.0)
+    cliente.circuit_breaker.registra_falha()
+    with pytest.raises(ValueError):
+        cliente.executa("chat", "modelo", lambda: int("x"))
+    assert cliente.executa("chat", "modelo", lambda: "ok") == "ok"
+    assert cliente.circuit_breaker.estado == "fechado"
+
+
+def test_circuito_aberto_nao_gasta_fichas():
+    cliente = ClienteResiliente(client=object(), rpm=2, tpm=100_000)
+    cliente.circuit_breaker = CircuitBreaker(limite_falhas=1, tempo_recuperacao=60.0)
+    cliente.circuit_breaker.registra_falha()
+    for _ in range(5):
+        with pytest.raises(CircuitoAbertoError):
+            cliente.executa("chat", "modelo", lambda: "ok")
+    balde_rpm, _ = cliente._baldes_modelo("modelo")
+    assert balde_rpm.fichas == pytest.approx(2, abs=0.1)
+
+
+def test_timeout_do_limite_de_taxa_libera_o_teste_meio_aberto():
+    cliente = ClienteResiliente(client=object(), rpm=1, tpm=100_000, orcamento_segundos=0.1)
+    cliente.circuit_breaker = CircuitBreaker(limite_falhas=1, tempo_recuperacao=0.0)
+    cliente.circuit_breaker.registra_falha()
+    cliente._baldes_modelo("modelo")[0].fichas = 0
+    with pytest.raises(TimeoutError):
+        cliente.executa("chat", "modelo", lambda: "ok")
+    cliente.circuit_breaker.permite()  # o teste não ficou preso como em andamento
+
+
+# catalogo ==========
+
+def _reuniao(pasta_arquivos, nome, titulo=None, resumo=None):
+    pasta = pasta_arquivos / nome
+    pasta.mkdir()
+    if titulo is not None:
+        (pasta / "titulo.txt").write_text(titulo, encoding="utf-8")
+    if resumo is not None:
+        (pasta / "resumo.txt").write_text(resumo, encoding="utf-8")
+    return pasta
+
+
+def test_catalogo_sincroniza_pastas_existentes(tmp_path):
+    _reuniao(tmp_path, "2024_01_02_10_00_00", titulo="Planejamento", resumo="r")
+    _reuniao(tmp_path, "2024_03_05_09_00_00")
+    _reuniao(tmp_path, "importada", titulo="Sem data")
+    catalogo = CatalogoReunioes(tmp_path, tmp_path / "catalogo.sqlite3")
+    assert catalogo.sincroniza(le_arquivo) == (3, 0)
+    assert catalogo.sincroniza(le_arquivo) == (0, 0)
+
+    reunioes, total = catalogo.lista()
+    assert total == 3
+    # Mais recente primeiro; pastas sem data no fim
+    assert [r["id"] for r in reunioes] == ["2024_03_05_09_00_00", "2024_01_02_10_00_00", "importada"]
+    assert reunioes[1]["titulo"] == "Planejamento" and reunioes[1]["tem_resumo"] == 1
+    assert catalogo.rotulo(reunioes[1]) == "2024/01/02 10:00:00 - Planejamento"
+
+    (tmp_path / "importada" / "titulo.txt").unlink()
+    (tmp_path / "importada").rmdir()
+    assert catalogo.sincroniza(le_arquivo) == (0, 1)
+    assert catalogo.obtem("importada") is None
+
+
+def test_catalogo_busca_e_paginacao(tmp_path):
+    catalogo = CatalogoReunioes(tmp_path, tmp_path / "catalogo.sqlite3")
+    for dia in range(1, 6):
+        catalogo.registra(f"2024_02_0{dia}_10_00_00", titulo=f"Reunião {dia}")
+    pagina, total = catalogo.lista(pagina=1, por_pagina=2)
+    assert total == 5
+    assert [r["id"] for r in pagina] == ["2024_02_03_10_00_00", "2024_02_02_10_00_00"]
+    assert catalogo.lista(busca="2024/02/04")[1] == 1
+    assert catalogo.lista(busca="Reunião 5")[0][0]["id"] == "2024_02_05_10_00_00"
+    # Consulta em cache é invalidada quando uma reunião muda
+    catalogo.registra("2024_02_05_10_00_00", titulo="Retrospectiva")
+    assert catalogo.lista(busca="Reunião 5")[1] == 0
+
+
+def test_catalogo_busca_trata_curingas_como_texto(tmp_path):
+    catalogo = CatalogoReunioes(tmp_path, tmp_path / "catalogo.sqlite3")
+    catalogo.registra("2024_02_01_10_00_00", titulo="Meta 100% atingida")
+    catalogo.registra("2024_02_02_10_00_00", titulo="Meta 1000 clientes")
+    catalogo.registra("2024_02_03_10_00_00", titulo="plano_b")
+    catalogo.registra("2024_02_04_10_00_00", titulo="plano b")
+    catalogo.registra("2024_02_05_10_00_00", titulo="pasta C:\\atas")
+    assert [r["titulo"] for r in catalogo.lista(busca="100%")[0]] == ["Meta 100% atingida"]
+    assert [r["titulo"] for r in catalogo.lista(busca="plano_b")[0]] == ["plano_b"]
+    assert catalogo.lista(busca="C:\\atas")[1] == 1
+    assert catalogo.lista(busca="2024/02/03")[1] == 1
+
+
+def test_catalogo_nao_guarda_consulta_feita_antes_de_uma_alteracao(tmp_path):
+    catalogo = CatalogoReunioes(tmp_path, tmp_path / "catalogo.sqlite3")
+    catalogo.registra("2024_02_01_10_00_00", titulo="Antes")
+    conecta = catalogo._conecta
+
+    @contextmanager
+    def conecta_e_altera_depois_da_consulta():
+        # outra thread grava entre a consulta e o momento de guardar o resultado
+        with conecta() as conexao:
+            yield conexao
+        catalogo._conecta = conecta
+        catalogo.registra("2024_02_01_10_00_00", titulo="Depois")
+
+    catalogo._conecta = conecta_e_altera_depois_da_consulta
+    assert catalogo.lista()[0][0]["titulo"] == "Antes"
+    assert catalogo.lista()[0][0]["titulo"] == "Depois"
+
+
+# busca ==========
+
+def test_busca_ignora_acentos_e_aceita_prefixo(tmp_path):
+    indice = IndiceBusca(tmp_path / "busca.sqlite3")
+    indice.indexa_campo("r1", "titulo", "Reunião de Orçamento")
+    indice.indexa_campo("r2", "resumo", "Definimos o orcamento do trimestre")
+    resultados = indice.busca("ORÇAMENTO")
+    assert [(r["reuniao"], r["campo"]) for r in resultados] == [("r1", "titulo"), ("r2", "resumo")]
+    assert [r["reuniao"] for r in indice.busca("trimes")] == ["r2"]
+    assert indice.busca("...") == []
+
+
+def test_busca_indexa_a_transcricao_em_partes(tmp_path):
+    indice = IndiceBusca(tmp_path / "busca.sqlite3")
+    indice.indexa_transcricao("r1", "começamos falando de vendas")
+    indice.indexa_transcricao("r1", "começamos falando de vendas e depois de marketing")
+    assert len(indice.busca("vendas")) == 1  # o início não foi indexado duas vezes
+    assert [r["campo"] for r in indice.busca("marketing")] == ["transcricao"]
+    # Transcrição reescrita (ex.: com locutores) é indexada de novo
+    indice.indexa_transcricao("r1", "Locutor 1: falamos de contratos")
+    assert indice.busca("vendas") == []
+    assert len(indice.busca("contratos")) == 1
+
+
+def test_busca_acrescimo_nao_rele_o_inicio(tmp_path, monkeypatch):
+    indice = IndiceBusca(tmp_path / "busca.sqlite3")
+    transcricao = "abertura da reunião " * 500
+    indice.indexa_transcricao("r1", transcricao)
+    hasheados = []
+    original = busca._hash_final
+    monkeypatch.setattr(busca, "_hash_final", lambda texto, fim: hasheados.append(
+        min(fim, busca.CARACTERES_CONFERIDOS)) or original(texto, fim))
+    for i in range(20):
+        transcricao += f" trecho{i} novo"
+        indice.indexa_transcricao("r1", transcricao)
+    assert max(hasheados) <= busca.CARACTERES_CONFERIDOS
+    assert [r["reuniao"] for r in indice.busca("trecho19")] == ["r1"]
+    assert len(indice.busca("abertura")) == len(busca._divide_partes("abertura da reunião " * 500))
+    # Inserção no meio desloca o final conferido: reindexa tudo
+    indice.indexa_transcricao("r1", "Locutor 1: " + transcricao)
+    assert [r["reuniao"] for r in indice.busca("locutor")] == ["r1"]
+
+
+def test_busca_palavras_em_partes_diferentes(tmp_path):
+    indice = IndiceBusca(tmp_path / "busca.sqlite3")
+    indice.indexa_transcricao("r1", "alfa " + "palavra " * 200 + "beta")
+    indice.indexa_transcricao("r2", "alfa e beta juntos")
+    resultados = indice.busca("alfa beta")
+    assert [r["reuniao"] for r in resultados] == ["r2", "r1"]
+    assert resultados[1]["pontuacao"] <= resultados[0]["pontuacao"]
+
+
+def test_busca_sincroniza_pasta(tmp_path):
+    pasta = _reuniao(tmp_path, "2024_01_02_10_00_00", titulo="Kickoff")
+    (pasta / "transcricao.txt").write_text("apresentação do cronograma", encoding="utf-8")
+    indice = IndiceBusca(tmp_path / "busca.sqlite3")
+    assert indice.sincroniza(tmp_path, le_arquivo) == 2
+    assert indice.sincroniza(tmp_path, le_arquivo) == 0
+    assert [r["campo"] for r in indice.busca("cronograma")] == ["transcricao"]
+    for arquivo in pasta.iterdir():
+        arquivo.unlink()
+    pasta.rmdir()
+    indice.sincroniza(tmp_path, le_arquivo)
+    assert indice.busca("kickoff") == []
+
+
+# segmentos ==========
+
+def test_segmentos_log_e_transcricao(tmp_path):
+    registra_segmento(tmp_path, 0, " Bom dia a todos. ", 0, 5000, 812.34)
+    registra_segmento(tmp_path, 1, "", 5000, 10000, 500)
+    registra_segmento(tmp_path, 2, "Vamos começar.", 10000, 15000, 700, backend="local")
+    with open(tmp_path / "segmentos.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"id": 3, "texto": "incomple')  # queda no meio da escrita
+
+    segmentos = list(le_segmentos(tmp_path))
+    assert [s["id"] for s in segmentos] == [0, 1, 2]
+    assert segmentos[0]["latencia_ms"] == 812.3 and segmentos[2]["backend"] == "local"
+    assert reconstroi_transcricao(tmp_path)
+    assert le_arquivo(tmp_path / "transcricao.txt") == "Bom dia a todos. Vamos começar."
+    (tmp_path / "antiga").mkdir()
+    assert not reconstroi_transcricao(tmp_path / "antiga")  # reunião sem log de segmentos
+
+
+def test_localiza_trecho_entre_segmentos(tmp_path):
+    registra_segmento(tmp_path, 0, "A proposta de orçamento", 0, 5000, 1)
+    registra_segmento(tmp_path, 1, "foi aprovada ontem.", 5000, 10000, 1)
+    assert localiza_trecho(tmp_path, "ORCAMENTO")["inicio_ms"] == 0
+    assert localiza_trecho(tmp_path, "orçamento foi aprovada")["id"] == 0
+    assert localiza_trecho(tmp_path, "aprovada")["id"] == 1
+    assert localiza_trecho(tmp_path, "cancelada") is None
+
+
+def test_anota_segmentos_com_locutores(tmp_path):
+    for i, texto in enumerate(["Oi.", "Tudo bem?", "Sim."]):
+        registra_segmento(tmp_path, i, texto, i * 1000, (i + 1) * 1000, 1)
+    anota_segmentos(tmp_path, {0: {"locutor": "Locutor 1"}, 1: {"locutor": "Locutor 1"},
+                               2: {"locutor": "Locutor 2"}})
+    assert texto_com_locutores(le_segmentos(tmp_path)) == "Locutor 1: Oi. Tudo bem?\n\nLocutor 2: Sim."
+
+
+# armazenamento ==========
+
+def test_migra_arquivos_para_utf8(tmp_path):
+    pasta = tmp_path / "2023_11_14_13_31_12"
+    pasta.mkdir()
+    (pasta / "titulo.txt").write_bytes("Reunião de Gestão".encode("windows-1252"))
+    (pasta / "resumo.txt").write_text("já em UTF-8", encoding="utf-8")
+    assert migra_arquivos(tmp_path) == 1
+    assert (pasta / "titulo.txt").read_text(encoding="utf-8") == "Reunião de Gestão"
+    encodings = json.loads((pasta / "encodings.json").read_text(encoding="utf-8"))
+    assert encodings["titulo.txt"]["encoding_original"] == "windows-1252"
+    assert encodings["resumo.txt"]["encoding_original"] == "utf-8"
+    assert migra_arquivos(tmp_path) == 0  # pasta já migrada
+
+
+def test_le_arquivo_converte_na_primeira_leitura(tmp_path):
+    caminho = tmp_path / "transcricao.txt"
+    caminho.write_bytes("decisão".encode("latin-1"))
+    assert le_arquivo(caminho) == "decisão"
+    assert caminho.read_bytes() == "decisão".encode("utf-8")
+    assert le_arquivo(tmp_path / "nao_existe.txt") == ""
+
+
+def test_le_arquivo_acompanha_escritas_e_acrescimos(tmp_path):
+    caminho = tmp_path / "transcricao.txt"
+    salva_arquivo(caminho, "primeiro")
+    assert le_arquivo(caminho) == "primeiro"
+    anexa_arquivo(caminho, " segundo")
+    assert le_arquivo(caminho) == "primeiro segundo"
+    # Alteração feita fora do módulo também é vista (mtime e tamanho mudam)
+    time.sleep(0.01)
+    caminho.write_text("reescrito por fora", encoding="utf-8")
+    assert le_arquivo(caminho) == "reescrito por fora"
+    assert armazenamento._caracteres_cache == sum(len(c) for _, _, c in armazenamento._cache.values())
+
+
+# backends_transcricao ==========
+
+class _WhisperFalso:
+    """faster_whisper.WhisperModel de teste: o "áudio" é um arquivo de texto."""
+
+    def __init__(self, modelo, **opcoes):
+        self.opcoes = opcoes
+        self.chamadas = []
+        self.barreira = None  # threading.Barrier para exigir transcrições simultâneas
+
+    def transcribe(self, caminho, **opcoes):
+        self.chamadas.append(caminho)
+        if self.barreira is not None:
+            self.barreira.wait()
+        texto = Path(caminho).read_text(encoding="utf-8")
+        return iter([SimpleNamespace(text=" " + texto), SimpleNamespace(text=" fim. ")]), None
+
+
+def _faster_whisper(monkeypatch, modelo):
+    modulo = types.ModuleType("faster_whisper")
+    modulo.WhisperModel = modelo
+    monkeypatch.setitem(sys.modules, "faster_whisper", modulo)
+
+
+def test_cria_backend_pelo_nome(monkeypatch):
+    monkeypatch.delenv("TRANSCRICAO_BACKEND", raising=False)
+    cliente = object()
+    backend = cria_backend(cliente=cliente)
+    assert isinstance(backend, BackendOpenAI) and backend.cliente is cliente
+    monkeypatch.setenv("TRANSCRICAO_BACKEND", "local")
+    assert isinstance(cria_backend(), BackendLocal)
+    with pytest.raises(ValueError, match="desconhecido"):
+        cria_backend("nuvem")
+
+
+def test_backend_local_que_nao_carrega_cai_para_a_api(monkeypatch):
+    def falha_ao_baixar(modelo, **opcoes):
+        raise RuntimeError("modelo small não baixou")
+
+    _faster_whisper(monkeypatch, falha_ao_baixar)
+    monkeypatch.setenv("TRANSCRICAO_BACKEND", "local")
+    backend = app.obter_backend_transcricao.__wrapped__()
+    assert isinstance(backend, BackendOpenAI)
+    assert backend.erro_carregamento == "RuntimeError: modelo small não baixou"
+    monkeypatch.setitem(sys.modules, "faster_whisper", None)  # pacote não instalado
+    assert "faster-whisper" in app.obter_backend_transcricao.__wrapped__().erro_carregamento
+
+
+def test_backend_local_transcreve_em_lote_no_pool(tmp_path, monkeypatch):
+    _faster_whisper(monkeypatch, _WhisperFalso)
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    cache = CacheOpenAI(tmp_path / "cache", ttl_segundos=60, max_bytes=10_000, ativo=True)
+    backend = BackendLocal(cache=cache, modelo="tiny", cpu_threads=4)
+    assert backend.max_workers() == 2
+    backend.carrega()
+    modelo = backend._whisper
+    assert (modelo.opcoes["cpu_threads"], modelo.opcoes["num_workers"]) == (4, 2)
+
+    caminhos = []
+    for i in range(4):
+        caminhos.append(tmp_path / f"{i}.wav")
+        caminhos[-1].write_text(f"trecho {i}", encoding="utf-8")
+    modelo.barreira = threading.Barrier(2, timeout=5)  # só passa com 2 transcrições ao mesmo tempo
+    progresso = []
+    textos = backend.transcreve_em_lote(caminhos, progresso=lambda *args: progresso.append(args))
+    assert textos == [f"trecho {i} fim." for i in range(4)]
+    assert progresso == [(1, 4), (2, 4), (3, 4), (4, 4)]
+
+    modelo.barreira = None
+    assert backend.transcreve(caminhos[0]) == "trecho 0 fim."  # do cache
+    assert len(modelo.chamadas) == 4
+
+
+# importacao ==========
+
+VTT = """WEBVTT
+
+00:00:01.000 --> 00:00:04.500
+<v Ana>Bom dia a todos.
+
+00:00:05.000 --> 00:00:07.000
+<v.lider Bruno>Vamos <b>começar</b>.
+"""
+
+SRT = """1
+00:00:01,000 --> 00:00:04,500
+Bom dia a todos.
+
+2
+01:00:05,000 --> 01:00:07,250
+Vamos começar.
+"""
+
+SBV = """0:00:01.000,0:00:04.500
+Bom dia a todos.
+
+0:00:05.000,0:00:07.000
+Vamos começar.
+"""
+
+
+def test_le_legendas_vtt_srt_sbv():
+    assert le_legendas(VTT) == [(1000, 4500, "Ana: Bom dia a todos."), (5000, 7000, "Bruno: Vamos começar.")]
+    assert le_legendas(SRT.replace("\n", "\r\n")) == [(1000, 4500, "Bom dia a todos."),
+                                                        (3605000, 3607250, "Vamos começar.")]
+    assert le_legendas(SBV) == [(1000, 4500, "Bom dia a todos."), (5000, 7000, "Vamos começar.")]
+    assert le_legendas("WEBVTT\n\nsem tempos") == []
+
+
+def _importa(tmp_path, importar):
+    pasta_arquivos = tmp_path / "arquivos"
+    pasta_arquivos.mkdir()
+    fila = FilaImportacao(pasta_arquivos, transcreve_lote=None, resume=lambda pasta: None,
+                          registra=lambda pasta: None, processos=1, threads=2)
+    try:
+        jobs = importar(fila)
+        limite = time.monotonic() + 10
+        while fila.pendentes() and time.monotonic() < limite:
+            time.sleep(0.01)
+        return fila, jobs
+    finally:
+        fila.encerra()
+
+
+def test_importacao_continua_quando_um_job_falha(tmp_path):
+    origem = tmp_path / "meet"
+    origem.mkdir()
+    (origem / "a_vazia.vtt").write_text("WEBVTT\n", encoding="utf-8")
+    (origem / "b_reuniao.srt").write_text(SRT, encoding="utf-8")
+    (origem / "notas.pdf").write_bytes(b"%PDF")
+    fila, jobs = _importa(tmp_path, lambda fila: fila.importa_pasta(origem))
+    assert [job.arquivo.name for job in jobs] == ["a_vazia.vtt", "b_reuniao.srt"]
+    falhou, importado = jobs
+    assert falhou.etapa == "erro" and "Nenhuma legenda" in falhou.erro
+    assert importado.etapa == "concluído" and importado.erro is None
+    assert le_arquivo(importado.pasta_reuniao / "transcricao.txt") == "Bom dia a todos. Vamos começar."
+    assert le_arquivo(importado.pasta_reuniao / "titulo.txt") == "b_reuniao"
+    # Jobs terminados expiram pelo TTL
+    assert fila.limpa_expirados(agora=time.time()) == 0
+    assert fila.limpa_expirados(agora=time.time() + fila.ttl + 1) == 2
+    assert fila.lista() == []
+
+
+def test_importacao_nao_altera_o_arquivo_de_origem(tmp_path):
+    origem = tmp_path / "meet"
+    origem.mkdir()
+    original = "Decisão: aprovar o orçamento.".encode("windows-1252")
+    (origem / "ata.txt").write_bytes(original)
+    _, (job,) = _importa(tmp_path, lambda fila: fila.importa_pasta(origem))
+    assert job.erro is None
+    assert le_arquivo(job.pasta_reuniao / "transcricao.txt") == "Decisão: aprovar o orçamento."
+    assert (origem / "ata.txt").read_bytes() == original
+    assert sorted(p.name for p in origem.iterdir()) == ["ata.txt"]
+
+
+# preprocessamento_audio ==========
+
+def _audio_48k_estereo(segundos=1.0, frequencia=440):
+    t = np.arange(int(48000 * segundos)) / 48000
+    onda = (0.5 * np.sin(2 * np.pi * frequencia * t) * 32767).astype("<i2")
+    return pydub.AudioSegment(data=np.repeat(onda, 2).tobytes(), sample_width=2, frame_rate=48000, channels=2)
+
+
+def test_para_mono_16k():
+    amostras = para_mono_16k(_audio_48k_estereo())
+    assert amostras.dtype == np.float32
+    assert len(amostras) == 16000
+    assert 0.45 < np.abs(amostras[100:-100]).max() <= 0.51
+
+
+def test_prepara_chunk_wav(tmp_path):
+    audio = _audio_48k_estereo()
+    caminho, estatisticas = prepara_chunk(audio, tmp_path / "chunk", formato="wav")
+    assert caminho == tmp_path / "chunk.wav"
+    with wave.open(str(caminho)) as arquivo_wav:
+        assert (arquivo_wav.getnchannels(), arquivo_wav.getframerate(), arquivo_wav.getnframes()) == (1, 16000, 16000)
+    assert estatisticas["bytes_enviados"] == caminho.stat().st_size
+    assert estatisticas["duracao_ms"] == 1000
+    assert (estatisticas["taxa_original"], estatisticas["canais_original"]) == (48000, 2)
+
+
+def test_prepara_chunk_flac(tmp_path):
+    soundfile = pytest.importorskip("soundfile")
+    caminho, _ = prepara_chunk(_audio_48k_estereo(), tmp_path / "chunk", formato="flac")
+    dados, taxa = soundfile.read(io.BytesIO(caminho.read_bytes()))
+    assert (taxa, dados.ndim, len(dados)) == (16000, 1, 16000)
+
+
+def test_padrao_e_opus_menor_que_o_mp3_anterior(tmp_path, monkeypatch):
+    soundfile = pytest.importorskip("soundfile")
+    if "OPUS" not in soundfile.available_subtypes("OGG"):
+        pytest.skip("libsndfile sem Opus")
+    monkeypatch.delenv("AUDIO_FORMATO_CHUNK", raising=False)
+    gerador = np.random.default_rng(0)
+    ruido = (gerador.standard_normal(48000 * 10) * 3000).astype("<i2")
+    audio = pydub.AudioSegment(data=ruido.tobytes(), sample_width=2, frame_rate=48000, channels=1)
+    caminho, estatisticas = prepara_chunk(audio, tmp_path / "chunk")
+    assert caminho == tmp_path / "chunk.ogg"
+    assert estatisticas["formato"] == "opus"
+    assert estatisticas["bytes_referencia_estimados"] == 160_000  # 10 s a 128 kbps
+    assert estatisticas["bytes_enviados"] < estatisticas["bytes_referencia_estimados"] / 3
+    assert estatisticas["bytes_economizados_estimados"] == \
+        estatisticas["bytes_referencia_estimados"] - estatisticas["bytes_enviados"]
+    dados, taxa = soundfile.read(io.BytesIO(caminho.read_bytes()))
+    assert taxa == 16000 and abs(len(dados) - 160_000) < 1000
+
+
+def test_opus_no_bitrate_configurado():
+    soundfile = pytest.importorskip("soundfile")
+    if "OPUS" not in soundfile.available_subtypes("OGG"):
+        pytest.skip("libsndfile sem Opus")
+    ruido = np.random.default_rng(0).uniform(-0.3, 0.3, 16000 * 10).astype(np.float32)
+
+    def kbps(dados):
+        return len(dados) * 8 / 10 / 1000
+
+    assert 18 <= kbps(preprocessamento_audio.codifica_opus(ruido)) <= 30  # BITRATE_OPUS_KBPS = 24
+    assert 56 <= kbps(preprocessamento_audio.codifica_opus(ruido, kbps=64)) <= 72
+
+
+def test_completa_estatisticas_soma_ponta_a_ponta():
+    estatisticas = {"formato": "opus", "duracao_ms": 5000, "bytes_referencia_estimados": 80_000,
+                    "bytes_enviados": 16_000, "bytes_economizados_estimados": 64_000,
+                    "conversao_ms": 2.0, "codificacao_ms": 3.0}
+    completa_estatisticas(estatisticas, 500.0)
+    assert (estatisticas["transcricao_ms"], estatisticas["ponta_a_ponta_ms"]) == (500.0, 505.0)
+    assert "latencia_economizada_ms_max" not in estatisticas
+
+
+# manutencao_audio ==========
+
+def _ffmpeg_falso(duracoes, chamadas):
+    """subprocess.run do ffmpeg/ffprobe: copia a entrada para a saída e informa as durações."""
+    def run(comando, **kwargs):
+        chamadas.append(comando)
+        if comando[0] == manutencao_audio.get_prober_name():
+            return SimpleNamespace(returncode=0, stdout=str(duracoes[Path(comando[-1]).name]), stderr="")
+        entrada = Path(comando[comando.index("-i") + 1])
+        Path(comando[-1]).write_bytes(entrada.read_bytes()[:100])
+        return SimpleNamespace(returncode=0, stdout=b"", stderr=b"")
+    return run
+
+
+def test_arquiva_audio_recodifica_pelo_ffmpeg_sem_decodificar_no_processo(tmp_path, monkeypatch):
+    (tmp_path / "audio.mp3").write_bytes(b"\xff" * 5000)
+    chamadas = []
+    monkeypatch.setattr(manutencao_audio.subprocess, "run",
+                        _ffmpeg_falso({"audio.mp3": 3600.0, "audio.ogg.parcial": 3600.2}, chamadas))
+    monkeypatch.setattr(pydub.AudioSegment, "from_file",
+                        lambda *args, **kwargs: pytest.fail("áudio decodificado no processo"))
+    assert manutencao_audio.arquiva_audio(tmp_path, "24k") == 4900
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["audio.ogg"]
+    ffmpeg = chamadas[0]
+    assert ffmpeg[ffmpeg.index("-c:a") + 1] == "libopus" and ffmpeg[ffmpeg.index("-b:a") + 1] == "24k"
+
+
+def test_arquiva_audio_mantem_o_original_se_a_duracao_nao_bate(tmp_path, monkeypatch):
+    (tmp_path / "audio.mp3").write_bytes(b"\xff" * 5000)
+    monkeypatch.setattr(manutencao_audio.subprocess, "run",
+                        _ffmpeg_falso({"audio.mp3": 3600.0, "audio.ogg.parcial": 1800.0}, []))
+    with pytest.raises(ValueError):
+        manutencao_audio.arquiva_audio(tmp_path)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["audio.mp3"]
+
+
+# diarizacao ==========
+
+def _vetores_dois_locutores(n=40, dimensao=80, semente=0):
+    gerador = np.random.default_rng(semente)
+    base = np.zeros((2, dimensao))
+    base[0, 0] = base[1, 1] = 1.0
+    rotulos = np.array([0] * n + [1] * n)
+    vetores = base[rotulos] + 0.05 * gerador.standard_normal((2 * n, dimensao))
+    vetores /= np.linalg.norm(vetores, axis=1, keepdims=True)
+    return vetores.astype(np.float32), rotulos
+
+
+def test_agrupa_separa_locutores_pelo_limiar():
+    vetores, esperados = _vetores_dois_locutores()
+    rotulos = agrupa(vetores)
+    assert len(set(rotulos.tolist())) == 2
+    # Mesmo agrupamento que o esperado, qualquer que seja a numeração
+    assert len(set(zip(rotulos.tolist(), esperados.tolist()))) == 2
+
+
+def test_agrupa_com_numero_de_locutores_e_amostragem(monkeypatch):
+    vetores, _ = _vetores_dois_locutores()
+    assert set(agrupa(vetores, num_locutores=1).tolist()) == {0}
+    monkeypatch.setattr("diarizacao.MAX_JANELAS_CLUSTER", 10)
+    assert len(set(agrupa(vetores).tolist())) == 2
+    assert len(agrupa(vetores[:0])) == 0
+
+
+VOGAIS = [(730, 1090, 2440), (270, 2290, 3010), (300, 870, 2240), (530, 1840, 2480)]  # formantes (Hz)
+VOZES = [(115, 1.0), (220, 1.18)]  # (tom em Hz, escala dos formantes): trato vocal mais curto na segunda
+
+
+def _voz(f0, escala, segundos, gerador):
+    """Voz sintética: harmônicos de f0 filtrados pelos formantes de uma vogal sorteada a cada 250 ms."""
+    t = np.arange(int(16000 * segundos)) / 16000
+    f0_t = f0 * (1 + 0.08 * np.sin(2 * np.pi * 0.7 * t))  # entonação
+    fase = 2 * np.pi * np.cumsum(f0_t) / 16000
+    vogais = gerador.integers(len(VOGAIS), size=len(t) // 4000 + 1).repeat(4000)[:len(t)]
+    formantes = np.array(VOGAIS)[vogais] * escala
+    sinal = np.zeros_like(t)
+    for h in range(1, 30):
+        ganho = np.exp(-((h * f0_t[:, None] - formantes) / (80 * escala)) ** 2).sum(axis=1)
+        sinal += ganho / h * np.sin(h * fase)
+    sinal *= 0.6 + 0.4 * np.abs(np.sin(2 * np.pi * 3 * t))  # sílabas
+    return 0.3 * sinal / np.abs(sinal).max()
+
+
+def test_diariza_duas_vozes_alternando():
+    gerador = np.random.default_rng(0)
+    partes, turnos, inicio = [], [], 0
+    for turno in range(6):
+        segundos = 6 + gerador.uniform(0, 4)
+        partes += [_voz(*VOZES[turno % 2], segundos, gerador), np.zeros(8000)]
+        turnos.append((inicio, inicio + segundos * 1000, turno % 2))
+        inicio += segundos * 1000 + 500
+    amostras = np.concatenate(partes) + 0.003 * gerador.standard_normal(sum(map(len, partes)))
+    janelas = diariza_amostras([amostras.astype(np.float32)], num_locutores=2)
+    for comeco, fim, locutor in turnos:
+        # Janelas que cruzam a troca de turno podem ir para qualquer um dos dois
+        rotulos = {rotulo for inicio_ms, fim_ms, rotulo in janelas
+                   if comeco + 750 <= (inicio_ms + fim_ms) / 2 < fim - 750}
+        assert rotulos == {locutor}
+
+
+def test_rotula_segmentos_pelo_locutor_predominante():
+    janelas = [(0, 1500, 0), (750, 2250, 0), (1500, 3000, 1), (3000, 4500, 1), (3750, 5250, 1)]
+    segmentos = [{"id": 0, "inicio_ms": 0, "fim_ms": 2000},
+                 {"id": 1, "inicio_ms": 2000, "fim_ms": 5000},
+                 {"id": 2, "inicio_ms": 9000, "fim_ms": 10000}]
+    assert rotula_segmentos(segmentos, janelas) == {0: {"locutor": "Locutor 1"}, 1: {"locutor": "Locutor 2"}}
+    assert rotula_segmentos(segmentos, []) == {}
+
+
+# metricas_latencia ==========
+
+def test_mede_etapas_e_soma_no_registro_do_chunk():
+    metricas = MetricasLatencia()
+    registro = {}
+    with metricas.mede("transcricao", registro):
+        time.sleep(0.02)
+    with pytest.raises(ValueError):
+        with metricas.mede("transcricao", registro):  # etapa que falha também é medida
+            raise ValueError
+    metricas.registra("escrita", 3.0, registro)
+    metricas.registra("escrita", 2.0, registro)
+    assert registro["etapas"]["escrita"] == 5.0
+    assert registro["etapas"]["transcricao"] >= 20
+    etapas = metricas.resumo()["etapas"]
+    assert etapas["transcricao"]["n"] == 2
+    assert (etapas["escrita"]["n"], etapas["escrita"]["ultimo"]) == (2, 2.0)
+
+
+def test_resumo_percentis_e_rtf(tmp_path):
+    metricas = MetricasLatencia(amostras=100)
+    for ms in range(1, 201):  # só as últimas 100 amostras ficam
+        metricas.registra("fila", float(ms))
+    resumo = metricas.resumo()
+    assert resumo["etapas"]["fila"] == {"n": 100, "p50": 151.0, "p95": 196.0, "ultimo": 200.0}
+    assert resumo["rtf"] is None
+    metricas.registra_chunk(tmp_path, {"audio_ms": 5000, "processamento_ms": 1000})
+    metricas.registra_chunk(tmp_path, {"audio_ms": 5000, "processamento_ms": 6000})
+    assert metricas.resumo()["rtf"] == {"n": 2, "p50": 1.2, "p95": 1.2, "ultimo": 1.2}
+
+
+def test_registra_chunk_grava_jsonl_da_reuniao(tmp_path):
+    metricas = MetricasLatencia()
+    registro = {"chunk": 0, "audio_ms": 5000, "processamento_ms": 1250}
+    metricas.registra("transcricao", 1200.0, registro)
+    metricas.registra_chunk(tmp_path, registro)
+    metricas.registra_chunk(tmp_path, {"chunk": 1, "audio_ms": 0, "processamento_ms": 10})  # sem áudio: sem RTF
+    linhas = (tmp_path / ARQUIVO_METRICAS).read_text(encoding="utf-8").splitlines()
+    linhas = [json.loads(linha) for linha in linhas]
+    assert [linha["chunk"] for linha in linhas] == [0, 1]
+    assert linhas[0]["rtf"] == 0.25 and linhas[0]["etapas"] == {"transcricao": 1200.0}
+    assert "rtf" not in linhas[1] and "registrado_em" in linhas[1]
+    # Pasta apagada no meio da gravação: a métrica se perde, a gravação continua
+    metricas.registra_chunk(tmp_path / "apagada", {"audio_ms": 5000, "processamento_ms": 1})
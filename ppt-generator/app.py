@@ -1,7 +1,8 @@
 import streamlit as st
-import uuid
-import os
-from generate_ppt import generate_ppt
+from content_parser import ContentError
+from template_cache import get_template_cache
+from template_layouts import TemplateError
+from generation_queue import get_generation_queue
 
 # ===== CONFIG STREAMLIT =====
 st.set_page_config(
@@ -9,10 +10,6 @@ st.set_page_config(
     layout="centered"
 )
 
-# ===== PASTAS =====
-os.makedirs("uploads", exist_ok=True)
-os.makedirs("outputs", exist_ok=True)
-
 # ===== UI =====
 st.image("assets/logo.jpg", width=180)
 st.title("Gerador de Apresentações")
@@ -27,36 +24,80 @@ content_file = st.file_uploader(
     type=["txt"]
 )
 
+# ===== FILA =====
+queue = get_generation_queue()
+st.session_state.setdefault("jobs", [])
+
+
+def mostra_erro(erro):
+    if isinstance(erro, ContentError):
+        st.error(f"Erro no arquivo de conteúdo, {erro}")
+    elif isinstance(erro, TemplateError):
+        st.error(f"Erro no template: {erro}")
+    else:
+        st.error(f"Erro ao gerar a apresentação: {erro}")
+
+
+@st.fragment(run_every=1)
+def mostra_progresso():
+    """Progresso dos jobs da sessão; quando algum termina, a página é redesenhada com o download."""
+    pendentes = [queue.get(job_id) for job_id in st.session_state["jobs"]]
+    pendentes = [job for job in pendentes if job is not None and not job.concluido]
+    if not pendentes and st.session_state.get("aguardando"):
+        st.session_state["aguardando"] = False
+        st.rerun()
+    for job in pendentes:
+        if job.status == "na fila":
+            st.progress(0.0, text=f"Na fila ({queue.pendentes()} geração(ões) em andamento)")
+        else:
+            st.progress(job.progresso, text=f"Gerando slide {job.slides} de {job.total or '?'}")
+
+
 # ===== AÇÃO =====
 if st.button("Gerar apresentação"):
     if not template_file or not content_file:
         st.error("Envie o template e o conteúdo.")
     else:
-        with st.spinner("Gerando apresentação..."):
-            uid = str(uuid.uuid4())
-
-            template_path = f"uploads/{uid}_template.pptx"
-            content_path = f"uploads/{uid}_conteudo.txt"
-            output_path = f"outputs/{uid}_output.pptx"
+        # Tudo em memória: os uploads não são gravados em disco
+        template_bytes = template_file.getvalue()
+        content_bytes = content_file.getvalue()
 
-            with open(template_path, "wb") as f:
-                f.write(template_file.read())
+        # Validação do template antes de enfileirar
+        try:
+            layout_index = get_template_cache().layout_index(template_bytes)
+        except Exception as e:
+            # .pptx corrompido, outro arquivo renomeado, pacote sem presentation.xml...
+            st.error(f"O template não é um arquivo .pptx válido ({type(e).__name__}: {e})")
+            layout_index = None
 
-            with open(content_path, "wb") as f:
-                f.write(content_file.read())
+        if layout_index is not None:
+            if not layout_index.ok:
+                st.warning("O template não tem layouts para todos os tipos de seção:")
+                st.code(layout_index.format_report())
+            for linha in layout_index.report:
+                for aviso in linha["warnings"]:
+                    st.warning(f"#{linha['tipo']}: {aviso}")
 
-            generate_ppt(
-                template_path=template_path,
-                content_path=content_path,
-                output_path=output_path
-            )
+            job = queue.submit(template_bytes, content_bytes)
+            st.session_state["jobs"].append(job.id)
+            st.session_state["aguardando"] = True
 
+# ===== RESULTADOS =====
+for job_id in list(reversed(st.session_state["jobs"])):
+    job = queue.get(job_id)
+    if job is None:
+        st.info("Uma apresentação anterior expirou; gere novamente se precisar.")
+        st.session_state["jobs"].remove(job_id)
+    elif job.status == "erro":
+        mostra_erro(job.erro)
+    elif job.status == "pronto":
         st.success("Apresentação gerada com sucesso!")
+        st.download_button(
+            "📥 Baixar apresentação",
+            job.resultado,
+            file_name="apresentacao.pptx",
+            mime="application/vnd.openxmlformats-officedocument.presentationml.presentation",
+            key=f"download_{job.id}"
+        )
 
-        with open(output_path, "rb") as f:
-            st.download_button(
-                "📥 Baixar apresentação",
-                f,
-                file_name="apresentacao.pptx",
-                mime="application/vnd.openxmlformats-officedocument.presentationml.presentation"
-            )
\ No newline at end of file
+mostra_progresso()
@@ -0,0 +1,285 @@
+"""
+Geração em lote: um template e muitos arquivos de conteúdo.
+
+O template é lido uma única vez e enviado em bytes para cada processo do pool
+(no initializer), que guarda um snapshot sem compressão (ver template_cache):
+nenhum deck volta a ler o .pptx do disco nem a descomprimi-lo. Os layouts de
+cada tipo de seção são resolvidos uma vez, antes do pool, e o relatório de
+validação sai antes da geração. Cada deck é
+gerado isoladamente: um conteúdo com erro vira uma linha de erro no relatório,
+sem derrubar os outros.
+
+Com --mapping, o conteúdo é uma planilha (CSV, JSON ou JSONL) e cada grupo
+de linhas vira um deck (ver tabular_content). A planilha é lida em streaming
+e só alguns decks por processo ficam na fila de cada vez, então o consumo de
+memória não depende do tamanho do arquivo.
+
+Uso:
+    python batch_ppt.py data/PPT_Modelo1.pptx conteudos/ -o saida/
+    python batch_ppt.py data/PPT_Modelo1.pptx manifesto.txt -o saida/ --workers 8
+    python batch_ppt.py modelo.pptx conteudos/ --layout IMG="Imagem com Legenda" --check
+    python batch_ppt.py data/PPT_Modelo1.pptx aulas.csv --mapping mapeamento.json -o saida/
+
+O manifesto tem um arquivo de conteúdo por linha (relativo ao manifesto).
+Conteúdos com o mesmo nome (ex.: a/aula.txt e b/aula.txt) geram aula.pptx e
+aula_2.pptx, em vez de um sobrescrever o outro.
+"""
+import argparse
+import io
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from pptx import Presentation
+
+from content_parser import ContentError
+from fast_save import SavePlan, save_presentation
+from generate_ppt import fill_presentation, fill_sections
+from tabular_content import MappingError, iter_decks, load_mapping, read_rows
+from template_cache import stored_snapshot
+from template_layouts import LayoutIndex
+
+DECKS_NA_FILA_POR_PROCESSO = 2
+
+_template_snapshot = None
+_layout_index = None
+_save_plan = None
+_compresslevel = None
+
+
+def _init_worker(template_bytes, layout_index, save_plan, compresslevel):
+    global _template_snapshot, _layout_index, _save_plan, _compresslevel
+    _template_snapshot = stored_snapshot(template_bytes)
+    _layout_index = layout_index
+    _save_plan = save_plan
+    _compresslevel = compresslevel
+
+
+def _generate_one(content, output_path, nome):
+    """content: caminho do arquivo de conteúdo ou lista de Section já montadas."""
+    inicio = time.perf_counter()
+    resultado = {"content": nome, "output": str(output_path)}
+    try:
+        prs = Presentation(io.BytesIO(_template_snapshot))
+        if isinstance(content, list):
+            resultado["slides"] = fill_sections(prs, content, _layout_index)
+        else:
+            with open(content, "r", encoding="utf-8") as f:
+                resultado["slides"] = fill_presentation(prs, f, _layout_index)
+        save_presentation(prs, output_path, _save_plan, _compresslevel)
+        resultado["ok"] = True
+    except Exception as e:
+        resultado["ok"] = False
+        resultado["error"] = f"{type(e).__name__}: {e}"
+    resultado["seconds"] = round(time.perf_counter() - inicio, 3)
+    return resultado
+
+
+def list_contents(source):
+    """Arquivos de conteúdo de uma pasta (*.txt) ou de um manifesto (um caminho por linha)."""
+    source = Path(source)
+    if source.is_dir():
+        return sorted(source.glob("*.txt"))
+    with open(source, "r", encoding="utf-8") as f:
+        linhas = [l.strip() for l in f if l.strip() and not l.startswith("#")]
+    return [source.parent / l for l in linhas]
+
+
+def load_template(template_path, layout_map=None):
+    """Bytes do template, LayoutIndex e SavePlan (template inválido falha aqui, antes do pool)."""
+    with open(template_path, "rb") as f:
+        template_bytes = f.read()
+    return (template_bytes, LayoutIndex(Presentation(io.BytesIO(template_bytes)), layout_map),
+            SavePlan(template_bytes, Presentation(io.BytesIO(template_bytes))))
+
+
+def generate_batch(template_path, content_paths, output_dir, workers=None, layout_map=None, compresslevel=None,
+                   template=None):
+    """
+    Gera um deck por arquivo de conteúdo, em paralelo.
+
+    Args:
+        template: Resultado de load_template(), se já carregado (senão o template é lido aqui)
+
+    Returns:
+        dict: Totais do lote, resolução dos layouts e um resultado por deck
+        (ok, slides, seconds ou error)
+    """
+    output_dir = Path(output_dir)
+    nomes = set()
+    tarefas = ((str(c), str(output_dir / _nome_unico(f"{Path(c).stem}.pptx", nomes)), str(c))
+               for c in content_paths)
+    return _run_batch(template_path, tarefas, output_dir, workers, layout_map, compresslevel, template)
+
+
+def generate_table_batch(template_path, data_path, mapping, output_dir, workers=None, layout_map=None,
+                         compresslevel=None, template=None):
+    """
+    Gera um deck por grupo de linhas da planilha, em paralelo e em streaming.
+
+    Um erro na planilha (coluna inexistente, grupo fora de ordem) interrompe a
+    leitura: os decks já enviados terminam e o erro vai para o relatório.
+    """
+    output_dir = Path(output_dir)
+    mapping = load_mapping(mapping)
+
+    def tarefas():
+        nomes = set()
+        rows = read_rows(data_path, delimiter=mapping.get("delimiter"))
+        for chave, saida, secoes in iter_decks(rows, mapping):
+            yield secoes, str(output_dir / _nome_unico(saida, nomes)), chave or str(data_path)
+
+    relatorio = _run_batch(template_path, tarefas(), output_dir, workers, layout_map, compresslevel, template)
+    relatorio["source"] = str(data_path)
+    return relatorio
+
+
+def _nome_unico(nome, nomes):
+    """Nome de arquivo ainda não usado no lote: aula.pptx, aula_2.pptx, aula_3.pptx..."""
+    base, n, unico = Path(nome), 1, nome
+    while unico.lower() in nomes:  # sem distinguir maiúsculas: Windows e macOS não distinguem
+        n += 1
+        unico = f"{base.stem}_{n}{base.suffix}"
+    nomes.add(unico.lower())
+    return unico
+
+
+def _run_batch(template_path, tarefas, output_dir, workers, layout_map, compresslevel, template=None):
+    output_dir.mkdir(parents=True, exist_ok=True)
+    template_bytes, layout_index, save_plan = template or load_template(template_path, layout_map)
+
+    workers = workers or os.cpu_count()
+
+    def novo_pool():
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(template_bytes, layout_index, save_plan, compresslevel))
+
+    inicio = time.perf_counter()
+    resultados = []
+    erro_entrada = None
+    executor = novo_pool()
+    try:
+        # Poucos decks na fila por vez: as tarefas são lidas conforme os processos liberam
+        em_andamento, esgotado, proxima = {}, False, None
+        while True:
+            while not esgotado and len(em_andamento) < workers * DECKS_NA_FILA_POR_PROCESSO:
+                if proxima is None:
+                    try:
+                        proxima = next(tarefas)
+                    except StopIteration:
+                        esgotado = True
+                        break
+                    except (ContentError, MappingError, OSError, UnicodeDecodeError) as e:
+                        erro_entrada = f"{type(e).__name__}: {e}"
+                        esgotado = True
+                        break
+                content, output_path, nome = proxima
+                try:
+                    futuro = executor.submit(_generate_one, content, output_path, nome)
+                except BrokenProcessPool:
+                    break  # o deck não chegou ao pool: vai para o pool novo, logo abaixo
+                em_andamento[futuro] = nome
+                proxima = None
+            if not em_andamento and proxima is None:
+                break
+
+            feitos, _ = wait(em_andamento, return_when=FIRST_COMPLETED)
+            quebrado = proxima is not None
+            for futuro in feitos:
+                quebrado |= _coleta(futuro, em_andamento.pop(futuro), resultados)
+            if quebrado:
+                # Processo morto (ex.: falta de memória): não dá para saber qual deck o
+                # derrubou, então os decks em andamento falham; o lote segue num pool novo
+                for futuro in wait(em_andamento)[0]:
+                    _coleta(futuro, em_andamento.pop(futuro), resultados)
+                executor.shutdown(wait=True)
+                executor = novo_pool()
+    finally:
+        executor.shutdown(wait=True)
+
+    segundos = time.perf_counter() - inicio
+    ok = [r for r in resultados if r["ok"]]
+    return {
+        "template": str(template_path),
+        "workers": workers,
+        "decks": len(resultados),
+        "ok": len(ok),
+        "errors": len(resultados) - len(ok),
+        "input_error": erro_entrada,
+        "slides": sum(r["slides"] for r in ok),
+        "seconds": round(segundos, 3),
+        "decks_per_second": round(len(resultados) / segundos, 2) if segundos else None,
+        "layouts": layout_index.report,
+        "results": sorted(resultados, key=lambda r: r["content"]),
+    }
+
+
+def _coleta(futuro, nome, resultados):
+    """Acrescenta o resultado do deck; True se o pool quebrou."""
+    try:
+        resultados.append(futuro.result())
+        return False
+    except BrokenProcessPool as e:
+        resultados.append({"content": nome, "ok": False, "error": f"BrokenProcessPool: {e}"})
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("template")
+    parser.add_argument("contents", help="Pasta com arquivos .txt, manifesto ou planilha (com --mapping)")
+    parser.add_argument("-o", "--output-dir", default="outputs")
+    parser.add_argument("--workers", type=int, default=None, help="Processos (padrão: núcleos da CPU)")
+    parser.add_argument("--report", default=None, help="Relatório JSON (padrão: <output-dir>/relatorio.json)")
+    parser.add_argument("--layout", action="append", default=[], metavar="TIPO=LAYOUT",
+                        help="Força o layout (nome ou índice) de um tipo de seção; pode repetir")
+    parser.add_argument("--mapping", default=None, help="Mapeamento JSON das colunas da planilha para as seções")
+    parser.add_argument("--compresslevel", type=int, default=None, choices=range(0, 10), metavar="0-9",
+                        help="Compressão das partes novas (padrão: PPT_COMPRESSLEVEL ou 6)")
+    parser.add_argument("--check", action="store_true", help="Só valida o template e sai")
+    args = parser.parse_args()
+
+    layout_map = {}
+    for item in args.layout:
+        tipo, _, layout = item.partition("=")
+        layout_map[tipo.strip().lstrip("#").upper()] = layout.strip()
+    template = load_template(args.template, layout_map)
+    layout_index = template[1]
+    print(layout_index.format_report())
+    if args.check:
+        raise SystemExit(0 if layout_index.ok else 1)
+
+    if args.mapping:
+        try:
+            mapping = load_mapping(args.mapping)
+        except MappingError as e:
+            raise SystemExit(f"Mapeamento inválido: {e}")
+        relatorio = generate_table_batch(args.template, args.contents, mapping, args.output_dir,
+                                         args.workers, layout_map, args.compresslevel, template)
+    else:
+        content_paths = list_contents(args.contents)
+        if not content_paths:
+            raise SystemExit(f"Nenhum arquivo de conteúdo em {args.contents}")
+        relatorio = generate_batch(args.template, content_paths, args.output_dir, args.workers, layout_map,
+                                   args.compresslevel, template)
+    report_path = args.report or os.path.join(args.output_dir, "relatorio.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    print(f"{relatorio['ok']}/{relatorio['decks']} deck(s) em {relatorio['seconds']}s "
+          f"({relatorio['decks_per_second']} decks/s, {relatorio['workers']} processos)")
+    for r in relatorio["results"]:
+        if not r["ok"]:
+            print(f"  ERRO {r['content']}: {r['error']}")
+    if relatorio["input_error"]:
+        print(f"  ERRO na entrada (leitura interrompida): {relatorio['input_error']}")
+    print(f"Relatório: {report_path}")
+    if relatorio["errors"] or relatorio["input_error"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Mede onde generate_ppt() gasta tempo, com conteúdo sintético.
+
+Para cada tamanho (em slides), com e sem imagens, mede as fases:
+
+    template   Presentation + LayoutIndex + SavePlan a partir do template (cache frio)
+    parse      parse_sections() do conteúdo
+    slides     add_slide e textos das seções #CAPA, #1COL e #2COL
+    images     seções #IMG: preparo da imagem (cache de imagens vazio) e add_picture
+    save       save_presentation() em memória (caminho rápido do fast_save)
+
+e reporta slides/s, pico de memória (tracemalloc, numa passada à parte para
+não distorcer os tempos; os buffers internos do Pillow não entram) e o
+tamanho do .pptx. Os tempos são a mediana de --repeat execuções. Com
+--baseline, mostra a razão em relação a um resultado anterior para cada caso.
+
+O resultado de referência fica versionado em benchmarks/baseline.json. Os
+tempos dependem da máquina (o JSON registra a arquitetura e as versões do
+python e do python-pptx): compare na mesma máquina, ou regenere a referência
+nela antes de medir uma mudança. O benchmark_ppt.json de cada execução não é
+versionado.
+
+Uso:
+    python benchmark_ppt.py
+    python benchmark_ppt.py --sizes 10 100 --repeat 5 --output bench.json
+    python benchmark_ppt.py --baseline benchmarks/baseline.json
+    python benchmark_ppt.py --output benchmarks/baseline.json   # nova referência
+"""
+import argparse
+import io
+import json
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import pptx
+from PIL import Image
+
+from content_parser import parse_sections
+from fast_save import save_presentation
+from generate_ppt import fill_sections
+from image_cache import ImageCache
+from template_cache import TemplateCache
+
+TEMPLATE_PADRAO = Path(__file__).parent / "data" / "PPT_Modelo1.pptx"
+FASES = ("template", "parse", "slides", "images", "save")
+IMAGEM_A_CADA = 5  # com imagens, uma seção #IMG a cada 5
+
+
+def _caminho_exibido(caminho):
+    """Caminho relativo a esta pasta quando estiver dentro dela, para o JSON não depender da máquina."""
+    caminho = Path(caminho).resolve()
+    try:
+        return caminho.relative_to(Path(__file__).parent.resolve()).as_posix()
+    except ValueError:
+        return str(caminho)
+
+
+def synthetic_images(pasta, quantidade=3):
+    """Fotos sintéticas de 2400x1600 (JPEG ~1-2 MB), como as de uma câmera."""
+    caminhos = []
+    for i in range(quantidade):
+        img = Image.effect_noise((2400, 1600), 40 + i * 10).convert("RGB")
+        gradiente = Image.linear_gradient("L").resize((2400, 1600)).convert("RGB")
+        img = Image.blend(img, gradiente, 0.5)
+        caminho = Path(pasta) / f"foto_{i}.jpg"
+        img.save(caminho, quality=95)
+        caminhos.append(str(caminho))
+    return caminhos
+
+
+def synthetic_content(slides, imagens=None):
+    """Texto no formato do content.txt: capa e depois #1COL/#2COL (e #IMG, se houver imagens)."""
+    secoes = ["#CAPA\nApresentação sintética\nBenchmark do gerador\n"]
+    for i in range(1, slides):
+        if imagens and i % IMAGEM_A_CADA == 0:
+            secoes.append(f"#IMG\nResultado {i}\n{imagens[i % len(imagens)]}\nFigura {i}: legenda do gráfico\n")
+        elif i % 2:
+            secoes.append(f"#1COL\nTópico {i}\n\n- Primeiro ponto do slide {i}\n  - detalhe\n"
+                          f"- Segundo ponto com um texto um pouco maior para ocupar a linha\n")
+        else:
+            secoes.append(f"#2COL\nComparação {i}\n\n- Antes\n- Custo alto\n\n- Depois\n- Custo baixo\n")
+    return "\n".join(secoes)
+
+
+def run_once(template_path, texto, pasta_cache_imagens):
+    """Uma geração completa, com os tempos (ms) de cada fase e o tamanho da saída."""
+    tempos = dict.fromkeys(FASES, 0.0)
+
+    inicio = time.perf_counter()
+    cache = TemplateCache()
+    prs = cache.presentation(template_path)
+    layout_index = cache.layout_index(template_path)
+    plano = cache.save_plan(template_path)
+    tempos["template"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    secoes = list(parse_sections(texto))
+    tempos["parse"] = time.perf_counter() - inicio
+
+    image_cache = ImageCache(cache_dir=pasta_cache_imagens)
+    for secao in secoes:
+        inicio = time.perf_counter()
+        fill_sections(prs, [secao], layout_index, image_cache)
+        tempos["images" if secao.tipo == "IMG" else "slides"] += time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    saida = io.BytesIO()
+    save_presentation(prs, saida, plano)
+    tempos["save"] = time.perf_counter() - inicio
+
+    return {fase: segundos * 1000 for fase, segundos in tempos.items()}, len(saida.getvalue())
+
+
+def peak_memory(template_path, texto, pasta_cache_imagens):
+    tracemalloc.start()
+    try:
+        run_once(template_path, texto, pasta_cache_imagens)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_case(template_path, slides, imagens, repeat, pasta):
+    texto = synthetic_content(slides, imagens)
+    execucoes = []
+    for i in range(repeat):
+        # Cache de imagens vazio a cada execução: mede o preparo, não só o acerto
+        execucoes.append(run_once(template_path, texto, Path(pasta) / f"imagens_{slides}_{i}"))
+    fases = {fase: round(statistics.median(e[0][fase] for e in execucoes), 2) for fase in FASES}
+    total_ms = round(sum(fases.values()), 2)
+    return {
+        "slides": slides,
+        "images": bool(imagens),
+        "content_bytes": len(texto.encode("utf-8")),
+        "phases_ms": fases,
+        "total_ms": total_ms,
+        "slides_per_second": round(slides / (total_ms / 1000), 1) if total_ms else None,
+        "peak_memory_mb": round(peak_memory(template_path, texto, Path(pasta) / f"imagens_{slides}_mem") / 2**20, 1),
+        "output_bytes": execucoes[-1][1],
+    }
+
+
+def compare(resultado, baseline):
+    """Razão total_ms atual / anterior por caso (acima de 1 = mais lento)."""
+    anteriores = {(c["slides"], c["images"]): c for c in baseline["cases"]}
+    for caso in resultado["cases"]:
+        anterior = anteriores.get((caso["slides"], caso["images"]))
+        if anterior and anterior["total_ms"]:
+            caso["vs_baseline"] = round(caso["total_ms"] / anterior["total_ms"], 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--template", default=str(TEMPLATE_PADRAO))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000], help="Slides por deck")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por caso (mediana)")
+    parser.add_argument("--no-images", action="store_true", help="Só os casos sem imagens")
+    parser.add_argument("--output", default="benchmark_ppt.json")
+    parser.add_argument("--baseline", default=None, help="Resultado anterior para comparar")
+    args = parser.parse_args()
+
+    resultado = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "python_pptx": pptx.__version__,
+        "machine": platform.machine(),
+        "template": _caminho_exibido(args.template),
+        "repeat": args.repeat,
+        "cases": [],
+    }
+    with tempfile.TemporaryDirectory() as pasta:
+        imagens = synthetic_images(pasta)
+        for com_imagens in ([False] if args.no_images else [False, True]):
+            for slides in args.sizes:
+                caso = bench_case(args.template, slides, imagens if com_imagens else None, args.repeat, pasta)
+                resultado["cases"].append(caso)
+                fases = "  ".join(f"{fase} {caso['phases_ms'][fase]:.0f}" for fase in FASES)
+                print(f"{slides:>5} slides {'com' if com_imagens else 'sem'} imagens: {caso['total_ms']:.0f} ms "
+                      f"({caso['slides_per_second']} slides/s, pico {caso['peak_memory_mb']} MB, "
+                      f"{caso['output_bytes'] / 1024:.0f} KB)  [{fases}]")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            compare(resultado, json.load(f))
+        for caso in resultado["cases"]:
+            if "vs_baseline" in caso:
+                print(f"{caso['slides']:>5} slides {'com' if caso['images'] else 'sem'} imagens: "
+                      f"{caso['vs_baseline']:.2f}x o tempo anterior")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
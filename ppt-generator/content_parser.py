@@ -0,0 +1,157 @@
+"""
+Leitura do arquivo de conteúdo (#CAPA, #1COL, #2COL, #IMG).
+
+Gramática:
+
+    #TIPO                 cabeçalho: '#' no início da linha + tipo conhecido
+                          (espaços depois do '#' e minúsculas são aceitos)
+    Título                primeira linha depois do cabeçalho
+    campos...             demais campos do tipo, em ordem
+
+Os campos depois do título podem vir um por linha (formato original) ou em
+blocos separados por linha em branco, o que permite corpo com várias linhas:
+
+    #1COL
+    Objetivo
+    - primeiro tópico
+      - subtópico (2 espaços por nível)
+    - segundo tópico
+
+Linhas a mais vão para o último campo. '#' no meio do texto é texto comum, e
+uma linha '#palavra' que não é um tipo conhecido (ex.: uma hashtag) também;
+uma linha de texto que seja exatamente um tipo ('#CAPA') é escrita como '\\#CAPA'.
+
+O arquivo é lido linha a linha e cada seção é entregue assim que termina, então
+o consumo de memória não depende do tamanho do arquivo. Erros informam a linha.
+"""
+import logging
+import re
+from collections import namedtuple
+
+CAMPOS = {
+    "CAPA": ("titulo", "subtitulo"),
+    "1COL": ("titulo", "corpo"),
+    "2COL": ("titulo", "esquerda", "direita"),
+    "IMG": ("titulo", "imagem", "legenda"),
+}
+
+_CABECALHO = re.compile(r"^#\s*(\w+)\s*$")
+_MARCADOR = re.compile(r"^(\s*)[-*•]\s+")
+ESPACOS_POR_NIVEL = 2
+
+logger = logging.getLogger(__name__)
+
+# campos: dict nome -> lista de linhas (título e caminho de imagem têm uma só)
+Section = namedtuple("Section", "tipo linha campos")
+
+
+class ContentError(ValueError):
+
+    def __init__(self, linha, mensagem):
+        super().__init__(f"linha {linha}: {mensagem}")
+        self.linha = linha
+
+
+def parse_sections(source):
+    """
+    Gera as seções do conteúdo na ordem do arquivo.
+
+    Args:
+        source: Texto completo ou iterável de linhas (ex.: arquivo aberto)
+
+    Raises:
+        ContentError: Texto fora de seção ou campos faltando
+    """
+    if isinstance(source, str):
+        source = source.splitlines()
+    tipo, linha_cabecalho, corpo = None, 0, []
+    for numero, linha in enumerate(source, start=1):
+        linha = linha.rstrip("\r\n").rstrip()
+        tipo_cabecalho = _tipo_cabecalho(linha)
+        if tipo_cabecalho:
+            if tipo is not None:
+                yield _monta_secao(tipo, linha_cabecalho, corpo)
+            tipo, linha_cabecalho, corpo = tipo_cabecalho, numero, []
+            continue
+        if _CABECALHO.match(linha):
+            # Pode ser hashtag ou tipo digitado errado: fica como texto, mas avisa
+            logger.warning(f"linha {numero}: '{linha.strip()}' não é um tipo de seção "
+                           f"({', '.join('#' + t for t in CAMPOS)}); tratada como texto")
+        if linha.startswith("\\#"):
+            linha = linha[1:]
+        if tipo is None:
+            if linha.strip():
+                raise ContentError(numero, f"texto antes do primeiro cabeçalho de seção "
+                                           f"(use {', '.join('#' + t for t in CAMPOS)})")
+            continue
+        corpo.append((numero, linha))
+    if tipo is not None:
+        yield _monta_secao(tipo, linha_cabecalho, corpo)
+
+
+def count_sections(source):
+    """Quantidade de cabeçalhos de seção, sem validar o conteúdo (para mostrar progresso)."""
+    if isinstance(source, str):
+        source = source.splitlines()
+    return sum(1 for linha in source if _tipo_cabecalho(linha.rstrip()))
+
+
+def _tipo_cabecalho(linha):
+    """Tipo da seção se a linha é um cabeçalho de tipo conhecido; senão None (a linha é texto)."""
+    cabecalho = _CABECALHO.match(linha)
+    if cabecalho and cabecalho.group(1).upper() in CAMPOS:
+        return cabecalho.group(1).upper()
+    return None
+
+
+def _monta_secao(tipo, linha_cabecalho, corpo):
+    # Linhas em branco nas pontas não contam
+    while corpo and not corpo[-1][1].strip():
+        corpo.pop()
+    while corpo and not corpo[0][1].strip():
+        corpo.pop(0)
+    nomes = CAMPOS[tipo]
+    if not corpo:
+        raise ContentError(linha_cabecalho, f"#{tipo} sem título")
+    campos = {nomes[0]: [corpo[0][1].strip()]}
+
+    blocos, atual = [], []
+    for numero, linha in corpo[1:]:
+        if linha.strip():
+            atual.append(linha)
+        elif atual:
+            blocos.append(atual)
+            atual = []
+    if atual:
+        blocos.append(atual)
+
+    restantes = nomes[1:]
+    if len(blocos) == 1 and 1 < len(restantes) <= len(blocos[0]):
+        # Formato original: um campo por linha; sobras vão para o último campo
+        linhas = blocos[0]
+        blocos = [[l] for l in linhas[:len(restantes) - 1]] + [linhas[len(restantes) - 1:]]
+    if len(blocos) < len(restantes):
+        raise ContentError(linha_cabecalho,
+                           f"#{tipo} precisa de {len(restantes)} campo(s) depois do título "
+                           f"({', '.join(restantes)}), encontrado(s) {len(blocos)}")
+    for nome, bloco in zip(restantes[:-1], blocos):
+        campos[nome] = bloco
+    # Parágrafos a mais pertencem ao último campo (linha em branco vira parágrafo vazio)
+    ultimo = []
+    for bloco in blocos[len(restantes) - 1:]:
+        if ultimo:
+            ultimo.append("")
+        ultimo.extend(bloco)
+    campos[restantes[-1]] = ultimo
+    return Section(tipo, linha_cabecalho, campos)
+
+
+def paragraphs(linhas):
+    """(texto, nível) de cada linha de um campo; '- '/'* ' marcam tópicos, 2 espaços por nível."""
+    for linha in linhas:
+        marcador = _MARCADOR.match(linha)
+        if marcador:
+            nivel = len(marcador.group(1).expandtabs(ESPACOS_POR_NIVEL)) // ESPACOS_POR_NIVEL
+            yield linha[marcador.end():].strip(), min(nivel, 8)
+        else:
+            yield linha.strip(), 0
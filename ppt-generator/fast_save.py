@@ -0,0 +1,182 @@
+"""
+Gravação rápida do .pptx gerado.
+
+prs.save() serializa e comprime de novo todas as partes do pacote, inclusive
+as que vieram do template e não mudaram (masters, layouts, tema, mídia). Aqui
+cada parte é comparada com o estado em que saiu do template: se não mudou, a
+entrada do .zip original é copiada com os bytes já comprimidos; só as partes
+novas ou alteradas (slides, imagens, presentation.xml, [Content_Types].xml)
+são comprimidas, no nível escolhido (PPT_COMPRESSLEVEL, padrão 6, o mesmo do
+zipfile; 1 é bem mais rápido e gera arquivo um pouco maior).
+
+O SavePlan de um template (entradas comprimidas + digest de cada parte
+intacta) é calculado uma vez e guardado no TemplateCache. Se algo sair do
+caminho rápido (pacote que exigiria ZIP64, mudança interna do python-pptx),
+a gravação cai para prs.save(). PPT_FAST_SAVE=0 desliga o caminho rápido.
+"""
+import hashlib
+import io
+import logging
+import os
+import struct
+import time
+import zipfile
+import zlib
+
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+
+try:
+    from pptx.opc.serialized import _ContentTypesItem  # interno do python-pptx (testado na 1.0.2)
+except ImportError:
+    _ContentTypesItem = None
+
+logger = logging.getLogger(__name__)
+
+LIMITE_ZIP = 0xFFFFFFFF
+LIMITE_ENTRADAS = 0xFFFF
+FLAG_UTF8 = 0x800
+FLAG_DESCRITOR = 0x08  # tamanhos depois dos dados; nos cabeçalhos gravados aqui eles já vão no início
+
+
+class _PrecisaFallback(Exception):
+    pass
+
+
+def iter_entries(prs):
+    """
+    (nome no zip, bytes) de cada entrada, na mesma ordem do PackageWriter do python-pptx.
+
+    Raises:
+        _PrecisaFallback: Se os internos do python-pptx usados aqui não existirem nesta versão
+    """
+    if _ContentTypesItem is None:
+        raise _PrecisaFallback("pptx.opc.serialized._ContentTypesItem não existe nesta versão do python-pptx")
+    package = prs.part.package
+    partes = tuple(package.iter_parts())
+    try:
+        yield CONTENT_TYPES_URI.membername, serialize_part_xml(_ContentTypesItem.xml_for(partes))
+        yield PACKAGE_URI.rels_uri.membername, package._rels.xml
+        for parte in partes:
+            yield parte.partname.membername, parte.blob
+            if parte._rels:
+                yield parte.partname.rels_uri.membername, parte.rels.xml
+    except AttributeError as e:
+        raise _PrecisaFallback(f"interno do python-pptx mudou: {e}") from e
+
+
+class SavePlan:
+    """
+    Entradas do template que podem ser copiadas sem recomprimir.
+
+    Args:
+        template_bytes: .pptx original (comprimido), de onde as entradas são copiadas
+        prs: Presentation recém-aberta do mesmo template, sem alterações
+    """
+
+    def __init__(self, template_bytes, prs):
+        self.entradas = {}  # nome -> (digest, flag, método, hora, data, crc, tamanho comprimido, tamanho, bytes)
+        try:
+            digests = {nome: hashlib.sha1(blob).digest() for nome, blob in iter_entries(prs)}
+        except _PrecisaFallback as e:
+            # Sem os internos do python-pptx não há caminho rápido: save_presentation usa prs.save()
+            logger.warning(f"Gravação rápida indisponível: {e}")
+            self.disponivel = False
+            return
+        self.disponivel = True
+        with zipfile.ZipFile(io.BytesIO(template_bytes)) as origem:
+            for info in origem.infolist():
+                if (info.filename not in digests or info.flag_bits & 0x1
+                        or info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)):
+                    continue
+                inicio = info.header_offset
+                tamanho_nome, tamanho_extra = struct.unpack("<2H", template_bytes[inicio + 26:inicio + 30])
+                inicio += 30 + tamanho_nome + tamanho_extra
+                hora, data = _dos_datetime(info.date_time)
+                self.entradas[info.filename] = (
+                    digests[info.filename], info.flag_bits & ~FLAG_DESCRITOR, info.compress_type, hora, data,
+                    info.CRC, info.compress_size, info.file_size,
+                    template_bytes[inicio:inicio + info.compress_size],
+                )
+
+    @property
+    def nbytes(self):
+        return sum(len(entrada[-1]) for entrada in self.entradas.values())
+
+
+def save_presentation(prs, target, plan=None, compresslevel=None):
+    """
+    Grava prs em target (caminho ou arquivo aberto) pelo caminho rápido quando há plan.
+
+    Returns:
+        dict: 'fast' (bool), 'copied' e 'compressed' (entradas), 'seconds'
+    """
+    inicio = time.perf_counter()
+    if compresslevel is None:
+        compresslevel = int(os.getenv("PPT_COMPRESSLEVEL", 6))
+    if plan is not None and plan.disponivel and os.getenv("PPT_FAST_SAVE", "1") != "0":
+        try:
+            dados, copiadas, comprimidas = _monta_zip(prs, plan, compresslevel)
+        except Exception as e:
+            if not isinstance(e, _PrecisaFallback):
+                logger.warning(f"Gravação rápida falhou, usando prs.save(): {type(e).__name__}: {e}")
+        else:
+            if isinstance(target, (str, os.PathLike)):
+                with open(target, "wb") as f:
+                    f.write(dados)
+            else:
+                target.write(dados)
+            return {"fast": True, "copied": copiadas, "compressed": comprimidas,
+                    "seconds": round(time.perf_counter() - inicio, 4)}
+    prs.save(target)
+    return {"fast": False, "copied": 0, "compressed": None, "seconds": round(time.perf_counter() - inicio, 4)}
+
+
+def _monta_zip(prs, plan, compresslevel):
+    hora, data = _dos_datetime(time.localtime()[:6])
+    saida = io.BytesIO()
+    central = []
+    copiadas = comprimidas = 0
+
+    for nome, blob in iter_entries(prs):
+        original = plan.entradas.get(nome)
+        if original is not None and original[0] == hashlib.sha1(blob).digest():
+            _, flag, metodo, hora_e, data_e, crc, tamanho_c, tamanho, bruto = original
+            copiadas += 1
+        else:
+            flag, metodo, hora_e, data_e = 0, zipfile.ZIP_DEFLATED, hora, data
+            crc, tamanho = zlib.crc32(blob), len(blob)
+            compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+            bruto = compressor.compress(blob) + compressor.flush()
+            tamanho_c = len(bruto)
+            comprimidas += 1
+
+        nome_bytes = nome.encode("utf-8")
+        if not nome.isascii():
+            flag |= FLAG_UTF8
+        deslocamento = saida.tell()
+        if max(tamanho, tamanho_c, deslocamento) > LIMITE_ZIP:
+            raise _PrecisaFallback()
+        saida.write(struct.pack("<4s5H3L2H", b"PK\x03\x04", 20, flag, metodo, hora_e, data_e,
+                                crc, tamanho_c, tamanho, len(nome_bytes), 0))
+        saida.write(nome_bytes)
+        saida.write(bruto)
+        central.append(struct.pack("<4s6H3L5H2L", b"PK\x01\x02", 20, 20, flag, metodo, hora_e, data_e,
+                                   crc, tamanho_c, tamanho, len(nome_bytes), 0, 0, 0, 0, 0, deslocamento)
+                       + nome_bytes)
+
+    inicio_central = saida.tell()
+    for registro in central:
+        saida.write(registro)
+    tamanho_central = saida.tell() - inicio_central
+    if len(central) > LIMITE_ENTRADAS or saida.tell() > LIMITE_ZIP:
+        raise _PrecisaFallback()
+    saida.write(struct.pack("<4s4H2LH", b"PK\x05\x06", 0, 0, len(central), len(central),
+                            tamanho_central, inicio_central, 0))
+    return saida.getvalue(), copiadas, comprimidas
+
+
+def _dos_datetime(date_time):
+    ano, mes, dia, hora, minuto, segundo = date_time[:6]
+    ano = max(ano, 1980)
+    return (hora << 11) | (minuto << 5) | (segundo // 2), ((ano - 1980) << 9) | (mes << 5) | dia
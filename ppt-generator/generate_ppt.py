@@ -1,55 +1,162 @@
-from pptx import Presentation
+import codecs
+import io
+import os
+from contextlib import contextmanager
+
 from pptx.util import Inches
-from pptx.enum.shapes import MSO_SHAPE_TYPE
 
-LAYOUTS = {
-    "CAPA": 0,
-    "1COL": 1,
-    "2COL": 2,
-    "IMG": 3
-}
+from content_parser import parse_sections, paragraphs
+from fast_save import save_presentation
+from image_cache import fit_box, get_image_cache
+from template_cache import get_template_cache
+from template_layouts import LayoutIndex
 
-def generate_ppt(template_path, content_path, output_path):
-    prs = Presentation(template_path)
+LEGENDA_ALTURA = Inches(0.8)  # faixa da legenda quando a imagem divide o placeholder de texto
 
-    with open(content_path, "r", encoding="utf-8") as f:
-        raw = f.read()
 
-    sections = [s.strip() for s in raw.split("#") if s.strip()]
+def generate_ppt(template=None, content=None, output_path=None, layout_map=None, progress=None,
+                 compresslevel=None, template_path=None, content_path=None):
+    """
+    Gera o deck a partir do template e do conteúdo.
+
+    template e content podem ser caminhos, bytes ou arquivos abertos (ex.: os
+    uploads do Streamlit); template_path e content_path são os nomes antigos,
+    aceitos para quem chamava generate_ppt(template_path=..., content_path=...).
+    Sem output_path, nada toca o disco e o deck volta em memória. A gravação
+    copia do template as partes que não mudaram (ver fast_save); compresslevel
+    vale para as demais.
+
+    Mudança em relação à versão antiga: uma linha '#PALAVRA' que não é um tipo
+    de seção não descarta mais o bloco seguinte; ela fica como texto da seção
+    em que aparece, com um aviso no log (ver content_parser).
+
+    Returns:
+        BytesIO com o .pptx (posicionado no início), ou output_path se informado
+    """
+    template = _argumento("template", template, template_path)
+    content = _argumento("content", content, content_path)
+    # Template já visto neste processo não é relido nem descomprimido; um
+    # arquivo aberto é lido uma única vez
+    prs, layout_index, plano = get_template_cache().prepare(template, layout_map)
+
+    # O conteúdo é lido em streaming: cada seção vira slide assim que termina
+    with open_content(content) as linhas:
+        fill_presentation(prs, linhas, layout_index, progress=progress)
+
+    if output_path is not None:
+        save_presentation(prs, output_path, plano, compresslevel)
+        return output_path
+    saida = io.BytesIO()
+    save_presentation(prs, saida, plano, compresslevel)
+    saida.seek(0)
+    return saida
+
+
+def _argumento(nome, valor, antigo):
+    if valor is not None and antigo is not None:
+        raise TypeError(f"generate_ppt() recebeu {nome} e {nome}_path; use só {nome}")
+    valor = antigo if valor is None else valor
+    if valor is None:
+        raise TypeError(f"generate_ppt() precisa de {nome}")
+    return valor
+
+
+@contextmanager
+def open_content(source):
+    """Linhas do conteúdo em UTF-8, de um caminho, bytes ou arquivo aberto (texto ou binário)."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "r", encoding="utf-8") as f:
+            yield f
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.StringIO(bytes(source).decode("utf-8"))
+    elif isinstance(source, io.TextIOBase):
+        yield source
+    else:
+        # Decodifica sob demanda, sem fechar o arquivo de quem chamou
+        yield codecs.getreader("utf-8")(source)
 
-    for section in sections:
-        lines = [l.strip() for l in section.splitlines() if l.strip()]
 
-        tipo = lines[0]
-        dados = lines[1:]
+def fill_presentation(prs, content, layout_index=None, image_cache=None, progress=None):
+    """
+    Adiciona ao prs os slides descritos no conteúdo; retorna quantos foram criados.
 
-        layout = LAYOUTS.get(tipo)
-        if layout is None:
-            continue
+    content pode ser o texto completo ou um iterável de linhas (arquivo aberto).
+    Erros de formato levantam ContentError com o número da linha; tipo sem
+    layout no template levanta TemplateError. progress, se informado, é chamado
+    com o total de slides criados depois de cada slide.
+    """
+    return fill_sections(prs, parse_sections(content), layout_index, image_cache, progress)
 
-        slide = prs.slides.add_slide(prs.slide_layouts[layout])
+
+def fill_sections(prs, sections, layout_index=None, image_cache=None, progress=None):
+    """Como fill_presentation, para seções já montadas (ex.: tabular_content)."""
+    layout_index = layout_index or LayoutIndex(prs)
+    image_cache = image_cache or get_image_cache()
+    total = 0
+
+    for section in sections:
+        tipo = section.tipo
+        campos = section.campos
+        layout = layout_index.resolve(tipo)
+
+        slide = prs.slides.add_slide(prs.slide_layouts[layout["layout"]])
+        total += 1
+        slide.placeholders[layout["title"]].text = campos["titulo"][0]
+        textos = [slide.placeholders[idx] for idx in layout["texts"]]
 
         # CAPA
         if tipo == "CAPA":
-            slide.shapes.title.text = dados[0]
-            slide.placeholders[1].text = dados[1]
+            set_paragraphs(textos[0], campos["subtitulo"])
 
         # 1 COLUNA
         elif tipo == "1COL":
-            slide.shapes.title.text = dados[0]
-            slide.placeholders[1].text = dados[1]
+            set_paragraphs(textos[0], campos["corpo"])
 
         # 2 COLUNAS
         elif tipo == "2COL":
-            slide.shapes.title.text = dados[0]
-            slide.placeholders[1].text = dados[1]
-            slide.placeholders[2].text = dados[2]
+            set_paragraphs(textos[0], campos["esquerda"])
+            set_paragraphs(textos[1], campos["direita"])
 
         # SLIDE COM IMAGEM
         elif tipo == "IMG":
-            slide.shapes.title.text = dados[0]
-            img_path = dados[1]
-            slide.shapes.add_picture(img_path, Inches(1), Inches(2))
-            slide.placeholders[1].text = dados[2]
+            add_image(slide, layout, textos[0], campos["imagem"][0], image_cache)
+            set_paragraphs(textos[0], campos["legenda"])
+
+        if progress:
+            progress(total)
+
+    return total
+
+
+def add_image(slide, layout, legenda, img_path, image_cache):
+    """
+    Imagem reduzida (ver image_cache) e encaixada na área, sem distorcer nem cortar.
+
+    Com placeholder de imagem, a área é a do placeholder. Sem ele, a imagem
+    ocupa o placeholder de texto e a legenda desce para uma faixa no rodapé.
+    """
+    if layout["picture"] is not None:
+        placeholder = slide.placeholders[layout["picture"]]
+        area = (placeholder.left, placeholder.top, placeholder.width, placeholder.height)
+        caminho, (largura, altura) = image_cache.prepare(img_path, area[2], area[3])
+        picture = placeholder.insert_picture(caminho)
+        # insert_picture corta a imagem para preencher o placeholder; aqui ela é encaixada inteira
+        picture.crop_left = picture.crop_right = picture.crop_top = picture.crop_bottom = 0
+    else:
+        left, top, width, height = legenda.left, legenda.top, legenda.width, legenda.height
+        area = (left, top, width, height - LEGENDA_ALTURA)
+        # As quatro coordenadas juntas: placeholder herdado sem posição própria ficaria zerado
+        legenda.left, legenda.top, legenda.width, legenda.height = left, top + height - LEGENDA_ALTURA, width, LEGENDA_ALTURA
+        caminho, (largura, altura) = image_cache.prepare(img_path, area[2], area[3])
+        picture = slide.shapes.add_picture(caminho, area[0], area[1])
+    picture.left, picture.top, picture.width, picture.height = fit_box(largura, altura, *area)
+
 
-    prs.save(output_path)
+def set_paragraphs(placeholder, linhas):
+    """Um parágrafo por linha; tópicos ('- ') ganham o nível da indentação."""
+    text_frame = placeholder.text_frame
+    text_frame.clear()
+    for i, (texto, nivel) in enumerate(paragraphs(linhas)):
+        paragraph = text_frame.paragraphs[0] if i == 0 else text_frame.add_paragraph()
+        paragraph.text = texto
+        paragraph.level = nivel
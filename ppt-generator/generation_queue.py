@@ -0,0 +1,156 @@
+"""
+Fila de geração em segundo plano para o app.
+
+Cada pedido vira um GenerationJob com id, progresso por slide e resultado; a
+geração roda num pool de threads do processo (PPT_WORKERS, padrão 4), então o
+script do Streamlit só enfileira e acompanha, sem ficar bloqueado nem abrir
+uma thread por sessão. O pool limita quantos decks são gerados ao mesmo
+tempo; os demais esperam na fila.
+
+Template, conteúdo e resultado ficam em memória, no job: nada é gravado em
+disco, então a limpeza por TTL só remove jobs da memória (não há mais
+uploads/ nem outputs/ do app para apagar). Jobs terminados (e o deck gerado)
+expiram depois de PPT_TTL_MIN minutos (padrão 60); uma thread de limpeza
+passa a cada PPT_LIMPEZA_MIN minutos (padrão 5).
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from content_parser import count_sections
+from generate_ppt import generate_ppt, open_content
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationJob:
+
+    def __init__(self, template, content):
+        self.id = uuid.uuid4().hex
+        self.template = template
+        self.content = content
+        self.resultado = None  # bytes do .pptx gerado
+        self.status = "na fila"  # na fila | gerando | pronto | erro
+        self.slides = 0
+        self.total = None
+        self.erro = None
+        self.criado_em = time.time()
+        self.concluido_em = None
+
+    @property
+    def concluido(self):
+        return self.status in ("pronto", "erro")
+
+    @property
+    def progresso(self):
+        if self.status == "pronto":
+            return 1.0
+        if not self.total:
+            return 0.0
+        return min(self.slides / self.total, 0.99)
+
+
+class GenerationQueue:
+    """
+    Args:
+        workers: Gerações simultâneas
+        ttl: Segundos até jobs terminados expirarem
+        intervalo_limpeza: Segundos entre passagens da limpeza
+    """
+
+    def __init__(self, workers=None, ttl=None, intervalo_limpeza=None):
+        self.ttl = ttl or float(os.getenv("PPT_TTL_MIN", 60)) * 60
+        self.intervalo_limpeza = intervalo_limpeza or float(os.getenv("PPT_LIMPEZA_MIN", 5)) * 60
+        self.jobs = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers or int(os.getenv("PPT_WORKERS", 4)),
+                                            thread_name_prefix="ppt")
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread_limpeza = None
+
+    def submit(self, template, content):
+        """Enfileira a geração (template e conteúdo em bytes) e retorna o job."""
+        job = GenerationJob(template, content)
+        with self._lock:
+            self.jobs[job.id] = job
+        self._executor.submit(self._executa, job)
+        return job
+
+    def get(self, job_id):
+        """Job pelo id, ou None se não existe ou já expirou."""
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def result(self, job_id):
+        """Bytes do deck gerado; None enquanto o job não termina."""
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job.status == "erro":
+            raise job.erro
+        return job.resultado if job.status == "pronto" else None
+
+    def pendentes(self):
+        with self._lock:
+            return sum(not job.concluido for job in self.jobs.values())
+
+    def inicia_limpeza(self):
+        """Inicia a thread de limpeza (uma vez por processo)."""
+        if self._thread_limpeza is None:
+            self._thread_limpeza = threading.Thread(target=self._loop_limpeza, name="ppt-limpeza", daemon=True)
+            self._thread_limpeza.start()
+
+    def limpa_expirados(self, agora=None):
+        """Remove os jobs terminados há mais que o TTL; retorna quantos foram removidos."""
+        agora = agora or time.time()
+        with self._lock:
+            expirados = [job_id for job_id, job in self.jobs.items()
+                         if job.concluido and agora - job.concluido_em > self.ttl]
+            for job_id in expirados:
+                del self.jobs[job_id]
+        if expirados:
+            logger.info(f"Limpeza: {len(expirados)} job(s) expirados")
+        return len(expirados)
+
+    def _executa(self, job):
+        job.status = "gerando"
+        try:
+            with open_content(job.content) as linhas:
+                job.total = count_sections(linhas)
+            saida = generate_ppt(job.template, job.content,
+                                 progress=lambda slides: setattr(job, "slides", slides))
+            job.resultado = saida.getvalue()
+            status = "pronto"
+        except Exception as e:
+            logger.warning(f"Geração {job.id} falhou: {type(e).__name__}: {e}")
+            job.erro = e
+            status = "erro"
+        # concluido_em antes do status: a limpeza só olha jobs concluídos
+        job.concluido_em = time.time()
+        job.status = status
+        job.template = job.content = None  # só o resultado fica até expirar
+
+    def _loop_limpeza(self):
+        while not self._parar.wait(self.intervalo_limpeza):
+            try:
+                self.limpa_expirados()
+            except Exception as e:
+                # A limpeza nunca derruba o app
+                logger.error(f"Erro na limpeza dos jobs: {e}", exc_info=True)
+
+
+_fila = None
+_fila_lock = threading.Lock()
+
+
+def get_generation_queue():
+    """GenerationQueue único do processo, com a limpeza por TTL já iniciada."""
+    global _fila
+    with _fila_lock:
+        if _fila is None:
+            _fila = GenerationQueue()
+            _fila.inicia_limpeza()
+        return _fila
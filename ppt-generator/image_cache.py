@@ -0,0 +1,238 @@
+"""
+Imagens dos slides #IMG preparadas para o tamanho em que aparecem.
+
+Cada imagem é reduzida para a área onde vai ser exibida (em pixels, a
+IMAGE_DPI, padrão 150), corrigida pela orientação EXIF e recomprimida: fotos
+viram JPEG (IMAGE_QUALITY, padrão 85); imagens com transparência ou poucas
+cores (logos, gráficos) ficam em PNG. Se o resultado não for menor que o
+original, o original é usado.
+
+O resultado fica em disco (IMAGE_CACHE_DIR, padrão cache/imagens ao lado deste
+arquivo, seja qual for a pasta de onde o app ou o lote são executados), com nome
+derivado do SHA-256 do arquivo original e do tamanho em pixels: a mesma
+imagem usada em vários decks, ou em várias execuções, é processada uma vez.
+Quando a pasta passa de IMAGE_CACHE_MAX_MB (padrão 500), as imagens usadas há
+mais tempo (mtime, renovado a cada uso) são apagadas até ela voltar a 90% do
+limite. A pasta pode ser apagada a qualquer momento.
+"""
+import hashlib
+import io
+import os
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+EMU_POR_POLEGADA = 914400
+MAX_CAMINHOS = 1024  # caminhos lembrados, como no template_cache
+FORMATOS_PPTX = {"JPEG", "PNG", "GIF", "BMP", "TIFF"}
+PASTA_CACHE_PADRAO = Path(__file__).parent / "cache" / "imagens"
+
+logger = logging.getLogger(__name__)
+
+
+def fit_box(largura_img, altura_img, left, top, width, height):
+    """Maior retângulo com a proporção da imagem dentro da área, centralizado."""
+    escala = min(width / largura_img, height / altura_img)
+    w, h = int(largura_img * escala), int(altura_img * escala)
+    return left + (width - w) // 2, top + (height - h) // 2, w, h
+
+
+class ImageCache:
+
+    def __init__(self, cache_dir=None, dpi=None, quality=None, max_bytes=None):
+        self.cache_dir = cache_dir or os.getenv("IMAGE_CACHE_DIR", str(PASTA_CACHE_PADRAO))
+        self.dpi = dpi or int(os.getenv("IMAGE_DPI", 150))
+        self.quality = quality or int(os.getenv("IMAGE_QUALITY", 85))
+        self.max_bytes = max_bytes or int(float(os.getenv("IMAGE_CACHE_MAX_MB", 500)) * 1024 * 1024)
+        self._bytes_disco = None  # calculado na primeira gravação
+        self._por_caminho = OrderedDict()  # (caminho, mtime_ns, tamanho) -> sha256
+        self._preparadas = OrderedDict()  # (sha256, largura_px, altura_px) -> (caminho no cache, (largura, altura))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def prepare(self, image_path, width, height):
+        """
+        Imagem pronta para uma área de width x height (EMU).
+
+        Returns:
+            tuple: (caminho do arquivo preparado, (largura, altura) em pixels)
+        """
+        largura_px = max(1, round(width * self.dpi / EMU_POR_POLEGADA))
+        altura_px = max(1, round(height * self.dpi / EMU_POR_POLEGADA))
+        sha, data = self._load(image_path)
+        chave = (sha, largura_px, altura_px)
+        with self._lock:
+            pronta = self._preparadas.get(chave)
+        if pronta is not None and not self._touch(pronta[0]):
+            pronta = None  # apagada pelo limite de tamanho (deste ou de outro processo)
+        if pronta is None:
+            pronta = self._from_disk(chave)
+        if pronta is not None:
+            with self._lock:
+                self._remember(chave, pronta)
+                self.hits += 1
+            return pronta
+
+        if data is None:
+            with open(image_path, "rb") as f:
+                data = f.read()
+        processada, tamanho, ext = self._process(data, largura_px, altura_px)
+        destino = os.path.join(self.cache_dir, f"{sha}_{largura_px}x{altura_px}_q{self.quality}.{ext}")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Grava e renomeia: outro processo do lote pode estar preparando a mesma imagem
+        temporario = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, "wb") as f:
+            f.write(processada)
+        os.replace(temporario, destino)
+
+        pronta = (destino, tamanho)
+        with self._lock:
+            self._remember(chave, pronta)
+            self.misses += 1
+            self.bytes_in += len(data)
+            self.bytes_out += len(processada)
+            if self._bytes_disco is None:
+                self._bytes_disco = sum(tamanho for _, tamanho, _ in self._disk_entries())
+            else:
+                self._bytes_disco += len(processada)
+            if self._bytes_disco > self.max_bytes:
+                self._remove_excess(manter=destino)
+        return pronta
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"cache_dir": self.cache_dir, "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / total if total else 0.0,
+                    "bytes_in": self.bytes_in, "bytes_out": self.bytes_out}
+
+    def _remember(self, chave, pronta):
+        self._preparadas[chave] = pronta
+        self._preparadas.move_to_end(chave)
+        if len(self._preparadas) > MAX_CAMINHOS:
+            self._preparadas.popitem(last=False)
+
+    def _disk_entries(self):
+        """(mtime, tamanho, caminho) de cada imagem na pasta do cache."""
+        entradas = []
+        try:
+            nomes = os.listdir(self.cache_dir)
+        except OSError:
+            return entradas
+        for nome in nomes:
+            if nome.endswith(".tmp"):
+                continue
+            caminho = os.path.join(self.cache_dir, nome)
+            try:
+                info = os.stat(caminho)
+            except OSError:
+                continue
+            entradas.append((info.st_mtime, info.st_size, caminho))
+        return entradas
+
+    def _remove_excess(self, manter):
+        """Apaga as imagens usadas há mais tempo até a pasta caber em 90% do limite. Chamada com self._lock."""
+        entradas = sorted(self._disk_entries())
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        limite = self.max_bytes * 0.9
+        apagados = set()
+        for _, tamanho, caminho in entradas:
+            if total <= limite:
+                break
+            if caminho == manter:
+                continue
+            try:
+                os.remove(caminho)
+            except OSError:
+                continue
+            total -= tamanho
+            apagados.add(caminho)
+        for chave in [c for c, (caminho, _) in self._preparadas.items() if caminho in apagados]:
+            del self._preparadas[chave]
+        self._bytes_disco = total
+        logger.info(f"Cache de imagens: {len(apagados)} arquivo(s) apagado(s) por limite de tamanho")
+
+    @staticmethod
+    def _touch(caminho):
+        """Renova o mtime (ordem de remoção); False se o arquivo não existe mais."""
+        try:
+            os.utime(caminho)
+            return True
+        except OSError:
+            return False
+
+    def _process(self, data, largura_px, altura_px):
+        """(bytes, (largura, altura), extensão) da imagem reduzida e recomprimida."""
+        with Image.open(io.BytesIO(data)) as original:
+            formato = original.format
+            if getattr(original, "is_animated", False) and formato in FORMATOS_PPTX:
+                # GIF animado: reduzir perderia a animação
+                return data, original.size, formato.lower()
+            transposta = original.getexif().get(0x0112, 1) != 1  # Orientation
+            img = ImageOps.exif_transpose(original)
+
+        reduzir = img.width > largura_px or img.height > altura_px
+        if reduzir:
+            img.thumbnail((largura_px, altura_px), Image.LANCZOS)
+
+        transparente = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        saida = io.BytesIO()
+        if transparente or img.getcolors(256) is not None:
+            img.save(saida, "PNG", optimize=True)
+            ext = "png"
+        else:
+            img.convert("RGB").save(saida, "JPEG", quality=self.quality, optimize=True, progressive=True)
+            ext = "jpg"
+
+        if (not reduzir and not transposta and formato in FORMATOS_PPTX
+                and len(saida.getvalue()) >= len(data)):
+            return data, img.size, formato.lower()
+        return saida.getvalue(), img.size, ext
+
+    def _from_disk(self, chave):
+        sha, largura_px, altura_px = chave
+        base = os.path.join(self.cache_dir, f"{sha}_{largura_px}x{altura_px}_q{self.quality}.")
+        for ext in ("jpg", "png", "jpeg", "gif", "bmp", "tiff"):
+            if self._touch(base + ext):
+                try:
+                    with Image.open(base + ext) as img:
+                        return base + ext, img.size
+                except OSError:
+                    return None  # arquivo corrompido: é processado de novo e sobrescrito
+        return None
+
+    def _load(self, image_path):
+        """(sha256, bytes ou None); para caminhos já vistos e inalterados, não relê o arquivo."""
+        info = os.stat(image_path)
+        id_arquivo = (os.fspath(image_path), info.st_mtime_ns, info.st_size)
+        with self._lock:
+            sha = self._por_caminho.get(id_arquivo)
+        if sha is not None:
+            return sha, None
+        with open(image_path, "rb") as f:
+            data = f.read()
+        sha = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._por_caminho[id_arquivo] = sha
+            if len(self._por_caminho) > MAX_CAMINHOS:
+                self._por_caminho.popitem(last=False)
+        return sha, data
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_image_cache():
+    """ImageCache único do processo."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ImageCache()
+        return _cache
@@ -0,0 +1,261 @@
+"""
+Conteúdo a partir de planilhas: linhas de CSV, JSON ou JSONL viram seções.
+
+Um mapeamento declarativo (dict ou arquivo .json) diz que seções cada linha
+gera e de quais colunas vem cada campo:
+
+    {
+      "group_by": "curso",
+      "output": "{curso}.pptx",
+      "sections": [
+        {"tipo": "CAPA", "once": true, "titulo": "{curso}", "subtitulo": "Prof. {professor}"},
+        {"tipo": "1COL", "titulo": "Aula {aula}: {tema}", "corpo": "{conteudo}"},
+        {"tipo": "IMG", "when": "imagem", "titulo": "{tema}", "imagem": "{imagem}", "legenda": "{legenda}"}
+      ]
+    }
+
+- Os campos são os do content_parser (CAMPOS) e os valores usam {coluna};
+  quebras de linha na célula viram linhas do campo (tópicos com '- ' valem).
+- "tipo" também aceita {coluna}, para a planilha escolher o tipo por linha.
+- "once": a seção só sai na primeira linha de cada deck (ex.: capa).
+- "when": a seção só sai se a coluna estiver preenchida.
+- "group_by": cada valor da coluna vira um deck; sem ele, tudo vai para um
+  deck só. As linhas de um mesmo deck precisam estar juntas no arquivo
+  (planilha ordenada pela coluna), o que permite ler em streaming: só as
+  seções do deck atual ficam em memória.
+
+O formato vem da extensão (.csv, .json, .jsonl); JSON é uma lista de objetos,
+lida elemento a elemento.
+"""
+import csv
+import json
+import os
+import re
+from pathlib import Path
+
+from content_parser import CAMPOS, ContentError, Section
+
+FORMATOS = {".csv": "csv", ".json": "json", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+TAMANHO_BLOCO_JSON = 64 * 1024
+
+
+class MappingError(ValueError):
+    pass
+
+
+class _Linha(dict):
+    """Linha da planilha para format_map: coluna ausente vira ContentError com a posição."""
+
+    def __init__(self, valores, numero):
+        super().__init__(valores)
+        self.numero = numero
+
+    def __missing__(self, coluna):
+        raise ContentError(self.numero, f"coluna '{coluna}' não existe")
+
+
+def load_mapping(mapping):
+    """
+    Valida o mapeamento (dict ou caminho de um .json).
+
+    Raises:
+        MappingError: Tipo desconhecido, campo faltando ou campo a mais
+    """
+    if isinstance(mapping, (str, os.PathLike)):
+        with open(mapping, "r", encoding="utf-8") as f:
+            mapping = json.load(f)
+    secoes = mapping.get("sections")
+    if not secoes:
+        raise MappingError("mapeamento sem 'sections'")
+    for i, secao in enumerate(secoes, start=1):
+        tipo = secao.get("tipo")
+        if not tipo:
+            raise MappingError(f"seção {i} sem 'tipo'")
+        campos = {k for k in secao if k not in ("tipo", "once", "when")}
+        if "{" in tipo:
+            continue  # tipo vem da planilha: validado linha a linha
+        tipo = tipo.lstrip("#").upper()
+        if tipo not in CAMPOS:
+            raise MappingError(f"seção {i}: tipo desconhecido '{secao['tipo']}'")
+        faltando = [c for c in CAMPOS[tipo] if c not in campos]
+        sobrando = sorted(campos - set(CAMPOS[tipo]))
+        if faltando:
+            raise MappingError(f"seção {i} (#{tipo}): faltam os campos {', '.join(faltando)}")
+        if sobrando:
+            raise MappingError(f"seção {i} (#{tipo}): campos desconhecidos {', '.join(sobrando)}")
+    return mapping
+
+
+def read_rows(path, formato=None, delimiter=None):
+    """
+    Gera (número, dict) de cada linha/registro do arquivo, sem carregá-lo inteiro.
+
+    O número é a linha do arquivo em que o registro começa (CSV, JSONL) ou a
+    posição do registro (JSON).
+    """
+    formato = formato or FORMATOS.get(Path(path).suffix.lower())
+    if formato == "csv":
+        # utf-8-sig: CSV exportado pelo Excel começa com BOM
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            leitor = csv.DictReader(f, delimiter=delimiter or _detecta_delimitador(f))
+            leitor.fieldnames  # lê o cabeçalho
+            anterior = leitor.line_num
+            for linha in leitor:
+                # line_num é a última linha do registro; célula com quebra de linha ocupa várias
+                inicio, anterior = anterior + 1, leitor.line_num
+                # Célula faltando vem como None; colunas a mais (chave None) são ignoradas
+                yield inicio, {k: "" if v is None else v for k, v in linha.items() if k is not None}
+    elif formato == "jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            for numero, texto in enumerate(f, start=1):
+                if texto.strip():
+                    yield numero, _objeto(_json(texto, numero), numero)
+    elif formato == "json":
+        with open(path, "r", encoding="utf-8") as f:
+            for numero, valor in enumerate(_json_array(f), start=1):
+                yield numero, _objeto(valor, numero)
+    else:
+        raise MappingError(f"formato não suportado: {path} (use {', '.join(FORMATOS)})")
+
+
+def iter_decks(rows, mapping):
+    """
+    Agrupa as linhas em decks e gera as seções de cada um.
+
+    Args:
+        rows: Iterável de (número, dict), ex.: read_rows(...)
+        mapping: Mapeamento já validado (load_mapping)
+
+    Yields:
+        tuple: (chave do grupo, nome do arquivo de saída, lista de Section)
+
+    Raises:
+        ContentError: Coluna inexistente, tipo inválido ou grupo fora de ordem
+    """
+    coluna_grupo = mapping.get("group_by")
+    modelo_saida = mapping.get("output", "{%s}.pptx" % coluna_grupo if coluna_grupo else "apresentacao.pptx")
+    vistos = set()
+    aberto, chave, saida, secoes = False, None, None, []
+
+    for numero, valores in rows:
+        linha = _Linha(valores, numero)
+        nova_chave = str(linha[coluna_grupo]).strip() if coluna_grupo else None
+        primeira = not aberto or nova_chave != chave
+        if primeira:
+            if secoes:
+                yield chave, saida, secoes
+            if nova_chave in vistos:
+                raise ContentError(numero, f"'{nova_chave}' em {coluna_grupo} aparece de novo depois de "
+                                           "outro grupo; ordene o arquivo por essa coluna")
+            vistos.add(nova_chave)
+            aberto, chave, secoes = True, nova_chave, []
+            saida = _nome_arquivo(modelo_saida.format_map(linha))
+        secoes.extend(_secoes_da_linha(linha, mapping["sections"], primeira))
+
+    if secoes:
+        yield chave, saida, secoes
+
+
+def _secoes_da_linha(linha, modelos, primeira):
+    for modelo in modelos:
+        if modelo.get("once") and not primeira:
+            continue
+        if modelo.get("when") and not str(linha[modelo["when"]] or "").strip():
+            continue
+        tipo = modelo["tipo"].format_map(linha).strip().lstrip("#").upper()
+        if tipo not in CAMPOS:
+            raise ContentError(linha.numero, f"tipo de seção desconhecido '{tipo}'")
+        campos = {}
+        for nome in CAMPOS[tipo]:
+            if nome not in modelo:
+                raise ContentError(linha.numero, f"#{tipo} sem o campo '{nome}' no mapeamento")
+            valor = str(modelo[nome]).format_map(linha)
+            campos[nome] = valor.splitlines() or [""]
+        # Título e caminho da imagem têm uma linha só, como no arquivo de conteúdo
+        campos["titulo"] = [" ".join(l.strip() for l in campos["titulo"])]
+        if "imagem" in campos:
+            campos["imagem"] = [campos["imagem"][0].strip()]
+        yield Section(tipo, linha.numero, campos)
+
+
+def _nome_arquivo(nome):
+    # Valores da planilha não podem escapar da pasta de saída
+    nome = re.sub(r'[\\/:*?"<>|\x00-\x1f]', "_", nome).strip(" .")
+    return nome or "apresentacao.pptx"
+
+
+def _detecta_delimitador(f):
+    amostra = f.read(8192)
+    f.seek(0)
+    try:
+        return csv.Sniffer().sniff(amostra, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ","
+
+
+def _json(texto, numero):
+    try:
+        return json.loads(texto)
+    except json.JSONDecodeError as e:
+        raise ContentError(numero, f"JSON inválido: {e.msg}")
+
+
+def _objeto(valor, numero):
+    if not isinstance(valor, dict):
+        raise ContentError(numero, "cada registro deve ser um objeto JSON")
+    return {k: "" if v is None else v for k, v in valor.items()}
+
+
+def _json_array(f):
+    """Elementos de uma lista JSON, lidos em blocos (o arquivo nunca fica inteiro em memória)."""
+    decoder = json.JSONDecoder()
+    buffer, fim, posicao = "", False, 0
+
+    def completa():
+        nonlocal buffer, fim, posicao
+        bloco = f.read(TAMANHO_BLOCO_JSON)
+        fim = not bloco
+        buffer = buffer[posicao:] + bloco
+        posicao = 0
+
+    def pula_espacos():
+        nonlocal posicao
+        while True:
+            while posicao < len(buffer) and buffer[posicao].isspace():
+                posicao += 1
+            if posicao < len(buffer) or fim:
+                return
+            completa()
+
+    pula_espacos()
+    if fim and posicao == len(buffer):
+        return  # arquivo vazio: nenhum registro, como um CSV ou JSONL vazio
+    if buffer[posicao:posicao + 1] != "[":
+        raise ContentError(1, "o arquivo JSON deve ser uma lista de objetos")
+    posicao += 1
+    numero = 0
+    while True:
+        pula_espacos()
+        if buffer[posicao:posicao + 1] == "]":
+            return
+        if numero:
+            if buffer[posicao:posicao + 1] != ",":
+                raise ContentError(numero + 1, "JSON inválido: esperado ',' ou ']' entre registros")
+            posicao += 1
+            pula_espacos()
+        numero += 1
+        while True:
+            try:
+                valor, posicao_fim = decoder.raw_decode(buffer, posicao)
+            except json.JSONDecodeError as e:
+                if fim:
+                    raise ContentError(numero, f"JSON inválido: {e.msg}")
+                completa()
+                continue
+            if posicao_fim == len(buffer) and not fim:
+                # Número no fim do bloco pode continuar no próximo
+                completa()
+                continue
+            posicao = posicao_fim
+            yield valor
+            break
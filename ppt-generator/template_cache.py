@@ -0,0 +1,206 @@
+"""
+Cache de templates .pptx já preparados.
+
+Cada template é guardado uma vez, identificado pelo SHA-256 do conteúdo, como
+um snapshot em bytes do pacote regravado sem compressão (ZIP_STORED). Criar
+uma nova Presentation a partir do snapshot não lê o disco nem descomprime as
+partes, só interpreta o XML. Cada chamada recebe uma Presentation nova e
+independente, que pode ser alterada à vontade. O LayoutIndex e o SavePlan
+(ver fast_save) de cada template também ficam guardados; prepare() devolve os
+três lendo e calculando o hash do template uma vez só, o que também permite
+templates vindos de streams que não voltam ao início.
+
+Os snapshots ficam num LRU limitado em bytes (TEMPLATE_CACHE_MAX_MB, padrão 256).
+"""
+import hashlib
+import io
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+
+from pptx import Presentation
+
+from fast_save import SavePlan
+from template_layouts import LayoutIndex
+
+MAX_CAMINHOS = 1024  # caminhos lembrados (uploads ganham um nome novo a cada envio)
+
+
+def stored_snapshot(data):
+    """Regrava o pacote .pptx sem compressão, mantendo a ordem das partes."""
+    saida = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(data)) as origem, \
+            zipfile.ZipFile(saida, "w", zipfile.ZIP_STORED) as destino:
+        for item in origem.infolist():
+            destino.writestr(item.filename, origem.read(item), compress_type=zipfile.ZIP_STORED)
+    return saida.getvalue()
+
+
+class TemplateCache:
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or int(float(os.getenv("TEMPLATE_CACHE_MAX_MB", 256)) * 1024 * 1024)
+        self._snapshots = OrderedDict()  # sha256 -> bytes
+        self._bytes = 0
+        self._por_caminho = OrderedDict()  # (caminho, mtime_ns, tamanho) -> sha256, evita reler o arquivo
+        self._indices = {}  # (sha256, layout_map) -> LayoutIndex
+        self._planos = {}  # sha256 -> SavePlan
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, source):
+        """SHA-256 do template; source pode ser caminho, bytes ou arquivo aberto."""
+        return self._load(source)[0]
+
+    def prepare(self, source, layout_map=None):
+        """
+        Presentation nova, LayoutIndex e SavePlan do template, com uma única leitura.
+
+        Returns:
+            tuple: (Presentation, LayoutIndex, SavePlan)
+        """
+        template = self._template(source)
+        return (Presentation(io.BytesIO(self._snapshot(template))), self._layout_index(template, layout_map),
+                self._save_plan(template))
+
+    def presentation(self, source):
+        """Nova Presentation criada a partir do snapshot do template."""
+        return Presentation(io.BytesIO(self.snapshot(source)))
+
+    def layout_index(self, source, layout_map=None):
+        """LayoutIndex do template, calculado uma vez por template e layout_map."""
+        return self._layout_index(self._template(source), layout_map)
+
+    def save_plan(self, source):
+        """SavePlan do template, para copiar as partes intactas sem recomprimir."""
+        return self._save_plan(self._template(source))
+
+    def snapshot(self, source):
+        return self._snapshot(self._template(source))
+
+    def _template(self, source):
+        """
+        (sha256, bytes ou None, source) lido uma vez; arquivos abertos viram bytes.
+
+        Os métodos internos recebem esta tupla em vez de source, então um
+        upload ou stream não é relido (nem precisa voltar ao início) a cada etapa.
+        """
+        chave, data = self._load(source)
+        if data is not None:
+            source = data
+        return chave, data, source
+
+    def _layout_index(self, template, layout_map):
+        chave = (template[0], tuple(sorted((layout_map or {}).items())))
+        with self._lock:
+            indice = self._indices.get(chave)
+        if indice is None:
+            indice = LayoutIndex(Presentation(io.BytesIO(self._snapshot(template))), layout_map)
+            with self._lock:
+                self._indices[chave] = indice
+        return indice
+
+    def _save_plan(self, template):
+        chave, data, source = template
+        with self._lock:
+            plano = self._planos.get(chave)
+        if plano is None:
+            if data is None:
+                data = self._read(source)
+            plano = SavePlan(data, Presentation(io.BytesIO(self._snapshot(template))))
+            with self._lock:
+                if chave not in self._planos:
+                    self._planos[chave] = plano
+                    self._bytes += plano.nbytes
+                    self._evict()
+        return plano
+
+    def _snapshot(self, template):
+        chave, data, source = template
+        with self._lock:
+            snapshot = self._snapshots.get(chave)
+            if snapshot is not None:
+                self._snapshots.move_to_end(chave)
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+        if data is None:
+            data = self._read(source)
+        snapshot = stored_snapshot(data)
+        with self._lock:
+            if chave not in self._snapshots:
+                self._snapshots[chave] = snapshot
+                self._bytes += len(snapshot)
+                self._evict()
+        return snapshot
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._snapshots), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / total if total else 0.0}
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+            self._indices.clear()
+            self._planos.clear()
+            self._por_caminho.clear()
+            self._bytes = 0
+
+    def _load(self, source):
+        """(sha256, bytes ou None); para caminhos já vistos e inalterados, não relê o arquivo."""
+        if isinstance(source, (str, os.PathLike)):
+            info = os.stat(source)
+            id_arquivo = (os.fspath(source), info.st_mtime_ns, info.st_size)
+            with self._lock:
+                chave = self._por_caminho.get(id_arquivo)
+            if chave is not None:
+                return chave, None
+            data = self._read(source)
+            chave = hashlib.sha256(data).hexdigest()
+            with self._lock:
+                self._por_caminho[id_arquivo] = chave
+                if len(self._por_caminho) > MAX_CAMINHOS:
+                    self._por_caminho.popitem(last=False)
+            return chave, data
+        data = self._read(source)
+        return hashlib.sha256(data).hexdigest(), data
+
+    @staticmethod
+    def _read(source):
+        if isinstance(source, (bytes, bytearray)):
+            return bytes(source)
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "rb") as f:
+                return f.read()
+        if source.seekable():
+            source.seek(0)
+        return source.read()
+
+    def _evict(self):
+        # Sempre mantém o snapshot mais recente, mesmo que sozinho passe do limite
+        while self._bytes > self.max_bytes and len(self._snapshots) > 1:
+            chave, snapshot = self._snapshots.popitem(last=False)
+            self._bytes -= len(snapshot)
+            for chave_indice in [c for c in self._indices if c[0] == chave]:
+                del self._indices[chave_indice]
+            plano = self._planos.pop(chave, None)
+            if plano is not None:
+                self._bytes -= plano.nbytes
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_template_cache():
+    """TemplateCache único do processo."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TemplateCache()
+        return _cache
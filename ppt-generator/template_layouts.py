@@ -0,0 +1,178 @@
+"""
+Resolução dos tipos de seção (#CAPA, #1COL, #2COL, #IMG) para layouts do template.
+
+Em vez de índices fixos, o template é inspecionado uma vez: para cada layout
+guardamos o nome e os placeholders de título, texto e imagem (pelo tipo, com os
+de texto ordenados da esquerda para a direita). Cada tipo de seção é resolvido:
+
+1. pelo layout informado em layout_map (nome ou índice);
+2. por um nome conhecido (ex.: 'Capa', 'Title Slide', 'Two Content');
+3. pela estrutura: o layout com título e a quantidade de placeholders de
+   texto/imagem mais próxima do que o tipo precisa.
+
+O relatório de validação diz, antes de gerar, qual layout cada tipo vai usar e
+o que falta no template.
+"""
+from pptx.enum.shapes import PP_PLACEHOLDER
+
+TITULO = {PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.CENTER_TITLE, PP_PLACEHOLDER.VERTICAL_TITLE}
+TEXTO = {PP_PLACEHOLDER.BODY, PP_PLACEHOLDER.OBJECT, PP_PLACEHOLDER.SUBTITLE, PP_PLACEHOLDER.VERTICAL_BODY}
+IMAGEM = {PP_PLACEHOLDER.PICTURE}
+
+# tipo -> (placeholders de texto, placeholders de imagem)
+REQUISITOS = {
+    "CAPA": (1, 0),
+    "1COL": (1, 0),
+    "2COL": (2, 0),
+    "IMG": (1, 1),
+}
+
+NOMES_CONHECIDOS = {
+    "CAPA": ["capa", "title slide", "slide de título"],
+    "1COL": ["conteúdo – 1 coluna", "conteúdo - 1 coluna", "title and content", "título e conteúdo"],
+    "2COL": ["conteúdo – 2 colunas", "conteúdo - 2 colunas", "two content", "duas partes de conteúdo"],
+    "IMG": ["imagem", "picture with caption", "imagem com legenda"],
+}
+
+
+class TemplateError(ValueError):
+    pass
+
+
+def _descreve_layout(indice, layout):
+    titulo, textos, imagens, subtitulo = None, [], [], False
+    for placeholder in layout.placeholders:
+        tipo = placeholder.placeholder_format.type
+        idx = placeholder.placeholder_format.idx
+        if tipo in TITULO and titulo is None:
+            titulo = idx
+        elif tipo in IMAGEM:
+            imagens.append(idx)
+        elif tipo in TEXTO:
+            subtitulo = subtitulo or tipo == PP_PLACEHOLDER.SUBTITLE
+            # Subtítulo primeiro; colunas da esquerda para a direita
+            textos.append((tipo != PP_PLACEHOLDER.SUBTITLE, placeholder.left or 0, placeholder.top or 0, idx))
+    return {
+        "index": indice,
+        "name": layout.name,
+        "title": titulo,
+        "texts": [idx for *_, idx in sorted(textos)],
+        "pictures": imagens,
+        "subtitle": subtitulo,
+    }
+
+
+class LayoutIndex:
+    """
+    Layouts do template e a resolução de cada tipo de seção.
+
+    Só guarda índices e nomes, então pode ser reutilizado por qualquer
+    Presentation aberta a partir do mesmo template.
+
+    Args:
+        prs: Presentation do template
+        layout_map: dict tipo -> nome ou índice do layout, para forçar a escolha
+    """
+
+    def __init__(self, prs, layout_map=None):
+        self.layouts = [_descreve_layout(i, layout) for i, layout in enumerate(prs.slide_layouts)]
+        self.layout_map = layout_map or {}
+        self.resolved = {}
+        self.report = []
+        for tipo in REQUISITOS:
+            resolucao, linha = self._resolve(tipo)
+            self.resolved[tipo] = resolucao
+            self.report.append(linha)
+
+    def resolve(self, tipo):
+        """
+        Layout e placeholders do tipo.
+
+        Returns:
+            dict: layout (índice), title, texts e picture (idx dos placeholders)
+
+        Raises:
+            TemplateError: Se o template não tem layout utilizável para o tipo
+        """
+        resolucao = self.resolved.get(tipo)
+        if resolucao is None:
+            problemas = next(l["problems"] for l in self.report if l["tipo"] == tipo)
+            raise TemplateError(f"template sem layout para #{tipo}: {'; '.join(problemas)}")
+        return resolucao
+
+    @property
+    def ok(self):
+        return all(linha["ok"] for linha in self.report)
+
+    def format_report(self):
+        linhas = []
+        for linha in self.report:
+            if linha["ok"]:
+                texto = f"#{linha['tipo']:<5} -> layout {linha['layout']} '{linha['name']}' ({linha['how']})"
+            else:
+                texto = f"#{linha['tipo']:<5} -> SEM LAYOUT"
+            for problema in linha["problems"] + linha["warnings"]:
+                texto += f"\n         {problema}"
+            linhas.append(texto)
+        return "\n".join(linhas)
+
+    def _atende(self, layout, tipo, exige_imagem=True):
+        textos, imagens = REQUISITOS[tipo]
+        return (layout["title"] is not None and len(layout["texts"]) >= textos
+                and (len(layout["pictures"]) >= imagens or not exige_imagem))
+
+    def _resolve(self, tipo):
+        linha = {"tipo": tipo, "ok": False, "layout": None, "name": None, "how": None,
+                 "problems": [], "warnings": []}
+        escolhido, como = None, None
+
+        configurado = self.layout_map.get(tipo)
+        if configurado is not None:
+            escolhido = self._por_nome_ou_indice(configurado)
+            como = "configurado"
+            if escolhido is None:
+                linha["problems"].append(f"layout configurado '{configurado}' não existe no template")
+            elif not self._atende(escolhido, tipo, exige_imagem=False):
+                linha["problems"].append(f"layout configurado '{escolhido['name']}' não tem título "
+                                         f"e {REQUISITOS[tipo][0]} placeholder(s) de texto")
+                escolhido = None
+
+        if escolhido is None and configurado is None:
+            nomes = NOMES_CONHECIDOS.get(tipo, [])
+            escolhido = next((l for l in self.layouts
+                              if l["name"].strip().lower() in nomes and self._atende(l, tipo)), None)
+            como = "nome"
+
+        if escolhido is None and configurado is None:
+            candidatos = [l for l in self.layouts if self._atende(l, tipo)]
+            if not candidatos and REQUISITOS[tipo][1]:
+                # Sem placeholder de imagem: a imagem vai para a área livre do slide
+                candidatos = [l for l in self.layouts if self._atende(l, tipo, exige_imagem=False)]
+                if candidatos:
+                    linha["warnings"].append("nenhum layout com placeholder de imagem; "
+                                             "a imagem é posicionada na área livre do slide")
+            textos, imagens = REQUISITOS[tipo]
+            # Capa prefere layout com subtítulo; os demais, layout com corpo de texto
+            candidatos.sort(key=lambda l: (abs(len(l["texts"]) - textos) + abs(len(l["pictures"]) - imagens)
+                                           + (l["subtitle"] != (tipo == "CAPA")), l["index"]))
+            escolhido = candidatos[0] if candidatos else None
+            como = "estrutura"
+            if escolhido is None:
+                linha["problems"].append(f"nenhum layout com título e {textos} placeholder(s) de texto")
+
+        if escolhido is None:
+            return None, linha
+        linha.update(ok=True, layout=escolhido["index"], name=escolhido["name"], how=como)
+        resolucao = {
+            "layout": escolhido["index"],
+            "title": escolhido["title"],
+            "texts": escolhido["texts"][:REQUISITOS[tipo][0]],
+            "picture": escolhido["pictures"][0] if REQUISITOS[tipo][1] and escolhido["pictures"] else None,
+        }
+        return resolucao, linha
+
+    def _por_nome_ou_indice(self, valor):
+        if isinstance(valor, int) or str(valor).isdigit():
+            indice = int(valor)
+            return self.layouts[indice] if 0 <= indice < len(self.layouts) else None
+        return next((l for l in self.layouts if l["name"].strip().lower() == str(valor).strip().lower()), None)
@@ -0,0 +1,256 @@
+import json
+import os
+import zipfile
+from pathlib import Path
+from xml.etree import ElementTree
+
+import pytest
+from PIL import Image
+
+import fast_save
+from batch_ppt import _run_batch, load_template
+from content_parser import ContentError, count_sections, parse_sections
+from fast_save import save_presentation
+from generate_ppt import fill_presentation, generate_ppt
+from image_cache import ImageCache
+from tabular_content import iter_decks, load_mapping, read_rows
+from template_cache import TemplateCache
+
+TEMPLATE = Path(__file__).parent / "data" / "PPT_Modelo1.pptx"
+
+
+# content_parser ==========
+
+def test_cabecalho_aceita_espacos_e_minusculas():
+    secoes = list(parse_sections("# capa\nTítulo\nSubtítulo\n#  1col  \nTópico\n- item\n"))
+    assert [s.tipo for s in secoes] == ["CAPA", "1COL"]
+    assert secoes[1].campos == {"titulo": ["Tópico"], "corpo": ["- item"]}
+
+
+def test_hashtag_no_corpo_e_texto():
+    texto = "#1COL\nRedes sociais\n- campanha\n#marketing\n#2COL\nA\nB\nC\n"
+    secoes = list(parse_sections(texto))
+    assert [s.tipo for s in secoes] == ["1COL", "2COL"]
+    assert secoes[0].campos["corpo"] == ["- campanha", "#marketing"]
+    assert count_sections(texto) == 2
+
+
+def test_cabecalho_escapado_e_texto():
+    secoes = list(parse_sections("#1COL\nTítulo\n\\#CAPA\n"))
+    assert len(secoes) == 1
+    assert secoes[0].campos["corpo"] == ["#CAPA"]
+
+
+def test_erros_informam_a_linha():
+    with pytest.raises(ContentError) as erro:
+        list(parse_sections("\n#hashtag antes\n#CAPA\nTítulo\nSub\n"))
+    assert erro.value.linha == 2
+
+    with pytest.raises(ContentError) as erro:
+        list(parse_sections("#CAPA\nTítulo\nSub\n\n#2COL\nSó título\nesquerda\n"))
+    assert erro.value.linha == 5
+
+    with pytest.raises(ContentError) as erro:
+        list(parse_sections("#CAPA\nTítulo\nSub\n#IMG\n\n"))
+    assert erro.value.linha == 4
+
+
+# tabular_content ==========
+
+MAPEAMENTO = {
+    "group_by": "curso",
+    "sections": [
+        {"tipo": "CAPA", "once": True, "titulo": "{curso}", "subtitulo": "Prof. {professor}"},
+        {"tipo": "1COL", "titulo": "{tema}", "corpo": "{conteudo}"},
+    ],
+}
+
+
+def _arquivo(tmp_path, nome, texto):
+    caminho = tmp_path / nome
+    caminho.write_text(texto, encoding="utf-8")
+    return caminho
+
+
+@pytest.mark.parametrize("nome", ["vazio.csv", "vazio.json", "vazio.jsonl"])
+def test_arquivo_vazio_nao_gera_decks(tmp_path, nome):
+    rows = read_rows(_arquivo(tmp_path, nome, ""))
+    assert list(iter_decks(rows, load_mapping(MAPEAMENTO))) == []
+
+
+def test_csv_agrupa_em_decks(tmp_path):
+    texto = ("curso;professor;tema;conteudo\n"
+             "Python;Ana;Listas;- append\n"
+             "Python;Ana;Dicts;\"- chaves\n- valores\"\n"
+             "SQL;Bia;Joins;- inner\n")
+    decks = list(iter_decks(read_rows(_arquivo(tmp_path, "aulas.csv", texto)), load_mapping(MAPEAMENTO)))
+    assert [(chave, saida, [s.tipo for s in secoes]) for chave, saida, secoes in decks] == [
+        ("Python", "Python.pptx", ["CAPA", "1COL", "1COL"]),
+        ("SQL", "SQL.pptx", ["CAPA", "1COL"]),
+    ]
+    assert decks[0][2][2].campos["corpo"] == ["- chaves", "- valores"]
+    assert decks[0][2][2].linha == 3
+
+
+def test_coluna_ausente_informa_a_linha(tmp_path):
+    texto = "curso,professor,tema\nPython,Ana,Listas\n"
+    with pytest.raises(ContentError) as erro:
+        list(iter_decks(read_rows(_arquivo(tmp_path, "aulas.csv", texto)), load_mapping(MAPEAMENTO)))
+    assert erro.value.linha == 2
+    assert "conteudo" in str(erro.value)
+
+
+@pytest.mark.parametrize("texto, linha", [
+    ('[{"curso": "A"},', 2),                 # lista sem fim
+    ('[{"curso": "A"} {"curso": "B"}]', 2),  # falta a vírgula
+    ('{"curso": "A"}', 1),                   # objeto em vez de lista
+    ('[{"curso": "A"}, 3]', 2),              # registro que não é objeto
+])
+def test_json_malformado(tmp_path, texto, linha):
+    with pytest.raises(ContentError) as erro:
+        list(read_rows(_arquivo(tmp_path, "dados.json", texto)))
+    assert erro.value.linha == linha
+
+
+def test_json_lido_em_blocos(tmp_path, monkeypatch):
+    monkeypatch.setattr("tabular_content.TAMANHO_BLOCO_JSON", 7)
+    registros = [{"curso": f"C{i}", "nota": i * 1.5, "texto": "ç" * i} for i in range(20)]
+    caminho = _arquivo(tmp_path, "dados.json", json.dumps(registros, ensure_ascii=False))
+    assert [valores for _, valores in read_rows(caminho)] == registros
+
+
+def test_jsonl_ignora_linhas_vazias_e_informa_a_linha(tmp_path):
+    caminho = _arquivo(tmp_path, "dados.jsonl", '{"curso": "A"}\n\n{"curso": "B"}\n{quebrado\n')
+    linhas = read_rows(caminho)
+    assert next(linhas) == (1, {"curso": "A"})
+    assert next(linhas) == (3, {"curso": "B"})
+    with pytest.raises(ContentError) as erro:
+        next(linhas)
+    assert erro.value.linha == 4
+
+
+# batch_ppt ==========
+
+class _DerrubaProcesso:
+    """Ao ser recebido pelo processo do pool, encerra o processo (como uma falta de memória)."""
+
+    def __reduce__(self):
+        return os._exit, (1,)
+
+
+def test_lote_continua_quando_um_processo_morre(tmp_path):
+    conteudo = tmp_path / "conteudo.txt"
+    conteudo.write_text("#CAPA\nTítulo\nSubtítulo\n#1COL\nTópico\n- item\n", encoding="utf-8")
+    tarefas = [(str(conteudo), str(tmp_path / f"deck{i}.pptx"), f"deck{i}") for i in range(6)]
+    tarefas[1] = ([_DerrubaProcesso()], str(tmp_path / "deck1.pptx"), "deck1")
+    relatorio = _run_batch(TEMPLATE, iter(tarefas), tmp_path, 1, None, None, load_template(TEMPLATE))
+    resultados = {r["content"]: r for r in relatorio["results"]}
+    assert relatorio["decks"] == 6
+    assert not resultados["deck1"]["ok"] and "BrokenProcessPool" in resultados["deck1"]["error"]
+    # Os decks enviados depois da queda vão para um pool novo
+    assert all(resultados[f"deck{i}"]["ok"] for i in (3, 4, 5))
+    assert zipfile.ZipFile(tmp_path / "deck5.pptx").testzip() is None
+
+
+# generate_ppt ==========
+
+def test_generate_ppt_aceita_nomes_antigos(tmp_path):
+    conteudo = tmp_path / "conteudo.txt"
+    conteudo.write_text("#CAPA\nTítulo\nSubtítulo\n", encoding="utf-8")
+    saida = tmp_path / "saida.pptx"
+    assert generate_ppt(template_path=str(TEMPLATE), content_path=str(conteudo), output_path=saida) == saida
+    assert zipfile.ZipFile(saida).testzip() is None
+    with pytest.raises(TypeError):
+        generate_ppt(TEMPLATE, conteudo, template_path=TEMPLATE)
+
+
+# fast_save ==========
+
+def test_gravacao_rapida_igual_ao_prs_save(tmp_path):
+    imagem = tmp_path / "foto.png"
+    Image.linear_gradient("L").resize((800, 600)).save(imagem)
+    cache = TemplateCache()
+    prs, layout_index, plano = cache.prepare(str(TEMPLATE))
+    conteudo = (f"#CAPA\nÁção\nSubtítulo\n#1COL\nTópico\n- um\n  - dois\n"
+                f"#2COL\nA\nesquerda\ndireita\n#IMG\nFigura\n{imagem}\nLegenda\n")
+    fill_presentation(prs, conteudo, layout_index, ImageCache(cache_dir=tmp_path / "imagens"))
+
+    rapido, normal = tmp_path / "rapido.pptx", tmp_path / "normal.pptx"
+    info = save_presentation(prs, rapido, plano)
+    prs.save(normal)
+    assert info["fast"] and info["copied"] > 0 and info["compressed"] > 0
+
+    with zipfile.ZipFile(rapido) as a, zipfile.ZipFile(normal) as b:
+        assert a.testzip() is None
+        assert a.namelist() == b.namelist()
+        for nome in b.namelist():
+            # Partes intactas são copiadas do template como estavam lá: o XML é o
+            # mesmo, mas pode diferir da serialização do python-pptx (aspas, espaços)
+            rapida, original = a.read(nome), b.read(nome)
+            if rapida != original:
+                assert nome.endswith((".xml", ".rels")), nome
+                assert _xml_canonico(rapida) == _xml_canonico(original), nome
+
+
+def _xml_canonico(dados):
+    raiz = ElementTree.fromstring(dados)
+    if raiz.tag.endswith("}Relationships"):
+        # Ordem dos relacionamentos não importa (o python-pptx os ordena pelo rId)
+        return sorted(sorted(rel.attrib.items()) for rel in raiz)
+    return ElementTree.canonicalize(ElementTree.tostring(raiz, encoding="unicode"), strip_text=True)
+
+
+def test_sem_plano_usa_prs_save(tmp_path):
+    prs = TemplateCache().presentation(str(TEMPLATE))
+    info = save_presentation(prs, tmp_path / "saida.pptx")
+    assert not info["fast"]
+    assert zipfile.ZipFile(tmp_path / "saida.pptx").testzip() is None
+
+
+def test_sem_internos_do_python_pptx_usa_prs_save(tmp_path, monkeypatch):
+    monkeypatch.setattr(fast_save, "_ContentTypesItem", None)
+    prs, _, plano = TemplateCache().prepare(str(TEMPLATE))
+    assert not plano.disponivel
+    info = save_presentation(prs, tmp_path / "saida.pptx", plano)
+    assert not info["fast"]
+    assert zipfile.ZipFile(tmp_path / "saida.pptx").testzip() is None
+
+
+def test_interno_alterado_depois_do_plano_usa_prs_save(tmp_path, monkeypatch):
+    prs, _, plano = TemplateCache().prepare(str(TEMPLATE))
+    assert plano.disponivel
+    monkeypatch.setattr(fast_save, "_ContentTypesItem", object())  # sem xml_for: AttributeError
+    info = save_presentation(prs, tmp_path / "saida.pptx", plano)
+    assert not info["fast"]
+    assert zipfile.ZipFile(tmp_path / "saida.pptx").testzip() is None
+
+
+# image_cache ==========
+
+def _ruido(caminho):
+    # ruído não comprime: as três imagens preparadas têm quase o mesmo tamanho
+    Image.frombytes("RGB", (300, 200), os.urandom(300 * 200 * 3)).save(caminho)
+    return caminho
+
+
+def test_cache_de_imagens_apaga_as_usadas_ha_mais_tempo(tmp_path):
+    pasta = tmp_path / "imagens"
+    cache = ImageCache(cache_dir=str(pasta))
+    caixa = (300 * 914400 // 150, 200 * 914400 // 150)
+    a, b, c = (_ruido(tmp_path / f"{nome}.png") for nome in "abc")
+
+    pronta_a = cache.prepare(a, *caixa)[0]
+    pronta_b = cache.prepare(b, *caixa)[0]
+    cache.max_bytes = int(os.path.getsize(pronta_a) * 2.5)
+    os.utime(pronta_a, (1000, 1000))
+    os.utime(pronta_b, (2000, 2000))
+    assert cache.prepare(a, *caixa)[0] == pronta_a  # uso renova o mtime de a
+    pronta_c = cache.prepare(c, *caixa)[0]
+
+    assert os.path.exists(pronta_a) and os.path.exists(pronta_c)
+    assert not os.path.exists(pronta_b)
+    assert sum(p.stat().st_size for p in pasta.iterdir()) <= cache.max_bytes
+    # b saiu também da memória: é processada de novo em vez de apontar para um arquivo apagado
+    misses = cache.misses
+    assert os.path.exists(cache.prepare(b, *caixa)[0])
+    assert cache.misses == misses + 1